@@ -13,7 +13,7 @@ from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.naive_bayes import MultinomialNB
 import pandas as pd
 import string
-import nltk
+from classification.nltk_resources import ensure_nltk_resources
 
 app = Flask(__name__)
 app.config.from_pyfile('config.py')
@@ -38,9 +38,8 @@ class ComplaintClassifier:
             return
             
         try:
-            nltk.download('punkt', quiet=True)
-            nltk.download('stopwords', quiet=True)
-            nltk.download('wordnet', quiet=True)
+            # Load vendored NLTK resources (see vendor_nltk_data.py)
+            ensure_nltk_resources(app.config['NLTK_DATA_DIR'])
             
             self.vectorizer = TfidfVectorizer()
             self.classifier = MultinomialNB()
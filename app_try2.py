@@ -1,25 +1,26 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, abort
+from flask import Flask, render_template, request, redirect, url_for, flash, abort, jsonify
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
 from models.database import db, init_db
 from models.user import User
 from models.complaint import Complaint
 import os
+import threading
+import time
 from datetime import datetime
-from nltk.tokenize import word_tokenize
-from nltk.corpus import stopwords
-from nltk.stem import WordNetLemmatizer
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.linear_model import LogisticRegression
-import pandas as pd
-import string
-import nltk
 import smtplib
 from email.mime.text import MIMEText
 from twilio.rest import Client
 
 # Import training data from separate file
-from training_data import get_training_data, get_department_info
+from training_data import get_categories, get_department_info
+from classification.cache import PredictionCache
+from classification.client import RemoteClassifier
+from classification.labels import LabelStore
+from classification.predictions import PredictionStore
+from classification.rules import KeywordRules
+from classification.similarity import SimilarityIndex
+from classification.fulltext import ORDERS as SEARCH_ORDERS, ComplaintSearch
 
 app = Flask(__name__)
 app.config.from_pyfile('config.py')
@@ -36,116 +37,40 @@ login_manager.login_view = 'login'
 def load_user(user_id):
     return User.query.get(int(user_id))
 
-class ComplaintClassifier:
-    def __init__(self):
-        if app.config.get('SKIP_NLP_INIT', False):
-            self.vectorizer = None
-            self.classifier = None
-            return
-            
-        try:
-            # Download NLTK resources
-            nltk.download('punkt', quiet=True)
-            nltk.download('stopwords', quiet=True)
-            nltk.download('wordnet', quiet=True)
-            
-            # Initialize ML components
-            self.vectorizer = TfidfVectorizer(
-                max_features=10000,
-                ngram_range=(1, 2),
-                stop_words='english'
-            )
-            self.classifier = LogisticRegression(
-                max_iter=1000,
-                class_weight='balanced',
-                solver='saga',
-                penalty='elasticnet',
-                l1_ratio=0.5
-            )
-            self.lemmatizer = WordNetLemmatizer()
-            self.stop_words = set(stopwords.words('english'))
-            
-            # Load training data
-            self.train_data = get_training_data()
-            self.train_model()
-        except Exception as e:
-            app.logger.error(f"Error initializing NLP: {e}")
-            self.vectorizer = None
-            self.classifier = None
-    
-    def preprocess_text(self, text):
-        """Clean and preprocess text for classification"""
-        # Convert to lowercase
-        text = text.lower()
-        # Remove punctuation
-        text = text.translate(str.maketrans('', '', string.punctuation))
-        # Tokenize
-        tokens = word_tokenize(text)
-        # Remove stopwords and lemmatize
-        tokens = [self.lemmatizer.lemmatize(token) 
-                 for token in tokens 
-                 if token not in self.stop_words and len(token) > 2]
-        return ' '.join(tokens)
-    
-    def train_model(self):
-        """Train the classification model"""
-        if not hasattr(self, 'train_data') or self.train_data.empty:
-            app.logger.error("No training data available")
-            return
-            
-        try:
-            # Preprocess all training texts
-            self.train_data['processed_text'] = self.train_data['text'].apply(self.preprocess_text)
-            
-            # Vectorize text
-            X = self.vectorizer.fit_transform(self.train_data['processed_text'])
-            y = self.train_data['category']
-            
-            # Train model
-            self.classifier.fit(X, y)
-            
-            # Log training accuracy
-            train_acc = self.classifier.score(X, y)
-            app.logger.info(f"Model trained successfully. Training accuracy: {train_acc:.2f}")
-            
-        except Exception as e:
-            app.logger.error(f"Training failed: {e}")
-            raise
-    
-    def predict_category(self, text):
-        """Predict the category for a new complaint"""
-        if not self.vectorizer or not self.classifier:
-            app.logger.error("Classifier not initialized properly")
-            return 'General Complaint'
-            
-        try:
-            processed_text = self.preprocess_text(text)
-            if not processed_text.strip():
-                return 'General Complaint'
-                
-            # Vectorize and predict
-            X = self.vectorizer.transform([processed_text])
-            
-            # Get prediction with confidence
-            probs = self.classifier.predict_proba(X)[0]
-            max_prob = max(probs)
-            predicted_idx = probs.argmax()
-            predicted_category = self.classifier.classes_[predicted_idx]
-            
-            # Only accept confident predictions
-            if max_prob < 0.6:
-                app.logger.warning(f"Low confidence prediction: {predicted_category} ({max_prob:.2f})")
-                return 'General Complaint'
-                
-            app.logger.info(f"Predicted category: {predicted_category} (confidence: {max_prob:.2f})")
-            return predicted_category
-            
-        except Exception as e:
-            app.logger.error(f"Prediction failed: {e}")
-            return 'General Complaint'
+# Initialize classifier from the prebuilt model artifact (see train_classifier.py)
+prediction_cache = None
+if app.config['PREDICTION_CACHE_MAX_BYTES'] > 0:
+    prediction_cache = PredictionCache(
+        max_bytes=app.config['PREDICTION_CACHE_MAX_BYTES'],
+        ttl=app.config['PREDICTION_CACHE_TTL'],
+    )
+
+def build_local_classifier(background=False):
+    # Imported here so daemon-backed workers never load sklearn
+    from classification.classifier import ComplaintClassifier
+    return ComplaintClassifier(
+        app.config['MODEL_ARTIFACT_DIR'],
+        skip_init=app.config.get('SKIP_NLP_INIT', False),
+        cache=prediction_cache,
+        background=background,
+        mmap=app.config['MODEL_MMAP'],
+        compact_vocabulary=app.config['COMPACT_VOCABULARY'],
+        top_k=app.config['PREDICTION_TOP_K'],
+        cascade_dir=app.config['CASCADE_ARTIFACT_DIR'],
+    )
 
-# Initialize classifier
-classifier = ComplaintClassifier()
+if app.config['CLASSIFIER_SOCKET_PATH']:
+    # Shared classification daemon (classification_daemon.py)
+    classifier = RemoteClassifier(
+        app.config['CLASSIFIER_SOCKET_PATH'],
+        fallback_factory=build_local_classifier,
+    )
+else:
+    classifier = build_local_classifier(background=app.config['CLASSIFIER_BACKGROUND_LOAD'])
+
+# Complaints filed before the classifier finished warming up
+PENDING_CATEGORY = 'Pending Classification'
+pending_lock = threading.Lock()
 
 def send_department_notification(complaint):
     """Send notifications to the concerned department"""
@@ -186,6 +111,160 @@ def send_department_notification(complaint):
         except Exception as e:
             app.logger.error(f"Failed to send SMS: {e}")
 
+def classify_pending_complaints():
+    """Route complaints that were filed while the classifier was warming up"""
+    with app.app_context(), pending_lock:
+        pending = Complaint.query.filter_by(category=PENDING_CATEGORY).all()
+        if not pending:
+            return
+
+        results = classifier.predict_categories(
+            [f"{complaint.title} {complaint.description}" for complaint in pending])
+
+        routed = 0
+        for complaint, result in zip(pending, results):
+            dept_info = get_department_info(result['category'])
+            # Conditional update so a complaint is only routed once even if
+            # several worker processes drain the backlog at the same time
+            claimed = Complaint.query.filter_by(
+                id=complaint.id, category=PENDING_CATEGORY
+            ).update({
+                'category': result['category'],
+                'department': dept_info['department'],
+                'department_email': dept_info['email'],
+                'department_phone': dept_info['phone'],
+                'forwarded_at': datetime.utcnow(),
+            }, synchronize_session=False)
+            db.session.commit()
+
+            if claimed:
+                db.session.refresh(complaint)
+                record_prediction(complaint, result)
+                send_department_notification(complaint)
+                routed += 1
+
+        app.logger.info(f"Classified {routed} complaints filed during warm-up")
+
+classifier.on_warmed_up(classify_pending_complaints)
+
+# Every worker also drains the backlog on a schedule, so complaints left pending by
+# any worker are routed after the warm-up callbacks have run. The thread is started
+# by each process's first request: one started at import would not survive a fork.
+drainer_pid = None
+drainer_lock = threading.Lock()
+
+def drain_pending_complaints():
+    """Classify pending complaints every PENDING_DRAIN_INTERVAL seconds once warmed up"""
+    while True:
+        if classifier.is_warmed_up():
+            try:
+                classify_pending_complaints()
+            except Exception as e:
+                app.logger.error(f"Failed to classify pending complaints: {e}")
+        time.sleep(app.config['PENDING_DRAIN_INTERVAL'])
+
+@app.before_request
+def start_pending_drainer():
+    global drainer_pid
+    if app.config['PENDING_DRAIN_INTERVAL'] <= 0 or drainer_pid == os.getpid():
+        return
+    with drainer_lock:
+        if drainer_pid != os.getpid():
+            drainer_pid = os.getpid()
+            threading.Thread(target=drain_pending_complaints, name='pending-drainer',
+                             daemon=True).start()
+
+def log_worker_memory():
+    """Log how much of this worker's memory is shared with other workers"""
+    report = classifier.memory_report()
+    if report['process']:
+        app.logger.info(
+            f"Worker {report['pid']} memory: {report['process']['shared_kb']} kB shared, "
+            f"{report['process']['private_kb']} kB private")
+
+classifier.on_warmed_up(log_worker_memory)
+
+# Admin category corrections; the model learns from them incrementally
+label_store = LabelStore(app.config['LABEL_STORE_PATH'])
+
+# Ranked predictions per complaint, so admins can re-route without rescoring
+prediction_store = PredictionStore(app.config['PREDICTION_STORE_PATH'])
+
+def record_prediction(complaint, prediction):
+    try:
+        prediction_store.record(complaint.id, prediction, classifier.model_version)
+    except Exception as e:
+        # Routing already happened; only the re-routing shortcut is lost
+        app.logger.error(f"Could not store the prediction for complaint {complaint.id}: {e}")
+
+# Phrases that route a complaint deterministically, ahead of and instead of the classifier
+keyword_rules = KeywordRules(
+    app.config['KEYWORD_RULES_PATH'],
+    categories=get_categories() + ['General Complaint'],
+    reload_interval=app.config['KEYWORD_RULES_RELOAD_INTERVAL'],
+)
+
+def record_rule_matches(complaint, matches, rules_version):
+    try:
+        prediction_store.record_rule_matches(
+            complaint.id, f"{complaint.title} {complaint.description}", matches, rules_version)
+    except Exception as e:
+        app.logger.error(f"Could not store the rule matches of complaint {complaint.id}: {e}")
+
+def start_online_updates():
+    """Periodically fold new corrections into the model served by this worker"""
+    from classification.online import OnlineUpdater
+    OnlineUpdater(classifier, label_store, app.config['ONLINE_UPDATE_INTERVAL'],
+                  keep_versions=app.config['ARTIFACT_KEEP_VERSIONS']).start()
+
+# With a daemon, the daemon runs the updates for every worker
+if not app.config['CLASSIFIER_SOCKET_PATH'] and app.config['ONLINE_UPDATE_INTERVAL'] > 0:
+    classifier.on_warmed_up(start_online_updates)
+
+# Links between complaints describing the same or related incidents, shared by all workers
+similarity_index = SimilarityIndex(
+    app.config['SIMILARITY_INDEX_PATH'],
+    duplicate_threshold=app.config['SIMILARITY_DUPLICATE_THRESHOLD'],
+    related_threshold=app.config['SIMILARITY_RELATED_THRESHOLD'],
+    max_links=app.config['SIMILARITY_MAX_LINKS'],
+)
+
+def link_similar_complaints(complaint):
+    """Index a newly filed complaint and log likely duplicates of earlier ones"""
+    try:
+        links = similarity_index.add(complaint.id, f"{complaint.title} {complaint.description}")
+    except Exception as e:
+        # Filing must not fail because the index is unavailable
+        app.logger.error(f"Could not index complaint {complaint.id} for similarity: {e}")
+        return
+    duplicates = [link.complaint_id for link in links if link.duplicate]
+    if duplicates:
+        app.logger.info(f"Complaint {complaint.id} is a likely duplicate of {duplicates}")
+
+# Full-text search over complaints, kept in sync by triggers in the database itself
+complaint_search = None
+with app.app_context():
+    database_url = db.engine.url
+if database_url.get_backend_name() == 'sqlite' and database_url.database not in (None, '', ':memory:'):
+    complaint_search = ComplaintSearch(database_url.database)
+    try:
+        if complaint_search.install():
+            app.logger.warning("Created the complaint search index; run rebuild_search_index.py "
+                               "to make complaints filed before now searchable")
+    except Exception as e:
+        app.logger.error(f"Full-text complaint search unavailable: {e}")
+        complaint_search = None
+
+# ======================
+# Health Checks
+# ======================
+
+@app.route('/health/ready')
+def readiness():
+    """Readiness probe reporting classifier warm-up progress"""
+    status = classifier.warm_up_status()
+    return jsonify(status), 200 if status['warmed_up'] else 503
+
 # ======================
 # Authentication Routes
 # ======================
@@ -270,14 +349,48 @@ def file_complaint():
         description = request.form['description']
         is_anonymous = 'anonymous' in request.form
         
-        # Classify complaint
-        try:
-            category = classifier.predict_category(f"{title} {description}")
-            dept_info = get_department_info(category)
-        except Exception as e:
-            app.logger.error(f"Classification failed: {e}")
-            category = 'General Complaint'
+        # Keyword rules need no model, so they route even during warm-up
+        rules = keyword_rules.current()
+        rule_matches = rules.scan(f"{title} {description}")
+        
+        if not rule_matches and not classifier.is_warmed_up():
+            # Persist now and route once the classifier is ready
+            complaint = Complaint(
+                user_id=current_user.id,
+                title=title,
+                description=description,
+                category=PENDING_CATEGORY,
+                department=PENDING_CATEGORY,
+                is_anonymous=is_anonymous,
+                status='Submitted'
+            )
+            db.session.add(complaint)
+            db.session.commit()
+            link_similar_complaints(complaint)
+            
+            # Warm-up may have finished while this complaint was being saved
+            if classifier.is_warmed_up():
+                classify_pending_complaints()
+            
+            flash('Complaint submitted; it will be forwarded to the concerned department shortly', 'success')
+            return redirect(url_for('dashboard'))
+        
+        # Classify complaint; the best matching rule decides over the model, and the
+        # model's ranked alternatives are kept for re-routing
+        prediction = None
+        if rule_matches:
+            category = rule_matches[0].category
             dept_info = get_department_info(category)
+            app.logger.info(f"Routed by keyword rule '{rule_matches[0].phrase}' to {category}")
+        else:
+            try:
+                prediction = classifier.predict(f"{title} {description}")
+                category = prediction['category']
+                dept_info = get_department_info(category)
+            except Exception as e:
+                app.logger.error(f"Classification failed: {e}")
+                category = 'General Complaint'
+                dept_info = get_department_info(category)
         
         # Create complaint record
         complaint = Complaint(
@@ -295,6 +408,11 @@ def file_complaint():
         
         db.session.add(complaint)
         db.session.commit()
+        if rule_matches:
+            record_rule_matches(complaint, rule_matches, rules.version)
+        if prediction is not None:
+            record_prediction(complaint, prediction)
+        link_similar_complaints(complaint)
         
         # Send notifications
         send_department_notification(complaint)
@@ -304,6 +422,75 @@ def file_complaint():
     
     return render_template('complaint.html')
 
+# ======================
+# Classification API
+# ======================
+
+@app.route('/api/classify/batch', methods=['POST'])
+@login_required
+def classify_batch():
+    """Classify a JSON list of complaint texts in a single model pass"""
+    payload = request.get_json(silent=True) or {}
+    texts = payload.get('texts')
+
+    if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+        return jsonify({'error': "'texts' must be a list of strings"}), 400
+    if len(texts) > app.config['CLASSIFY_BATCH_MAX_TEXTS']:
+        return jsonify({
+            'error': f"At most {app.config['CLASSIFY_BATCH_MAX_TEXTS']} texts per request"
+        }), 413
+
+    try:
+        results = classifier.predict_categories(texts)
+    except Exception as e:
+        app.logger.error(f"Batch classification failed: {e}")
+        return jsonify({'error': 'Classification is unavailable, try again later'}), 503
+
+    return jsonify({
+        'model_version': classifier.model_version,
+        'results': results,
+    })
+
+@app.route('/api/classify/stats')
+@login_required
+def classifier_stats():
+    if not current_user.is_admin:
+        abort(403)
+
+    return jsonify({
+        'model_version': classifier.model_version,
+        'cache': prediction_cache.stats() if prediction_cache else None,
+        'memory': classifier.memory_report(),
+        'cascade': classifier.cascade_stats(),
+        'corrections': label_store.count(),
+    })
+
+@app.route('/api/complaints/search')
+@login_required
+def search_complaints():
+    """Ranked full-text search over complaint titles and descriptions, a page at a time"""
+    if not current_user.is_admin:
+        abort(403)
+    if complaint_search is None:
+        return jsonify({'error': 'Full-text search requires a SQLite database'}), 501
+
+    query = request.args.get('q', '').strip()
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', 20, type=int)
+    order = request.args.get('order', 'rank')
+    if not query:
+        return jsonify({'error': "'q' must not be empty"}), 400
+    if page < 1 or not 1 <= per_page <= app.config['SEARCH_MAX_PER_PAGE']:
+        return jsonify({
+            'error': f"'page' must be positive and 'per_page' at most {app.config['SEARCH_MAX_PER_PAGE']}"
+        }), 400
+    if order not in SEARCH_ORDERS:
+        return jsonify({'error': f"'order' must be one of {', '.join(SEARCH_ORDERS)}"}), 400
+
+    result = complaint_search.search(query, page=page, per_page=per_page, order=order,
+                                     department=request.args.get('department'))
+    return jsonify(dict(result, query=query, page=page, per_page=per_page))
+
 @app.route('/complaint-status/<int:complaint_id>')
 @login_required
 def complaint_status(complaint_id):
@@ -313,7 +500,24 @@ def complaint_status(complaint_id):
     if complaint.user_id != current_user.id and not current_user.is_admin:
         abort(403)
     
-    return render_template('status.html', complaint=complaint)
+    # Likely duplicates and related complaints, which may be other users', the
+    # model's ranked predictions and the keyword rules that matched, for admins only
+    similar_complaints = []
+    prediction = None
+    rule_matches = []
+    if current_user.is_admin:
+        prediction = prediction_store.get(complaint.id)
+        rule_matches = prediction_store.rule_matches(complaint.id)
+        links = similarity_index.links(complaint.id)
+        related = {c.id: c for c in Complaint.query.filter(
+            Complaint.id.in_([link.complaint_id for link in links]))}
+        similar_complaints = [(related[link.complaint_id], link) for link in links
+                              if link.complaint_id in related]
+    
+    return render_template('status.html', complaint=complaint,
+                           similar_complaints=similar_complaints,
+                           prediction=prediction,
+                           rule_matches=rule_matches)
 
 # ======================
 # Admin Routes
@@ -393,6 +597,66 @@ def update_status(complaint_id):
     
     return redirect(request.referrer or url_for('admin_dashboard'))
 
+def reroute_complaint(complaint, new_category):
+    """Route a complaint to another category's department and record the correction"""
+    previous_category = complaint.category
+    dept_info = get_department_info(new_category)
+    complaint.category = new_category
+    complaint.department = dept_info['department']
+    complaint.department_email = dept_info['email']
+    complaint.department_phone = dept_info['phone']
+    complaint.forwarded_at = datetime.utcnow()
+    complaint.updated_at = datetime.utcnow()
+    db.session.commit()
+    
+    label_store.add(
+        text=f"{complaint.title} {complaint.description}",
+        category=new_category,
+        previous_category=previous_category,
+        complaint_id=complaint.id,
+        corrected_by=current_user.id,
+    )
+    send_department_notification(complaint)
+    flash(f'Complaint re-routed to {dept_info["department"]}', 'success')
+
+@app.route('/admin/recategorize/<int:complaint_id>', methods=['POST'])
+@login_required
+def recategorize_complaint(complaint_id):
+    """Re-route a misclassified complaint and record the correction for the model"""
+    if not current_user.is_admin:
+        abort(403)
+    
+    complaint = Complaint.query.get_or_404(complaint_id)
+    new_category = request.form.get('category')
+    
+    valid_categories = get_categories() + ['General Complaint']
+    if new_category not in valid_categories:
+        flash('Invalid category', 'error')
+    elif new_category != complaint.category:
+        reroute_complaint(complaint, new_category)
+    
+    return redirect(request.referrer or url_for('admin_dashboard'))
+
+@app.route('/admin/reroute-prediction/<int:complaint_id>', methods=['POST'])
+@login_required
+def reroute_to_prediction(complaint_id):
+    """One-click re-route to one of the model's ranked predictions, the second by default"""
+    if not current_user.is_admin:
+        abort(403)
+    
+    complaint = Complaint.query.get_or_404(complaint_id)
+    prediction = prediction_store.get(complaint.id)
+    rank = request.form.get('rank', 2, type=int)
+    
+    if prediction is None or not 1 <= rank <= len(prediction.predictions):
+        flash('No such prediction for this complaint', 'error')
+    elif prediction.predictions[rank - 1]['category'] == complaint.category:
+        flash(f'Complaint is already routed as {complaint.category}', 'info')
+    else:
+        reroute_complaint(complaint, prediction.predictions[rank - 1]['category'])
+    
+    return redirect(request.referrer or url_for('admin_dashboard'))
+
 @app.route('/admin/delete-complaint/<int:complaint_id>', methods=['POST'])
 @login_required
 def delete_complaint(complaint_id):
@@ -402,6 +666,8 @@ def delete_complaint(complaint_id):
     complaint = Complaint.query.get_or_404(complaint_id)
     db.session.delete(complaint)
     db.session.commit()
+    similarity_index.remove(complaint_id)
+    prediction_store.remove(complaint_id)
     flash('Complaint deleted successfully', 'success')
     return redirect(url_for('admin_dashboard'))
 
@@ -0,0 +1,53 @@
+"""Throughput of predict_categories() versus predict_category() in a loop
+
+Usage:
+    python -m benchmarks.batch_throughput [--n-texts 5000] [--batch-size 1000]
+
+Requires a model artifact (run train_classifier.py first).
+"""
+import argparse
+import itertools
+import logging
+import time
+
+import config
+from classification.classifier import ComplaintClassifier
+from training_data import get_training_data
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--n-texts', type=int, default=5000)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--artifact-dir', default=config.MODEL_ARTIFACT_DIR)
+    args = parser.parse_args()
+
+    # Per-prediction log lines would dominate the single-item timings
+    logging.basicConfig(level=logging.ERROR)
+
+    classifier = ComplaintClassifier(args.artifact_dir)
+    if not classifier.classifier:
+        raise SystemExit("No usable model artifact; run train_classifier.py first")
+
+    texts = list(itertools.islice(itertools.cycle(get_training_data()['text']), args.n_texts))
+
+    start = time.perf_counter()
+    single = [classifier.predict_category(text) for text in texts]
+    single_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batched = []
+    for i in range(0, len(texts), args.batch_size):
+        batched.extend(classifier.predict_categories(texts[i:i + args.batch_size]))
+    batch_elapsed = time.perf_counter() - start
+
+    mismatches = sum(a != b['category'] for a, b in zip(single, batched))
+    print(f"texts:        {len(texts)} (batch size {args.batch_size})")
+    print(f"single loop:  {single_elapsed:.3f}s  {len(texts) / single_elapsed:,.0f} texts/s")
+    print(f"batched:      {batch_elapsed:.3f}s  {len(texts) / batch_elapsed:,.0f} texts/s")
+    print(f"speedup:      {single_elapsed / batch_elapsed:.1f}x")
+    print(f"mismatches:   {mismatches}")
+
+
+if __name__ == '__main__':
+    main()
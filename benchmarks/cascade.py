@@ -0,0 +1,80 @@
+"""Latency, escalation rate and accuracy of the cascade versus the full model alone
+
+Usage:
+    python -m benchmarks.cascade [--n-texts 5000] [--batch-size 1000]
+                                 [--artifact-dir artifacts] [--cascade-dir cascade_artifacts]
+
+Requires a full model and a first-stage artifact (run train_classifier.py,
+then train_cascade.py). Classifies a labelled synthetic corpus (see
+benchmarks/training_backends.py) one text at a time and in batches, with
+and without the cascade, without a result cache.
+"""
+import argparse
+import logging
+import time
+
+import config
+from benchmarks.training_backends import synthetic_corpus
+from classification.classifier import ComplaintClassifier
+from training_data import get_training_data
+
+
+def _run(classifier, texts, batch_size):
+    start = time.perf_counter()
+    single = [classifier.predict(text) for text in texts]
+    single_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(0, len(texts), batch_size):
+        classifier.predict_categories(texts[i:i + batch_size])
+    batch_elapsed = time.perf_counter() - start
+    return single, single_elapsed, batch_elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--n-texts', type=int, default=5000)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--artifact-dir', default=config.MODEL_ARTIFACT_DIR)
+    parser.add_argument('--cascade-dir', default=config.CASCADE_ARTIFACT_DIR)
+    args = parser.parse_args()
+
+    # Per-prediction log lines would dominate the single-item timings
+    logging.basicConfig(level=logging.ERROR)
+
+    full = ComplaintClassifier(args.artifact_dir, mmap=config.MODEL_MMAP,
+                               compact_vocabulary=config.COMPACT_VOCABULARY)
+    cascade = ComplaintClassifier(args.artifact_dir, mmap=config.MODEL_MMAP,
+                                  compact_vocabulary=config.COMPACT_VOCABULARY,
+                                  cascade_dir=args.cascade_dir)
+    if not full.classifier:
+        raise SystemExit("No usable model artifact; run train_classifier.py first")
+    if cascade.first_stage is None:
+        raise SystemExit("No usable first-stage artifact; run train_cascade.py first")
+
+    corpus = synthetic_corpus(get_training_data(), args.n_texts, seed=1)
+    texts = list(corpus['text'])
+    labels = list(corpus['category'])
+
+    print(f"{'':<10}{'single':>14}{'batched':>14}{'accuracy':>10}")
+    results = {}
+    for name, classifier in (('full', full), ('cascade', cascade)):
+        single, single_elapsed, batch_elapsed = _run(classifier, texts, args.batch_size)
+        # Accuracy of the top prediction, before the low-confidence fallback
+        correct = sum(result['predictions'][0]['category'] == label
+                      for result, label in zip(single, labels) if result['predictions'])
+        results[name] = single
+        print(f"{name:<10}{single_elapsed / len(texts) * 1e6:>10.0f}us/t"
+              f"{len(texts) / batch_elapsed:>10,.0f}t/s{correct / len(texts):>10.3f}")
+
+    agree = sum(a['category'] == b['category'] for a, b in zip(results['full'], results['cascade']))
+    stats = cascade.cascade_stats()
+    print(f"\nescalation rate {stats['escalation_rate']:.1%}, same category as the full model "
+          f"for {agree / len(texts):.1%} of texts")
+    print(f"scoring per text: first stage {stats['first_stage_ms_per_text'] * 1000:.0f}us, "
+          f"full model {stats['full_model_ms_per_text'] * 1000:.0f}us, "
+          f"saved {stats['saved_ms_per_text'] * 1000:.0f}us ({stats['saved_fraction']:.0%})")
+
+
+if __name__ == '__main__':
+    main()
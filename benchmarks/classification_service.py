@@ -0,0 +1,140 @@
+"""Memory and latency of the classification daemon versus in-process scoring
+
+Usage:
+    python -m benchmarks.classification_service [--workers 16]
+
+Runs one in-process worker and one daemon-backed client as separate
+processes, each classifying every training text one at a time, and reports
+per-process RSS, latency percentiles and the projected total RSS for the
+given number of web workers. Linux only (reads /proc). The result cache is
+disabled in both modes so every call runs the model.
+"""
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import config
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _rss_kb(pid='self'):
+    with open(f'/proc/{pid}/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])
+    return 0
+
+
+def _percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def _measure(classify, texts):
+    # Warm up connections and lazily built state before timing
+    for text in texts[:20]:
+        classify(text)
+    timings = []
+    for text in texts:
+        start = time.perf_counter()
+        classify(text)
+        timings.append((time.perf_counter() - start) * 1e6)
+    return {
+        'rss_kb': _rss_kb(),
+        'p50_us': _percentile(timings, 50),
+        'p99_us': _percentile(timings, 99),
+    }
+
+
+def _run_role(args):
+    # Per-prediction log lines would dominate the timings
+    logging.basicConfig(level=logging.ERROR)
+
+    # Texts come from a file so the client process never imports pandas
+    with open(args.texts) as f:
+        texts = json.load(f)
+
+    if args.role == 'inprocess':
+        from classification.classifier import ComplaintClassifier
+        classifier = ComplaintClassifier(args.artifact_dir)
+        if not classifier.classifier:
+            raise SystemExit(f"Could not load a model: {classifier.load_error}")
+    else:
+        from classification.client import RemoteClassifier
+        classifier = RemoteClassifier(args.socket)
+    print(json.dumps(_measure(classifier.predict_category, texts)))
+
+
+def _spawn_role(role, args, env):
+    output = subprocess.check_output(
+        [sys.executable, '-m', 'benchmarks.classification_service', '--role', role,
+         '--artifact-dir', args.artifact_dir, '--socket', args.socket, '--texts', args.texts],
+        cwd=ROOT, env=env)
+    return json.loads(output.decode().strip().splitlines()[-1])
+
+
+def _wait_for_socket(path, daemon, timeout=60):
+    deadline = time.monotonic() + timeout
+    while not os.path.exists(path):
+        if daemon.poll() is not None or time.monotonic() > deadline:
+            raise SystemExit("Classification daemon failed to start")
+        time.sleep(0.05)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=16)
+    parser.add_argument('--artifact-dir', default=config.MODEL_ARTIFACT_DIR)
+    parser.add_argument('--socket', default=None)
+    parser.add_argument('--role', choices=['inprocess', 'client'], help=argparse.SUPPRESS)
+    parser.add_argument('--texts', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.role:
+        _run_role(args)
+        return
+
+    from training_data import get_training_data
+
+    env = dict(os.environ, PREDICTION_CACHE_MAX_BYTES='0')
+    work_dir = tempfile.mkdtemp()
+    args.socket = args.socket or os.path.join(work_dir, 'classifier.sock')
+    args.texts = os.path.join(work_dir, 'texts.json')
+    with open(args.texts, 'w') as f:
+        json.dump(list(get_training_data()['text']), f)
+
+    inprocess = _spawn_role('inprocess', args, env)
+
+    daemon = subprocess.Popen(
+        [sys.executable, 'classification_daemon.py', '--socket', args.socket,
+         '--artifact-dir', args.artifact_dir],
+        cwd=ROOT, env=env, stderr=subprocess.DEVNULL)
+    try:
+        _wait_for_socket(args.socket, daemon)
+        client = _spawn_role('client', args, env)
+        daemon_rss = _rss_kb(daemon.pid)
+    finally:
+        daemon.terminate()
+        daemon.wait()
+
+    print(f"{'mode':<12}{'RSS/process':>14}{'p50':>12}{'p99':>12}")
+    for name, result in (('in-process', inprocess), ('client', client)):
+        print(f"{name:<12}{result['rss_kb'] / 1024:>11.1f} MB"
+              f"{result['p50_us']:>10.0f}us{result['p99_us']:>10.0f}us")
+    print(f"{'daemon':<12}{daemon_rss / 1024:>11.1f} MB")
+
+    inprocess_total = args.workers * inprocess['rss_kb']
+    daemon_total = args.workers * client['rss_kb'] + daemon_rss
+    print(f"\nprojected RSS for {args.workers} workers: "
+          f"in-process {inprocess_total / 1024:.0f} MB, "
+          f"daemon {daemon_total / 1024:.0f} MB")
+
+
+if __name__ == '__main__':
+    main()
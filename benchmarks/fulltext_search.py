@@ -0,0 +1,112 @@
+"""Latency of full-text complaint search as the complaints table grows
+
+Usage:
+    python -m benchmarks.fulltext_search [--n-complaints 1000000] [--repeat 20]
+                                         [--database fulltext_benchmark.db]
+
+Fills a complaints table with a synthetic corpus (see
+benchmarks/training_backends.py) built from training_data.py, with the
+search triggers installed so inserting includes indexing, then times
+ComplaintSearch.search() for rare, common, phrase and prefix queries, ranked
+and newest first. --database keeps the table for reuse; an existing one is
+extended to --n-complaints rather than rebuilt.
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+from collections import Counter
+
+from benchmarks.training_backends import synthetic_corpus
+from classification.fulltext import ComplaintSearch
+from training_data import get_department_info, get_training_data
+
+# The columns of the application's complaints table that search reads
+_TABLE = """
+CREATE TABLE IF NOT EXISTS complaints (
+    id INTEGER PRIMARY KEY,
+    title VARCHAR(200) NOT NULL,
+    description TEXT NOT NULL,
+    category VARCHAR(100) NOT NULL,
+    department VARCHAR(100) NOT NULL,
+    status VARCHAR(50),
+    created_at DATETIME
+)
+"""
+
+
+def _fill(path, n_complaints, batch_size=50000):
+    with sqlite3.connect(path) as conn:
+        conn.execute(_TABLE)
+    search = ComplaintSearch(path)
+    search.install()
+    with sqlite3.connect(path) as conn:
+        stored = conn.execute("SELECT COUNT(*) FROM complaints").fetchone()[0]
+    if stored >= n_complaints:
+        return search
+    corpus = synthetic_corpus(get_training_data(), n_complaints)
+    departments = {category: get_department_info(category)['department']
+                   for category in corpus['category'].unique()}
+    start = time.perf_counter()
+    with sqlite3.connect(path) as conn:
+        for batch in range(stored, n_complaints, batch_size):
+            rows = corpus.iloc[batch:batch + batch_size]
+            conn.executemany(
+                "INSERT INTO complaints (title, description, category, department, status,"
+                " created_at) VALUES (?, ?, ?, ?, 'Submitted', datetime('now'))",
+                [(' '.join(text.split()[:6]), text, category, departments[category])
+                 for text, category in zip(rows['text'], rows['category'])])
+            conn.commit()
+    elapsed = time.perf_counter() - start
+    print(f"inserted and indexed {n_complaints - stored} complaints in {elapsed:.1f}s "
+          f"({(n_complaints - stored) / elapsed:.0f}/s)")
+    return search
+
+
+def _queries(path):
+    """Search box queries of increasing numbers of matches, from the stored text"""
+    with sqlite3.connect(path) as conn:
+        sample = [text for text, in conn.execute(
+            "SELECT description FROM complaints ORDER BY id LIMIT 20000")]
+        department = conn.execute("SELECT department FROM complaints LIMIT 1").fetchone()[0]
+    words = Counter(word.lower() for text in sample for word in text.split() if word.isalnum())
+    common = [word for word, _ in words.most_common() if len(word) > 3]
+    rare = [word for word, count in words.items() if count == 1 and len(word) > 3]
+    first = sample[0].split()
+    return [
+        ('rare word', rare[0], None),
+        ('two words', f"{common[20]} {common[40]}", None),
+        ('phrase', f'"{first[0]} {first[1]}"', None),
+        ('prefix', common[5][:4] + '*', None),
+        ('common word', common[0], None),
+        ('in department', common[0], department),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--n-complaints', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--database', default=None)
+    args = parser.parse_args()
+
+    path = args.database or os.path.join(tempfile.mkdtemp(), 'complaints.db')
+    search = _fill(path, args.n_complaints)
+    print(f"{os.path.getsize(path) / 2 ** 20:.0f} MB at {path}\n")
+
+    print(f"{'query':<15}{'matches':>9}{'rank':>11}{'newest':>11}{'page 10':>11}  q")
+    for name, query, department in _queries(path):
+        timings = {}
+        for order, page in (('rank', 1), ('newest', 1), ('rank', 10)):
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                result = search.search(query, page=page, department=department, order=order)
+            timings[order, page] = (time.perf_counter() - start) / args.repeat * 1000
+        total = f"{result['total']}{'' if result['total_exact'] else '+'}"
+        print(f"{name:<15}{total:>9}{timings['rank', 1]:>9.1f}ms{timings['newest', 1]:>9.1f}ms"
+              f"{timings['rank', 10]:>9.1f}ms  {query}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""Memory, latency and accuracy of hashed features versus the TF-IDF vocabulary
+
+Usage:
+    python -m benchmarks.hashing_vectorizer [--hash-features 65536 262144] [--chunk-size 100]
+
+Trains every configuration on the same stratified 80/20 split of
+training_data.py and scores the held-out 20%. Memory is what the fitted
+vectorizer keeps alive (traced with tracemalloc, so it includes the Python
+vocabulary dict) plus the size of the classifier's weight arrays. Latency is
+one transform() + predict_proba() call per preprocessed text, with the
+weights laid out as they are in a saved artifact.
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+
+import numpy as np
+from sklearn.model_selection import train_test_split
+
+import config
+from classification.nltk_preprocessing import NltkPreprocessor, build_lemma_table
+from classification.preprocessing import TextPreprocessor
+from classification.training import build_estimators, train_incremental
+from training_data import get_training_data
+
+
+def _fit(backend, train, n_features, chunk_size):
+    """Fit one configuration, returning (vectorizer, classifier, retained bytes, seconds)"""
+    vectorizer_params = {'n_features': n_features} if n_features else None
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    if chunk_size:
+        chunks = (train[i:i + chunk_size] for i in range(0, len(train), chunk_size))
+        vectorizer, classifier, _ = train_incremental(
+            chunks, lambda text: text, classes=sorted(train['category'].unique()),
+            backend=backend, vectorizer_params=vectorizer_params)
+    else:
+        vectorizer, classifier = build_estimators(backend, vectorizer_params)
+        X = vectorizer.fit_transform(train['text'])
+        classifier.fit(X, train['category'])
+        del X
+    elapsed = time.perf_counter() - start
+    # Everything the classifier holds is counted separately below
+    classifier_bytes = sum(value.nbytes for value in vars(classifier).values()
+                           if hasattr(value, 'nbytes'))
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - classifier_bytes
+    tracemalloc.stop()
+    return vectorizer, classifier, retained, elapsed
+
+
+def _latencies(vectorizer, classifier, texts):
+    # Score with the weights laid out the way save_artifact() stores them
+    classifier.coef_ = np.asfortranarray(classifier.coef_)
+    timings = []
+    for text in texts:
+        start = time.perf_counter()
+        classifier.predict_proba(vectorizer.transform([text]))
+        timings.append((time.perf_counter() - start) * 1e6)
+    return sorted(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--hash-features', type=int, nargs='+', default=[2 ** 16, 2 ** 18, 2 ** 20])
+    parser.add_argument('--chunk-size', type=int, default=100)
+    args = parser.parse_args()
+
+    data = get_training_data()
+    lemma_table = build_lemma_table(data['text'], NltkPreprocessor(config.NLTK_DATA_DIR))
+    data = data.assign(text=data['text'].apply(TextPreprocessor(lemma_table).preprocess))
+    train, test = train_test_split(data, test_size=0.2, stratify=data['category'], random_state=0)
+
+    runs = [('elasticnet', None, None)]
+    for n_features in args.hash_features:
+        runs += [('hashing_elasticnet', n_features, None),
+                 ('hashing_sgd', n_features, None),
+                 ('hashing_sgd', n_features, args.chunk_size)]
+
+    print(f"{len(train)} training / {len(test)} held-out texts\n")
+    print(f"{'backend':<20}{'features':>10}{'chunks':>8}{'vectorizer':>12}{'weights':>10}"
+          f"{'fit':>8}{'p50':>9}{'p99':>9}{'accuracy':>10}")
+    for backend, n_features, chunk_size in runs:
+        vectorizer, classifier, retained, elapsed = _fit(backend, train, n_features, chunk_size)
+        weights = sum(getattr(classifier, name).nbytes for name in ('coef_', 'intercept_'))
+        timings = _latencies(vectorizer, classifier, test['text'])
+        accuracy = classifier.score(vectorizer.transform(test['text']), test['category'])
+        width = n_features or len(vectorizer.vocabulary_)
+        print(f"{backend:<20}{width:>10}{chunk_size or '-':>8}"
+              f"{retained / 2 ** 20:>9.2f} MB{weights / 2 ** 20:>7.2f} MB{elapsed:>7.1f}s"
+              f"{timings[len(timings) // 2]:>7.0f}us{timings[int(len(timings) * 0.99)]:>7.0f}us"
+              f"{accuracy:>10.3f}")
+
+
+if __name__ == '__main__':
+    main()
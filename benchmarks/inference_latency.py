@@ -0,0 +1,144 @@
+"""Per-stage latency percentiles and concurrent throughput of predict_category()
+
+Usage:
+    python -m benchmarks.inference_latency [--corpus texts.txt] [--repeat 3]
+                                           [--workers 1 2 4] [--output latency.json]
+
+Loads the current artifact the way the web workers do (memory-mapped, with
+COMPACT_VOCABULARY from config) and replays a corpus of complaint texts,
+one text per line of --corpus or the training texts by default.
+
+Stage timings run each step of the single-text path separately: lowercasing
+and punctuation stripping, tokenization, stop-word filtering and
+lemmatization, vectorization and scoring. Throughput forks the given numbers
+of worker processes after the model is loaded, as a pre-forking server
+does, and has them call predict_category() on their share of the corpus
+concurrently. The result cache is not used, so every call runs the model.
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import time
+
+import config
+from classification.classifier import ComplaintClassifier
+from classification.preprocessing import normalize, tokenize
+
+STAGES = ('normalize', 'tokenize', 'lemmatize', 'vectorize', 'score')
+
+# Set before forking the workers, so they share the loaded model
+_classifier = None
+_barrier = None
+
+
+def _percentiles(timings):
+    timings = sorted(timings)
+    return {f'p{pct}_us': timings[min(len(timings) - 1, int(len(timings) * pct / 100))]
+            for pct in (50, 95, 99)}
+
+
+def _stage_timings(classifier, texts, repeat):
+    preprocessor, scorer = classifier.preprocessor, classifier.scorer
+    if scorer is not None:
+        vectorize, score = scorer.vectorize, lambda features: scorer.score(*features)
+    else:
+        vectorize = lambda text: classifier.vectorizer.transform([text])
+        score = classifier.classifier.predict_proba
+
+    steps = (normalize, tokenize, preprocessor.lemmatize_tokens, vectorize, score)
+    timings = {stage: [] for stage in STAGES + ('end_to_end',)}
+    for _ in range(repeat):
+        for text in texts:
+            value = text
+            for stage, step in zip(STAGES, steps):
+                start = time.perf_counter()
+                value = step(value)
+                timings[stage].append((time.perf_counter() - start) * 1e6)
+            start = time.perf_counter()
+            classifier.predict_category(text)
+            timings['end_to_end'].append((time.perf_counter() - start) * 1e6)
+    return {stage: _percentiles(values) for stage, values in timings.items()}
+
+
+def _init_worker(barrier):
+    global _barrier
+    _barrier = barrier
+
+
+def _replay(texts):
+    _barrier.wait()
+    start = time.perf_counter()
+    timings = []
+    for text in texts:
+        call_start = time.perf_counter()
+        _classifier.predict_category(text)
+        timings.append((time.perf_counter() - call_start) * 1e6)
+    # perf_counter is the system-wide monotonic clock on Linux, so the
+    # workers' start and end times are comparable
+    return start, time.perf_counter(), timings
+
+
+def _throughput(texts, workers):
+    context = multiprocessing.get_context('fork')
+    barrier = context.Barrier(workers)
+    shares = [texts[i::workers] for i in range(workers)]
+    with context.Pool(workers, initializer=_init_worker, initargs=(barrier,)) as pool:
+        results = pool.map(_replay, shares, chunksize=1)
+    elapsed = max(end for _, end, _ in results) - min(start for start, _, _ in results)
+    timings = [timing for _, _, worker_timings in results for timing in worker_timings]
+    return dict(_percentiles(timings), workers=workers, texts_per_second=len(texts) / elapsed)
+
+
+def main():
+    global _classifier
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--corpus', default=None)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--workers', type=int, nargs='+', default=sorted({1, 2, os.cpu_count() or 1}))
+    parser.add_argument('--artifact-dir', default=config.MODEL_ARTIFACT_DIR)
+    parser.add_argument('--output', default=None)
+    args = parser.parse_args()
+
+    # Per-prediction log lines would dominate the timings
+    logging.basicConfig(level=logging.ERROR)
+
+    if args.corpus:
+        with open(args.corpus, encoding='utf-8') as f:
+            texts = [line.strip() for line in f if line.strip()]
+    else:
+        from training_data import get_training_data
+        texts = list(get_training_data()['text'])
+
+    _classifier = ComplaintClassifier(args.artifact_dir, mmap=True,
+                                      compact_vocabulary=config.COMPACT_VOCABULARY)
+    if not _classifier.classifier:
+        raise SystemExit(f"Could not load a model: {_classifier.load_error}")
+    # Warm up lazily built state before timing
+    for text in texts[:20]:
+        _classifier.predict_category(text)
+
+    stages = _stage_timings(_classifier, texts, args.repeat)
+    print(f"model {_classifier.model_version}, {len(texts)} texts x {args.repeat}"
+          f"{'' if _classifier.scorer else ' (sklearn scoring)'}\n")
+    print(f"{'stage':<12}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for stage, result in stages.items():
+        print(f"{stage:<12}" + ''.join(f"{result[key]:>8.1f}us" for key in ('p50_us', 'p95_us', 'p99_us')))
+
+    replayed = texts * args.repeat
+    throughput = [_throughput(replayed, workers) for workers in args.workers]
+    print(f"\n{'workers':<12}{'texts/s':>10}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for result in throughput:
+        print(f"{result['workers']:<12}{result['texts_per_second']:>10.0f}" + ''.join(
+            f"{result[key]:>8.1f}us" for key in ('p50_us', 'p95_us', 'p99_us')))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'model_version': _classifier.model_version, 'n_texts': len(texts),
+                       'repeat': args.repeat, 'cpu_count': os.cpu_count(),
+                       'stages': stages, 'throughput': throughput}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
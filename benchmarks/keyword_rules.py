@@ -0,0 +1,80 @@
+"""Scan latency of the keyword rule automaton as the rule table grows
+
+Usage:
+    python -m benchmarks.keyword_rules [--n-texts 5000] [--rules 10,1000,10000]
+
+Builds rule tables of two- and three-word phrases drawn from the corpus
+vocabulary, so scans follow partial matches the way real rules do, and
+times RuleTable.scan() over a synthetic corpus (see
+benchmarks/training_backends.py) built from training_data.py. For
+reference, the same rules are also checked one by one as substrings of
+the normalized text, which costs time in proportion to the number of rules.
+"""
+import argparse
+import time
+from collections import Counter
+
+import numpy as np
+
+from benchmarks.training_backends import synthetic_corpus
+from classification.rules import Rule, RuleTable, _normalize
+from training_data import get_categories, get_training_data
+
+
+def _rules(texts, n_rules, rng):
+    words = Counter(word for text in texts for word in _normalize(text).split())
+    vocabulary = [word for word, _ in words.most_common(5000)]
+    categories = get_categories()
+    rules = []
+    for i in range(n_rules):
+        length = rng.integers(2, 4)
+        phrase = ' '.join(vocabulary[j] for j in rng.integers(len(vocabulary), size=length))
+        rules.append(Rule(phrase, categories[i % len(categories)], int(rng.integers(100))))
+    return rules
+
+
+def _substring_scan(rules):
+    phrases = [f" {' '.join(_normalize(rule.phrase).split())} " for rule in rules]
+
+    def scan(text):
+        words = f" {' '.join(_normalize(text).split())} "
+        return [phrase for phrase in phrases if phrase in words]
+    return scan
+
+
+def _timings(scan, texts):
+    timings = []
+    for text in texts:
+        start = time.perf_counter()
+        scan(text)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return {pct: timings[min(len(timings) - 1, int(len(timings) * pct / 100))] * 1e6
+            for pct in (50, 99)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--n-texts', type=int, default=5000)
+    parser.add_argument('--rules', default='10,1000,10000')
+    args = parser.parse_args()
+
+    texts = list(synthetic_corpus(get_training_data(), args.n_texts)['text'])
+    rng = np.random.default_rng(0)
+
+    print(f"{'rules':>7}{'build':>10}{'scan p50':>11}{'scan p99':>11}{'matched':>9}"
+          f"{'substring p50':>15}")
+    for n_rules in (int(n) for n in args.rules.split(',')):
+        rules = _rules(texts, n_rules, rng)
+        start = time.perf_counter()
+        table = RuleTable(rules)
+        build = time.perf_counter() - start
+        scan = _timings(table.scan, texts)
+        matched = sum(bool(table.scan(text)) for text in texts) / len(texts)
+        substring = _timings(_substring_scan(rules), texts[:500])
+        print(f"{n_rules:>7}{build * 1000:>8.1f}ms{scan[50]:>9.1f}us{scan[99]:>9.1f}us"
+              f"{matched:>9.1%}{substring[50]:>13.1f}us")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""Accuracy versus size of compressed elasticnet artifacts on a holdout split
+
+Usage:
+    python -m benchmarks.model_compression [--thresholds 0 0.01 0.05] [--loads 20]
+
+Fits the elasticnet backend once on a stratified 80% of training_data.py,
+then writes it as an artifact under every compression setting: plain
+float64 and float32 weights, and pruned vocabularies with sparse float32 or
+int8 weights. Each artifact is loaded back and scored on the held-out 20%.
+Model bytes count the vectorizer and weight files, not the lemma table or
+manifest, which compression leaves unchanged.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+from sklearn.model_selection import train_test_split
+
+import config
+from classification.artifact import LEMMA_TABLE_FILE, MANIFEST_FILE, load_artifact, save_artifact
+from classification.compression import prune_features
+from classification.nltk_preprocessing import NltkPreprocessor, build_lemma_table
+from classification.preprocessing import PREPROCESSING_CONFIG, TextPreprocessor
+from classification.training import build_estimators
+from training_data import get_training_data
+
+
+def _model_bytes(path):
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path)
+               if name not in (LEMMA_TABLE_FILE, MANIFEST_FILE))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--thresholds', type=float, nargs='+', default=[0.0, 0.01, 0.05])
+    parser.add_argument('--loads', type=int, default=20)
+    args = parser.parse_args()
+
+    data = get_training_data()
+    lemma_table = build_lemma_table(data['text'], NltkPreprocessor(config.NLTK_DATA_DIR))
+    data = data.assign(text=data['text'].apply(TextPreprocessor(lemma_table).preprocess))
+    train, test = train_test_split(data, test_size=0.2, stratify=data['category'], random_state=0)
+
+    vectorizer, classifier = build_estimators('elasticnet')
+    classifier.fit(vectorizer.fit_transform(train['text']), train['category'])
+    baseline = classifier.predict_proba(vectorizer.transform(test['text']))
+
+    runs = [('float64', None, 'float64', False), ('float32', None, 'float32', False)]
+    for threshold in args.thresholds:
+        runs += [(f'prune {threshold:g} float32', threshold, 'float32', True),
+                 (f'prune {threshold:g} int8', threshold, 'int8', True)]
+
+    root_dir = tempfile.mkdtemp()
+    print(f"{len(train)} training / {len(test)} held-out texts, "
+          f"{len(vectorizer.vocabulary_)} features, "
+          f"{np.count_nonzero(classifier.coef_)}/{classifier.coef_.size} nonzero weights\n")
+    print(f"{'setting':<22}{'features':>9}{'model':>11}{'load':>9}{'accuracy':>10}"
+          f"{'agree':>8}{'max dp':>9}")
+    for name, threshold, weights, sparse in runs:
+        run_vectorizer, run_classifier = vectorizer, classifier
+        if threshold is not None:
+            run_vectorizer, run_classifier, _ = prune_features(vectorizer, classifier, threshold)
+        version = save_artifact(root_dir, run_vectorizer, run_classifier, backend='elasticnet',
+                                corpus_sha256='benchmark', preprocessing=PREPROCESSING_CONFIG,
+                                lemma_table=lemma_table, weights=weights, sparse=sparse)
+
+        start = time.perf_counter()
+        for _ in range(args.loads):
+            artifact = load_artifact(root_dir, version=version)
+        load_ms = (time.perf_counter() - start) / args.loads * 1e3
+
+        proba = artifact.classifier.predict_proba(artifact.vectorizer.transform(test['text']))
+        predicted = artifact.classifier.classes_[proba.argmax(axis=1)]
+        accuracy = float(np.mean(predicted == test['category'].to_numpy()))
+        agree = float(np.mean(proba.argmax(axis=1) == baseline.argmax(axis=1)))
+        print(f"{name:<22}{artifact.manifest['n_features']:>9}"
+              f"{_model_bytes(artifact.path) / 1024:>8.1f} kB{load_ms:>7.1f}ms{accuracy:>10.3f}"
+              f"{agree:>8.3f}{np.abs(proba - baseline).max():>9.4f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""Speedup of process-pool corpus preprocessing over the single-process path
+
+Usage:
+    python -m benchmarks.parallel_preprocessing [--n-texts 100000] [--processes 1 2 4 8]
+                                                [--chunk-size 1000]
+
+Preprocesses a synthetic corpus (see benchmarks/training_backends.py) built
+from training_data.py: first with build_lemma_table() and TextPreprocessor in
+this process, then with build_lemma_table_parallel() and preprocess_parallel()
+at each process count. WordNet is loaded before any timing starts, and
+forked workers inherit it; pool timings include starting the workers.
+Exits non-zero if any parallel run produces a different lemma table or
+different texts.
+"""
+import argparse
+import os
+import time
+
+import config
+from benchmarks.training_backends import synthetic_corpus
+from classification.nltk_preprocessing import NltkPreprocessor, build_lemma_table
+from classification.parallel_preprocessing import build_lemma_table_parallel, preprocess_parallel
+from classification.preprocessing import TextPreprocessor
+from training_data import get_training_data
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--n-texts', type=int, default=100000)
+    parser.add_argument('--processes', type=int, nargs='+',
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    texts = list(synthetic_corpus(get_training_data(), args.n_texts)['text'])
+    reference = NltkPreprocessor(config.NLTK_DATA_DIR)
+    # WordNet loads lazily on first use
+    build_lemma_table(texts[:1], reference)
+
+    start = time.perf_counter()
+    lemma_table = build_lemma_table(texts, reference)
+    lemma_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    preprocess = TextPreprocessor(lemma_table).preprocess
+    expected = [preprocess(text) for text in texts]
+    serial = lemma_seconds + time.perf_counter() - start
+
+    print(f"{len(texts)} texts, {len(lemma_table['lemmas'])} lemma table tokens, "
+          f"{os.cpu_count()} cores\n")
+    print(f"{'processes':<11}{'lemmas':>9}{'texts':>9}{'total':>9}{'speedup':>9}{'efficiency':>12}")
+    print(f"{'serial':<11}{lemma_seconds:>8.2f}s{serial - lemma_seconds:>8.2f}s{serial:>8.2f}s")
+
+    mismatched = []
+    for processes in args.processes:
+        start = time.perf_counter()
+        parallel_table = build_lemma_table_parallel(texts, config.NLTK_DATA_DIR, processes,
+                                                    chunk_size=args.chunk_size)
+        lemma_seconds = time.perf_counter() - start
+        processed = preprocess_parallel(texts, parallel_table, processes, chunk_size=args.chunk_size)
+        total = time.perf_counter() - start
+        if parallel_table != lemma_table or processed != expected:
+            mismatched.append(processes)
+        print(f"{processes:<11}{lemma_seconds:>8.2f}s{total - lemma_seconds:>8.2f}s{total:>8.2f}s"
+              f"{serial / total:>8.2f}x{serial / total / processes:>11.0%}")
+
+    if mismatched:
+        raise SystemExit(f"Parallel preprocessing diverges with {mismatched} processes")
+
+
+if __name__ == '__main__':
+    main()
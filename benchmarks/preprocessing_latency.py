@@ -0,0 +1,97 @@
+"""Parity and per-text latency of TextPreprocessor against the NLTK pipeline
+
+Usage:
+    python -m benchmarks.preprocessing_latency [--repeat 3]
+
+The lemma table is built from training_data.py exactly as train_classifier.py
+does. The other corpora in the repo (categoryvstext.py, count_category.py,
+test1.py) are scored as unseen text. Exits non-zero if the two pipelines
+disagree on any training text.
+"""
+import argparse
+import contextlib
+import io
+import statistics
+import time
+
+import config
+from classification.nltk_preprocessing import NltkPreprocessor, build_lemma_table
+from classification.preprocessing import TextPreprocessor
+from training_data import get_training_data
+
+
+def _load_unseen_texts():
+    # These modules print statistics at import time
+    with contextlib.redirect_stdout(io.StringIO()):
+        import categoryvstext
+        import count_category
+        import test1
+    return list(categoryvstext.training_samples['text']) + list(count_category.text) + list(test1.text)
+
+
+def _latencies(preprocess, texts, repeat):
+    timings = []
+    for _ in range(repeat):
+        for text in texts:
+            start = time.perf_counter()
+            preprocess(text)
+            timings.append(time.perf_counter() - start)
+    return timings
+
+
+def _report(name, timings):
+    timings = sorted(timings)
+    p50 = timings[len(timings) // 2] * 1e6
+    p99 = timings[int(len(timings) * 0.99)] * 1e6
+    print(f"{name:<8} mean {statistics.mean(timings) * 1e6:8.1f}us  p50 {p50:8.1f}us  p99 {p99:8.1f}us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    train_texts = list(get_training_data()['text'])
+    unseen_texts = _load_unseen_texts()
+
+    reference = NltkPreprocessor(config.NLTK_DATA_DIR)
+    # The first NLTK call pays for loading WordNet
+    start = time.perf_counter()
+    reference.preprocess(train_texts[0])
+    print(f"NLTK first call (WordNet load): {(time.perf_counter() - start) * 1e3:.1f}ms")
+
+    lemma_table = build_lemma_table(train_texts, reference)
+    fast = TextPreprocessor(lemma_table)
+
+    # Lemmas the training corpus can produce; any other word is outside
+    # every vocabulary trained on it, so it never changes the features.
+    known_lemmas = set(lemma_table['lemmas'].values())
+
+    failed = False
+    for name, texts in (('training', train_texts), ('unseen', unseen_texts)):
+        mismatches = [t for t in texts if fast.preprocess(t) != reference.preprocess(t)]
+        out_of_vocabulary = sum(
+            not (set(fast.preprocess(t).split()) ^ set(reference.preprocess(t).split())) & known_lemmas
+            for t in mismatches)
+        print(f"parity on {name} texts: {len(texts) - len(mismatches)}/{len(texts)} identical, "
+              f"{out_of_vocabulary}/{len(mismatches)} differences only in out-of-vocabulary words")
+        for text in mismatches[:5]:
+            print(f"  nltk: {reference.preprocess(text)!r}")
+            print(f"  fast: {fast.preprocess(text)!r}")
+        if name == 'training' and mismatches:
+            failed = True
+
+    texts = train_texts + unseen_texts
+    nltk_timings = _latencies(reference.preprocess, texts, args.repeat)
+    fast_timings = _latencies(fast.preprocess, texts, args.repeat)
+    print(f"\nper-text latency over {len(texts)} texts x {args.repeat}:")
+    _report('nltk', nltk_timings)
+    _report('fast', fast_timings)
+    print(f"speedup: {statistics.mean(nltk_timings) / statistics.mean(fast_timings):.1f}x")
+
+    if failed:
+        raise SystemExit("Fast preprocessing diverges from NLTK on training texts")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""Parity and per-text latency of LinearScorer against sklearn's single-row path
+
+Usage:
+    python -m benchmarks.scoring_latency [--repeat 5]
+
+Loads the current artifact the way the web workers do (memory-mapped) and
+scores every preprocessed training text both ways: vectorizer.transform() +
+classifier.predict_proba() on a one-row input, and LinearScorer. Timings
+exclude preprocessing, which both paths share. Exits non-zero if any
+probability differs by more than 1e-12 or any top class differs.
+"""
+import argparse
+import statistics
+import time
+
+import numpy as np
+
+import config
+from classification.artifact import load_artifact
+from classification.preprocessing import TextPreprocessor
+from classification.scoring import LinearScorer
+from training_data import get_training_data
+
+
+def _latencies(predict_proba, texts, repeat):
+    timings = []
+    for _ in range(repeat):
+        for text in texts:
+            start = time.perf_counter()
+            predict_proba(text)
+            timings.append((time.perf_counter() - start) * 1e6)
+    return sorted(timings)
+
+
+def _report(name, timings):
+    print(f"{name:<8} mean {statistics.mean(timings):8.1f}us  "
+          f"p50 {timings[len(timings) // 2]:8.1f}us  p99 {timings[int(len(timings) * 0.99)]:8.1f}us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--artifact-dir', default=config.MODEL_ARTIFACT_DIR)
+    args = parser.parse_args()
+
+    artifact = load_artifact(args.artifact_dir, mmap=True)
+    vectorizer, classifier = artifact.vectorizer, artifact.classifier
+    scorer = LinearScorer.from_estimators(vectorizer, classifier)
+    preprocessor = TextPreprocessor(artifact.lemma_table)
+    texts = [preprocessor.preprocess(text) for text in get_training_data()['text']]
+
+    def sklearn_proba(text):
+        return classifier.predict_proba(vectorizer.transform([text]))[0]
+
+    exact = top_mismatches = 0
+    max_diff = 0.0
+    for text in texts:
+        expected, actual = sklearn_proba(text), scorer.predict_proba(text)
+        exact += np.array_equal(expected, actual)
+        top_mismatches += expected.argmax() != actual.argmax()
+        max_diff = max(max_diff, float(np.abs(expected - actual).max()))
+    print(f"model {artifact.version} ({artifact.manifest['backend']}, {scorer.link})")
+    print(f"parity: {exact}/{len(texts)} probability vectors bit-identical, "
+          f"max abs difference {max_diff:.3g}, {top_mismatches} top-class mismatches")
+
+    sklearn_timings = _latencies(sklearn_proba, texts, args.repeat)
+    scorer_timings = _latencies(scorer.predict_proba, texts, args.repeat)
+    print(f"\nper-text scoring latency over {len(texts)} texts x {args.repeat}:")
+    _report('sklearn', sklearn_timings)
+    _report('scorer', scorer_timings)
+    print(f"speedup: {statistics.mean(sklearn_timings) / statistics.mean(scorer_timings):.1f}x")
+
+    if top_mismatches or max_diff > 1e-12:
+        raise SystemExit("LinearScorer diverges from sklearn")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""Filing-time latency and duplicate recall of the complaint similarity index
+
+Usage:
+    python -m benchmarks.similarity_index [--n-complaints 200000] [--n-queries 1000]
+                                          [--batch-size 10000] [--index similarity_benchmark.db]
+
+Indexes a synthetic corpus (see benchmarks/training_backends.py) built from
+training_data.py with add_many(), then times add() for the queries a filing
+would make: half are indexed complaints with one word dropped, which should
+be linked as duplicates of their original, and half are fresh synthetic
+complaints. --index keeps the database for reuse; an existing one is
+extended to --n-complaints rather than rebuilt.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+import config
+from benchmarks.training_backends import synthetic_corpus
+from classification.similarity import SimilarityIndex
+from training_data import get_training_data
+
+
+def _percentiles(timings):
+    timings = sorted(timings)
+    return {pct: timings[min(len(timings) - 1, int(len(timings) * pct / 100))] * 1000
+            for pct in (50, 95, 99)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--n-complaints', type=int, default=200000)
+    parser.add_argument('--n-queries', type=int, default=1000)
+    parser.add_argument('--batch-size', type=int, default=10000)
+    parser.add_argument('--index', default=None)
+    args = parser.parse_args()
+
+    path = args.index or os.path.join(tempfile.mkdtemp(), 'similarity.db')
+    index = SimilarityIndex(path, config.SIMILARITY_DUPLICATE_THRESHOLD,
+                            config.SIMILARITY_RELATED_THRESHOLD, config.SIMILARITY_MAX_LINKS)
+    data = get_training_data()
+    texts = synthetic_corpus(data, args.n_complaints)['text']
+
+    start = time.perf_counter()
+    indexed = len(index)
+    for batch in range(indexed, args.n_complaints, args.batch_size):
+        index.add_many((i, texts[i]) for i in range(batch, min(batch + args.batch_size, args.n_complaints)))
+    if args.n_complaints > indexed:
+        elapsed = time.perf_counter() - start
+        print(f"indexed {args.n_complaints - indexed} complaints in {elapsed:.1f}s "
+              f"({(args.n_complaints - indexed) / elapsed:.0f}/s)")
+
+    rng = np.random.default_rng(1)
+    originals = rng.choice(args.n_complaints, size=args.n_queries // 2, replace=False)
+    queries = []
+    for original in originals:
+        words = texts[original].split()
+        if len(words) > 1:
+            del words[rng.integers(len(words))]
+        queries.append((' '.join(words), int(original)))
+    fresh = synthetic_corpus(data, args.n_queries - len(queries), seed=1)['text']
+    queries.extend((text, None) for text in fresh)
+
+    timings, found, false_duplicates = [], 0, 0
+    for n, (text, original) in enumerate(queries):
+        start = time.perf_counter()
+        links = index.add(args.n_complaints + n, text)
+        timings.append(time.perf_counter() - start)
+        duplicates = {link.complaint_id for link in links if link.duplicate}
+        if original is None:
+            false_duplicates += bool(duplicates)
+        else:
+            found += original in duplicates
+    for n in range(len(queries)):
+        index.remove(args.n_complaints + n)
+
+    latency = _percentiles(timings)
+    print(f"{len(index)} complaints indexed, {os.path.getsize(path) / 2 ** 20:.0f} MB at {path}")
+    print(f"add() latency: p50 {latency[50]:.1f}ms, p95 {latency[95]:.1f}ms, p99 {latency[99]:.1f}ms")
+    print(f"near-copies linked as duplicates of their original: {found}/{len(originals)}")
+    print(f"fresh complaints flagged as duplicates: {false_duplicates}/{len(fresh)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,169 @@
+"""Per-phase training time and peak memory of each backend across corpus sizes
+
+Usage:
+    python -m benchmarks.training_backends [--backends naive_bayes logistic elasticnet]
+                                           [--scales 1000 10000 100000 1000000]
+                                           [--output training_benchmark.json]
+
+Runs the steps of train_classifier.py one at a time (lemma_table,
+preprocess, fit_transform, fit, score) and records the wall time and the
+peak memory each step allocates (traced with tracemalloc, which covers
+numpy and scipy buffers). lemma_table builds the lemma table of the run's
+corpus with the NLTK pipeline, WordNet load included, as an uncached
+train_classifier.py run does before preprocessing.
+Each run gets a fresh forked process, so runs don't inherit each other's
+heap.
+
+A scale at or below the size of training_data.py samples that many real
+texts. Larger scales are synthetic: every synthetic text keeps the
+category and word count of a randomly drawn real text, with its words
+drawn from that category's texts. About one word in twenty is replaced by
+a Zipf-distributed rare term, so the vocabulary keeps growing with the
+corpus the way a real one does.
+
+Results are written as JSON together with the package versions and git
+revision, so runs from different dates or machines can be compared.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import scipy
+import sklearn
+
+import config
+from classification.nltk_preprocessing import NltkPreprocessor, build_lemma_table
+from classification.preprocessing import TextPreprocessor
+from classification.training import BACKENDS, build_estimators
+from training_data import get_training_data
+
+RARE_TERM_RATE = 0.05
+
+PHASES = ('lemma_table', 'preprocess', 'fit_transform', 'fit', 'score')
+
+# Set before forking each run's process, so the corpus is inherited rather
+# than pickled
+_corpus = None
+_reference = None
+
+
+def synthetic_corpus(data, n_samples, seed=0):
+    """n_samples texts resembling data, see the module docstring"""
+    rng = np.random.default_rng(seed)
+    template = data.sample(n_samples, replace=True, random_state=seed)
+    texts = pd.Series('', index=range(n_samples), dtype=object)
+    categories = template['category'].to_numpy()
+    for category in np.unique(categories):
+        rows = np.flatnonzero(categories == category)
+        pool = np.array(' '.join(data.loc[data['category'] == category, 'text']).split())
+        lengths = template['text'].iloc[rows].str.split().str.len().to_numpy()
+        words = pool[rng.integers(len(pool), size=lengths.sum())].astype(object)
+        rare = rng.random(len(words)) < RARE_TERM_RATE
+        words[rare] = [f"term{k}" for k in rng.zipf(1.3, size=rare.sum())]
+        texts.iloc[rows] = [' '.join(doc) for doc in np.split(words, np.cumsum(lengths)[:-1])]
+    return pd.DataFrame({'text': texts, 'category': categories})
+
+
+def _phase(results, name, func, *args):
+    tracemalloc.reset_peak()
+    baseline = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    value = func(*args)
+    results[name] = {
+        'seconds': time.perf_counter() - start,
+        'peak_bytes': tracemalloc.get_traced_memory()[1] - baseline,
+    }
+    return value
+
+
+def _run(backend):
+    """The steps of train_classifier.py on the inherited corpus"""
+    tracemalloc.start()
+    phases = {}
+    vectorizer, classifier = build_estimators(backend)
+    lemma_table = _phase(phases, 'lemma_table', build_lemma_table, _corpus['text'], _reference)
+    preprocess = TextPreprocessor(lemma_table).preprocess
+    processed_text = _phase(phases, 'preprocess', _corpus['text'].apply, preprocess)
+    X = _phase(phases, 'fit_transform', vectorizer.fit_transform, processed_text)
+    _phase(phases, 'fit', classifier.fit, X, _corpus['category'])
+    train_acc = _phase(phases, 'score', classifier.score, X, _corpus['category'])
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        'n_features': X.shape[1],
+        'nnz': int(X.nnz),
+        'train_accuracy': float(train_acc),
+        'peak_bytes': peak,
+        'phases': phases,
+    }
+
+
+def _git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)),
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    global _corpus, _reference
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--backends', nargs='+', choices=sorted(BACKENDS),
+                        default=['naive_bayes', 'logistic', 'elasticnet'])
+    parser.add_argument('--scales', type=int, nargs='+', default=[1000, 10000, 100000, 1000000])
+    parser.add_argument('--output', default='training_benchmark.json')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    data = get_training_data()
+    # WordNet loads on the first lemmatization, so each run pays for it
+    _reference = NltkPreprocessor(config.NLTK_DATA_DIR)
+    report = {
+        'started_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'git_revision': _git_revision(),
+        'platform': platform.platform(),
+        'versions': {'python': platform.python_version(), 'numpy': np.__version__,
+                     'scipy': scipy.__version__, 'sklearn': sklearn.__version__,
+                     'pandas': pd.__version__},
+        'real_samples': len(data),
+        'seed': args.seed,
+        'runs': [],
+    }
+
+    context = multiprocessing.get_context('fork')
+    print(f"{'backend':<20}{'samples':>9}{'features':>10}"
+          + ''.join(f"{phase:>16}" for phase in PHASES) + f"{'peak':>11}")
+    for n_samples in args.scales:
+        synthetic = n_samples > len(data)
+        if synthetic:
+            _corpus = synthetic_corpus(data, n_samples, seed=args.seed)
+        else:
+            _corpus = data.sample(n_samples, random_state=args.seed).reset_index(drop=True)
+        for backend in args.backends:
+            with context.Pool(1) as pool:
+                run = pool.apply(_run, (backend,))
+            run.update(backend=backend, n_samples=n_samples, synthetic=synthetic)
+            report['runs'].append(run)
+            print(f"{backend:<20}{n_samples:>9}{run['n_features']:>10}" + ''.join(
+                f"{phase['seconds']:>8.2f}s{phase['peak_bytes'] / 2 ** 20:>6.0f}MB"
+                for phase in run['phases'].values()) + f"{run['peak_bytes'] / 2 ** 20:>8.0f} MB")
+
+            # Rewritten after every run, so a long sweep that is cut short
+            # still leaves its finished runs behind
+            with open(args.output, 'w') as f:
+                json.dump(report, f, indent=2)
+    print(f"\nWrote {len(report['runs'])} runs to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
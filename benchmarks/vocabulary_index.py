@@ -0,0 +1,83 @@
+"""Memory and transform throughput of CompactTfidfVectorizer against TfidfVectorizer
+
+Usage:
+    python -m benchmarks.vocabulary_index [--repeat 5]
+
+Loads the current artifact twice, once with the stock dict vocabulary and
+once with the array-backed one, and reports the memory each vectorizer keeps
+alive (traced with tracemalloc; the memory-mapped vocabulary array itself is
+shared and counted by neither), batch and single-text transform throughput, and
+single-text LinearScorer latency. Exits non-zero if the two vectorizers
+produce different matrices for any training text.
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+
+import config
+from classification.artifact import load_artifact
+from classification.preprocessing import TextPreprocessor
+from classification.scoring import LinearScorer
+from training_data import get_training_data
+
+
+def _vectorizer_bytes(artifact_dir, compact_vocabulary):
+    """Memory released by dropping the loaded vectorizer"""
+    gc.collect()
+    tracemalloc.start()
+    artifact = load_artifact(artifact_dir, mmap=True, compact_vocabulary=compact_vocabulary)
+    loaded = tracemalloc.get_traced_memory()[0]
+    artifact.vectorizer = None
+    gc.collect()
+    size = loaded - tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size
+
+
+def _per_second(func, items, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(items)
+    return len(items) * repeat / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--artifact-dir', default=config.MODEL_ARTIFACT_DIR)
+    args = parser.parse_args()
+
+    stock_bytes = _vectorizer_bytes(args.artifact_dir, compact_vocabulary=False)
+    compact_bytes = _vectorizer_bytes(args.artifact_dir, compact_vocabulary=True)
+    stock = load_artifact(args.artifact_dir, mmap=True)
+    compact = load_artifact(args.artifact_dir, mmap=True, compact_vocabulary=True)
+    preprocessor = TextPreprocessor(stock.lemma_table)
+    texts = [preprocessor.preprocess(text) for text in get_training_data()['text']]
+
+    mismatched = (stock.vectorizer.transform(texts) != compact.vectorizer.transform(texts)).nnz
+    print(f"model {stock.version}: {stock.manifest['n_features']} features, "
+          f"ngram_range {tuple(stock.manifest['vectorizer']['ngram_range'])}")
+    print(f"parity on {len(texts)} training texts: {mismatched} differing matrix entries\n")
+
+    print(f"{'vectorizer':<10}{'memory':>11}{'batch':>14}{'single':>14}{'scorer p50':>13}")
+    for name, artifact, size in (('stock', stock, stock_bytes), ('compact', compact, compact_bytes)):
+        vectorizer = artifact.vectorizer
+        scorer = LinearScorer.from_estimators(vectorizer, artifact.classifier)
+        batch = _per_second(vectorizer.transform, texts, args.repeat)
+        single = _per_second(lambda items: [vectorizer.transform([t]) for t in items],
+                             texts, args.repeat)
+        timings = []
+        for text in texts:
+            start = time.perf_counter()
+            scorer.predict_proba(text)
+            timings.append((time.perf_counter() - start) * 1e6)
+        print(f"{name:<10}{size / 1024:>8.0f} kB{batch:>10.0f}/s{single:>10.0f}/s"
+              f"{sorted(timings)[len(timings) // 2]:>11.1f}us")
+
+    if mismatched:
+        raise SystemExit("CompactTfidfVectorizer diverges from TfidfVectorizer")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1 @@
+"""Complaint text classification: preprocessing, training and model artifacts"""
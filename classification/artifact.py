@@ -0,0 +1,380 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime
+
+import numpy as np
+import sklearn
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.naive_bayes import MultinomialNB
+
+from classification.compression import (
+    COMPRESSIBLE_ESTIMATORS, WEIGHT_DTYPES, sparse_weight_arrays, sparse_weights)
+from classification.hashing import HashingTfidfVectorizer
+from classification.vocabulary import CompactTfidfVectorizer
+
+# Bump whenever the on-disk layout changes; older artifacts are refused.
+ARTIFACT_FORMAT_VERSION = 6
+
+MANIFEST_FILE = 'manifest.json'
+VOCABULARY_FILE = 'vocabulary.npy'
+DOC_FREQ_FILE = 'doc_freq.npy'
+LEMMA_TABLE_FILE = 'lemmas.json'
+CURRENT_FILE = 'CURRENT'
+
+# TfidfVectorizer parameters that affect transform() once the vocabulary is fixed
+VECTORIZER_PARAMS = (
+    'lowercase', 'ngram_range', 'stop_words', 'token_pattern',
+    'binary', 'norm', 'use_idf', 'smooth_idf', 'sublinear_tf',
+)
+# HashingTfidfVectorizer parameters; it has no vocabulary, only the
+# per-column document frequencies and, with use_idf, the idf array
+HASHING_VECTORIZER_PARAMS = ('n_features', 'ngram_range', 'stop_words', 'use_idf', 'norm')
+
+# Fitted attributes stored per estimator type, each written as <name>.npy.
+# All arrays, the vocabulary included, are plain .npy files so workers can
+# memory-map them read-only and share the pages through the page cache.
+ESTIMATOR_ARRAYS = {
+    'LogisticRegression': ('coef_', 'intercept_'),
+    'MultinomialNB': ('feature_log_prob_', 'class_log_prior_'),
+    'SGDClassifier': ('coef_', 'intercept_'),
+}
+ESTIMATOR_CLASSES = {
+    'LogisticRegression': LogisticRegression,
+    'MultinomialNB': MultinomialNB,
+    'SGDClassifier': SGDClassifier,
+}
+# Estimators rebuilt with their training hyperparameters rather than the
+# defaults: SGDClassifier only has predict_proba() for some losses, and
+# keeps training with partial_fit() under the same settings.
+RESTORE_PARAMS = ('SGDClassifier',)
+# Scalar training state kept in the manifest so partial_fit() can resume;
+# SGDClassifier derives its learning rate from the update count t_
+ESTIMATOR_STATE = {
+    'SGDClassifier': ('t_',),
+}
+
+
+class ArtifactError(Exception):
+    """Raised when a model artifact is missing, stale or malformed"""
+
+
+def corpus_hash(texts, categories):
+    """SHA-256 over the (text, category) pairs of a training corpus"""
+    digest = hashlib.sha256()
+    for text, category in zip(texts, categories):
+        digest.update(str(text).encode('utf-8'))
+        digest.update(b'\x1f')
+        digest.update(str(category).encode('utf-8'))
+        digest.update(b'\x1e')
+    return digest.hexdigest()
+
+
+def _json_safe(value):
+    if isinstance(value, tuple):
+        return list(value)
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return repr(value)
+
+
+def _sparse_file(name, part):
+    # coef_ -> coef_data.npy, coef_indices.npy, ...
+    return f"{name.rstrip('_')}_{part}.npy"
+
+
+def save_artifact(root_dir, vectorizer, classifier, backend, corpus_sha256,
+                  preprocessing, lemma_table, metrics=None, lineage=None, weights='float64',
+                  sparse=False, calibration=None, cascade=None):
+    """Write a fitted vectorizer/classifier pair as a new artifact version
+
+    lemma_table is the precomputed preprocessing data returned by
+    nltk_preprocessing.build_lemma_table(). lineage describes how an
+    incrementally updated model derives from its parent version, and
+    calibration the temperature its probabilities are rescaled with (see
+    calibration.fit_temperature()). cascade holds the per-category
+    thresholds of a cascade's first-stage model (see train_cascade.py).
+    With sparse=True, coef_ is stored as CSR arrays with one row per
+    feature (coef_data.npy, coef_indices.npy, coef_indptr.npy) with weights
+    of the given dtype (float64, float32 or int8 plus per-class
+    coef_scale.npy); loaded artifacts are scored from them directly.
+
+    The version directory is written under a temporary name and renamed into
+    place, then CURRENT is switched to it, so readers never see a partial
+    artifact. Returns the new version string.
+    """
+    estimator = type(classifier).__name__
+    if estimator not in ESTIMATOR_ARRAYS:
+        raise ArtifactError(f"Unsupported classifier type: {estimator}")
+    if (sparse or weights != 'float64') and estimator not in COMPRESSIBLE_ESTIMATORS:
+        raise ArtifactError(f"Cannot store compressed {estimator} weights")
+    if weights not in WEIGHT_DTYPES:
+        raise ArtifactError(f"Unknown weight dtype '{weights}'")
+    if weights == 'int8' and not sparse:
+        raise ArtifactError("int8 weights are only stored sparsely, with per-class scales")
+
+    version = f"{datetime.utcnow().strftime('%Y%m%d%H%M%S%f')}-{corpus_sha256[:8]}"
+    os.makedirs(root_dir, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix='.tmp-', dir=root_dir)
+
+    hashing = isinstance(vectorizer, HashingTfidfVectorizer)
+    try:
+        if hashing:
+            n_features = vectorizer.n_features
+            vectorizer_params = HASHING_VECTORIZER_PARAMS
+            np.save(os.path.join(tmp_dir, DOC_FREQ_FILE), vectorizer.doc_freq)
+        else:
+            # Terms in feature-index order, which is also sorted order, as
+            # fixed-width UTF-8 bytes
+            vocabulary = sorted(vectorizer.vocabulary_, key=vectorizer.vocabulary_.get)
+            n_features = len(vocabulary)
+            vectorizer_params = VECTORIZER_PARAMS
+            np.save(os.path.join(tmp_dir, VOCABULARY_FILE),
+                    np.array([term.encode('utf-8') for term in vocabulary], dtype=bytes))
+        with open(os.path.join(tmp_dir, LEMMA_TABLE_FILE), 'w', encoding='utf-8') as f:
+            json.dump(lemma_table, f, ensure_ascii=False)
+
+        if vectorizer.use_idf:
+            np.save(os.path.join(tmp_dir, 'idf_.npy'), vectorizer.idf_)
+        sparse_arrays = {}
+        if sparse:
+            sparse_arrays['coef_'] = sparse_weight_arrays(classifier.coef_, weights)
+        for name, parts in sparse_arrays.items():
+            for part, value in parts.items():
+                np.save(os.path.join(tmp_dir, _sparse_file(name, part)), value)
+        for name in ESTIMATOR_ARRAYS[estimator]:
+            if name in sparse_arrays:
+                continue
+            value = getattr(classifier, name)
+            if name == 'coef_' and weights != 'float64':
+                value = value.astype(weights)
+            # Weight matrices are stored column-major: scoring computes
+            # X @ coef_.T, which scipy copies unless coef_.T is C-contiguous
+            np.save(os.path.join(tmp_dir, f'{name}.npy'), np.asfortranarray(value))
+
+        manifest = {
+            'format_version': ARTIFACT_FORMAT_VERSION,
+            'version': version,
+            'created_at': datetime.utcnow().isoformat(),
+            'backend': backend,
+            'corpus_sha256': corpus_sha256,
+            'preprocessing': preprocessing,
+            'labels': [str(label) for label in classifier.classes_],
+            'n_features': n_features,
+            'vectorizer_type': 'hashing' if hashing else 'tfidf',
+            'vectorizer': {name: _json_safe(getattr(vectorizer, name))
+                           for name in vectorizer_params},
+            'estimator': {
+                'type': estimator,
+                'params': {k: _json_safe(v) for k, v in classifier.get_params().items()},
+                'state': {name: _json_safe(getattr(classifier, name))
+                          for name in ESTIMATOR_STATE.get(estimator, ())
+                          if hasattr(classifier, name)},
+            },
+            'sklearn_version': sklearn.__version__,
+            'metrics': metrics or {},
+            'weights': {'dtype': weights, 'sparse': sorted(sparse_arrays)},
+        }
+        if hashing:
+            manifest['n_docs'] = vectorizer.n_docs
+        if lineage:
+            manifest['lineage'] = lineage
+        if calibration:
+            manifest['calibration'] = calibration
+        if cascade:
+            manifest['cascade'] = cascade
+        with open(os.path.join(tmp_dir, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+
+        os.replace(tmp_dir, os.path.join(root_dir, version))
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    set_current_version(root_dir, version)
+    return version
+
+
+def set_current_version(root_dir, version):
+    """Point CURRENT at an existing artifact version"""
+    if not os.path.isfile(os.path.join(root_dir, version, MANIFEST_FILE)):
+        raise ArtifactError(f"No artifact version '{version}' in {root_dir}")
+    fd, tmp_path = tempfile.mkstemp(prefix='.CURRENT-', dir=root_dir)
+    with os.fdopen(fd, 'w') as f:
+        f.write(version)
+    os.replace(tmp_path, os.path.join(root_dir, CURRENT_FILE))
+
+
+def prune_versions(root_dir, keep):
+    """Delete all but the newest keep artifact versions, never the one CURRENT names
+
+    Versions start with their creation time, so they sort oldest first.
+    Returns the deleted versions. Workers still mapping a deleted version's
+    files keep reading them until they load another one.
+    """
+    current = current_version(root_dir)
+    versions = sorted(name for name in os.listdir(root_dir)
+                      if not name.startswith('.')
+                      and os.path.isfile(os.path.join(root_dir, name, MANIFEST_FILE)))
+    deleted = [version for version in versions[:max(len(versions) - keep, 0)]
+               if version != current]
+    for version in deleted:
+        shutil.rmtree(os.path.join(root_dir, version), ignore_errors=True)
+    return deleted
+
+
+def current_version(root_dir):
+    """Return the version CURRENT points at, or None if there is none"""
+    try:
+        with open(os.path.join(root_dir, CURRENT_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+class ModelArtifact:
+    """A loaded artifact: manifest, ready-to-use sklearn estimators and lemma table"""
+
+    def __init__(self, path, manifest, vectorizer, classifier, lemma_table, arrays):
+        self.path = path
+        self.manifest = manifest
+        self.lemma_table = lemma_table
+        # Raw (possibly memory-mapped) arrays keyed by file name without .npy
+        self.arrays = arrays
+        self.vectorizer = vectorizer
+        self.classifier = classifier
+
+    @property
+    def version(self):
+        return self.manifest['version']
+
+    @property
+    def labels(self):
+        return self.manifest['labels']
+
+
+def _read_manifest(path):
+    try:
+        with open(os.path.join(path, MANIFEST_FILE), encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        raise ArtifactError(f"Model artifact not found at {path}")
+    except ValueError as e:
+        raise ArtifactError(f"Corrupt manifest in {path}: {e}")
+
+
+def _check_manifest(manifest, corpus_sha256, preprocessing):
+    if manifest.get('format_version') != ARTIFACT_FORMAT_VERSION:
+        raise ArtifactError(
+            f"Artifact format {manifest.get('format_version')} is not supported "
+            f"(expected {ARTIFACT_FORMAT_VERSION})")
+    if corpus_sha256 is not None and manifest.get('corpus_sha256') != corpus_sha256:
+        raise ArtifactError(
+            f"Artifact {manifest.get('version')} is stale: it was trained on a "
+            f"different corpus; rerun train_classifier.py")
+    if preprocessing is not None and manifest.get('preprocessing') != preprocessing:
+        raise ArtifactError(
+            f"Artifact {manifest.get('version')} was built with a different "
+            f"preprocessing configuration; rerun train_classifier.py")
+
+
+def _build_vectorizer(manifest, vocabulary, idf, doc_freq, compact_vocabulary):
+    params = dict(manifest['vectorizer'])
+    if params.get('ngram_range') is not None:
+        params['ngram_range'] = tuple(params['ngram_range'])
+    if manifest['vectorizer_type'] == 'hashing':
+        vectorizer = HashingTfidfVectorizer(**params)
+        vectorizer.doc_freq = doc_freq
+        vectorizer.n_docs = manifest['n_docs']
+        vectorizer.idf_ = idf
+        return vectorizer
+    if compact_vocabulary:
+        try:
+            return CompactTfidfVectorizer(vocabulary, idf, **params)
+        except ValueError:
+            pass
+    vectorizer = TfidfVectorizer(
+        vocabulary={term.decode('utf-8'): idx for idx, term in enumerate(vocabulary)},
+        **params)
+    if idf is not None:
+        vectorizer.idf_ = idf
+    return vectorizer
+
+
+def _build_classifier(manifest, arrays):
+    estimator = manifest['estimator']['type']
+    if estimator not in ESTIMATOR_CLASSES:
+        raise ArtifactError(f"Unsupported classifier type: {estimator}")
+    # Only the fitted attributes are needed to predict; the training
+    # hyperparameters stay in the manifest for reference.
+    params = manifest['estimator']['params'] if estimator in RESTORE_PARAMS else {}
+    classifier = ESTIMATOR_CLASSES[estimator](**params)
+    classifier.classes_ = np.array(manifest['labels'], dtype=object)
+    classifier.n_features_in_ = manifest['n_features']
+    for name, value in arrays.items():
+        setattr(classifier, name, value)
+    for name, value in manifest['estimator'].get('state', {}).items():
+        setattr(classifier, name, value)
+    return classifier
+
+
+def load_artifact(root_dir, version=None, corpus_sha256=None, preprocessing=None,
+                  mmap=False, compact_vocabulary=False):
+    """Load an artifact version (CURRENT by default)
+
+    When corpus_sha256 or preprocessing are given they must match what the
+    artifact was built with, otherwise ArtifactError is raised instead of
+    serving predictions from a stale model. With mmap=True the arrays are
+    mapped read-only instead of copied into the process. With
+    compact_vocabulary=True a TF-IDF vocabulary is served by
+    CompactTfidfVectorizer instead of a dict, where its settings allow.
+    """
+    version = version or current_version(root_dir)
+    if not version:
+        raise ArtifactError(f"No model artifact in {root_dir}; run train_classifier.py")
+    path = os.path.join(root_dir, version)
+
+    manifest = _read_manifest(path)
+    _check_manifest(manifest, corpus_sha256, preprocessing)
+
+    try:
+        with open(os.path.join(path, LEMMA_TABLE_FILE), encoding='utf-8') as f:
+            lemma_table = json.load(f)
+        mmap_mode = 'r' if mmap else None
+        hashing = manifest['vectorizer_type'] == 'hashing'
+        vocabulary = doc_freq = idf = None
+        if hashing:
+            doc_freq = np.load(os.path.join(path, DOC_FREQ_FILE), mmap_mode=mmap_mode)
+        else:
+            vocabulary = np.load(os.path.join(path, VOCABULARY_FILE), mmap_mode=mmap_mode)
+        if manifest['vectorizer'].get('use_idf', True):
+            idf = np.load(os.path.join(path, 'idf_.npy'), mmap_mode=mmap_mode)
+        arrays = {}
+        for name in ESTIMATOR_ARRAYS.get(manifest['estimator']['type'], ()):
+            if name in manifest['weights']['sparse']:
+                # Scored as a sparse matrix over the (mapped) CSR arrays
+                parts = {part: np.load(os.path.join(path, _sparse_file(name, part)),
+                                       mmap_mode=mmap_mode)
+                         for part in ('data', 'indices', 'indptr', 'scale')
+                         if os.path.exists(os.path.join(path, _sparse_file(name, part)))}
+                arrays[name] = sparse_weights(
+                    parts, (len(manifest['labels']), manifest['n_features']))
+            else:
+                arrays[name] = np.load(os.path.join(path, f'{name}.npy'), mmap_mode=mmap_mode)
+    except (OSError, ValueError) as e:
+        raise ArtifactError(f"Could not read artifact {version}: {e}")
+
+    vectorizer_arrays = {'vocabulary': vocabulary, 'doc_freq': doc_freq, 'idf_': idf}
+    vectorizer_arrays = {name: value for name, value in vectorizer_arrays.items() if value is not None}
+    if any(value.shape != (manifest['n_features'],) for value in vectorizer_arrays.values()):
+        raise ArtifactError(f"Artifact {version} is inconsistent with its manifest")
+
+    return ModelArtifact(path, manifest,
+                         _build_vectorizer(manifest, vocabulary, idf, doc_freq,
+                                           compact_vocabulary),
+                         _build_classifier(manifest, arrays),
+                         lemma_table,
+                         dict(arrays, **vectorizer_arrays))
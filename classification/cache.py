@@ -0,0 +1,105 @@
+import hashlib
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+_WHITESPACE = re.compile(r'\s+')
+
+# Rough per-entry bookkeeping cost (OrderedDict slot, tuple, float, expiry)
+# on top of the key and value objects themselves.
+_ENTRY_OVERHEAD = 200
+
+
+def normalize_text(text):
+    """Cheap normalization so resubmissions differing only in case/spacing share a key"""
+    return _WHITESPACE.sub(' ', text.lower()).strip()
+
+
+def _value_size(value):
+    """Size of a value and, for tuples such as ranked predictions, of their items"""
+    if isinstance(value, tuple):
+        return sys.getsizeof(value) + sum(_value_size(item) for item in value)
+    return sys.getsizeof(value)
+
+
+class PredictionCache:
+    """Thread-safe LRU cache of classification results with TTL and a memory ceiling
+
+    Keys combine a hash of the normalized text with the model version, so a
+    newly loaded model never serves results computed by an older one;
+    ComplaintClassifier also clears the cache whenever it loads a model.
+    """
+
+    def __init__(self, max_bytes=16 * 1024 * 1024, ttl=3600):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(text, model_version):
+        digest = hashlib.sha256(normalize_text(text).encode('utf-8')).hexdigest()
+        return f"{model_version}:{digest}"
+
+    @staticmethod
+    def _entry_size(key, value):
+        return _ENTRY_OVERHEAD + sys.getsizeof(key) + _value_size(value)
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss or expired entry"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at, size = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._entries[key]
+                self._bytes -= size
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        size = self._entry_size(key, value)
+        if size > self.max_bytes:
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            self._entries[key] = (value, expires_at, size)
+            self._bytes += size
+            # Evict least recently used entries until back under the ceiling
+            while self._bytes > self.max_bytes:
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,96 @@
+"""Temperature scaling of predicted class probabilities
+
+A single temperature T rescales probabilities as p ** (1 / T), renormalized.
+For a softmax model that is exactly dividing the logits by T; for the other
+backends it is the same operation on log-probabilities. Ranks never change,
+so the predicted category and the order of the alternatives stay the same,
+only the confidences move: T > 1 softens an overconfident model, T < 1
+sharpens an underconfident one. T is fitted offline by minimizing the
+log-loss of out-of-fold probabilities (calibrate()) and stored in the
+artifact manifest; artifacts without one are served with T = 1.
+"""
+import logging
+
+import numpy as np
+from scipy.optimize import minimize_scalar
+
+from classification.evaluation import out_of_fold_proba
+
+logger = logging.getLogger(__name__)
+
+# Floor for probabilities before taking logs; keeps zero-probability classes
+# of MultinomialNB and saturated logistic models finite
+_EPS = 1e-12
+
+
+def apply_temperature(probs, temperature):
+    """Rescale probabilities (one row or a matrix of rows) by a temperature"""
+    probs = np.asarray(probs, dtype=np.float64)
+    if temperature == 1.0:
+        return probs
+    logits = np.log(np.maximum(probs, _EPS)) / temperature
+    logits -= logits.max(axis=-1, keepdims=True)
+    scaled = np.exp(logits)
+    return scaled / scaled.sum(axis=-1, keepdims=True)
+
+
+def log_loss(probs, targets):
+    """Mean negative log-probability of the true classes (column indices)"""
+    return float(-np.mean(np.log(np.maximum(probs[np.arange(len(targets)), targets], _EPS))))
+
+
+def expected_calibration_error(probs, targets, bins=10):
+    """Gap between confidence and accuracy of the top class, averaged over confidence bins"""
+    confidence = probs.max(axis=1)
+    correct = probs.argmax(axis=1) == targets
+    edges = np.minimum((confidence * bins).astype(int), bins - 1)
+    error = 0.0
+    for b in range(bins):
+        in_bin = edges == b
+        if in_bin.any():
+            error += in_bin.mean() * abs(confidence[in_bin].mean() - correct[in_bin].mean())
+    return float(error)
+
+
+def fit_temperature(probs, targets, bounds=(0.05, 20.0)):
+    """Temperature minimizing the log-loss of probs against target column indices
+
+    Returns a dict with the temperature and the log-loss and expected
+    calibration error before and after scaling, as stored in manifests.
+    """
+    probs = np.asarray(probs, dtype=np.float64)
+    targets = np.asarray(targets)
+    result = minimize_scalar(
+        lambda log_t: log_loss(apply_temperature(probs, np.exp(log_t)), targets),
+        bounds=np.log(bounds), method='bounded')
+    temperature = float(np.exp(result.x))
+    calibrated = apply_temperature(probs, temperature)
+    return {
+        'method': 'temperature',
+        'temperature': temperature,
+        'log_loss_before': log_loss(probs, targets),
+        'log_loss_after': log_loss(calibrated, targets),
+        'ece_before': expected_calibration_error(probs, targets),
+        'ece_after': expected_calibration_error(calibrated, targets),
+        'n_samples': len(targets),
+    }
+
+
+def calibrate(texts, categories, backend, estimators, folds=5, n_jobs=None, compress=None):
+    """The calibration entry of a manifest for a model trained on preprocessed texts
+
+    Fits the temperature on out-of-fold probabilities of estimators (an
+    unfitted vectorizer/classifier pair configured like the saved model),
+    so every trainer writing artifacts calibrates them the same way. A
+    model saved compressed is calibrated with compress, its (prune
+    threshold, weight dtype), applied in every fold.
+    """
+    probs, labels = out_of_fold_proba(texts, categories, backend, folds=folds, n_jobs=n_jobs,
+                                      estimators=estimators, compress=compress)
+    column = {label: i for i, label in enumerate(labels)}
+    calibration = fit_temperature(probs, [column[category] for category in categories])
+    calibration['folds'] = folds
+    logger.info(f"Calibration temperature {calibration['temperature']:.2f}: log-loss "
+                f"{calibration['log_loss_before']:.3f} -> {calibration['log_loss_after']:.3f}, "
+                f"ECE {calibration['ece_before']:.3f} -> {calibration['ece_after']:.3f}")
+    return calibration
@@ -0,0 +1,159 @@
+"""Two-stage classification: a cheap first-stage model escalating to the full one
+
+The first stage is a unigram TF-IDF MultinomialNB, the model of app.py,
+saved as its own artifact (see train_cascade.py). It answers a text on
+its own when its calibrated confidence in the predicted category clears
+that category's threshold; every other text is escalated to the full
+model. Thresholds are fitted offline on out-of-fold probabilities as the
+lowest confidence from which the first stage's answers for the category
+still reach a target precision; a category where they never do always
+escalates.
+"""
+import threading
+
+import numpy as np
+
+from classification.calibration import apply_temperature
+from classification.scoring import LinearScorer
+
+
+def fit_thresholds(probs, targets, labels, precision=0.95, min_support=10, floor=0.0):
+    """Per-category confidence thresholds reaching a target precision
+
+    probs are out-of-fold (calibrated) probabilities with columns in labels
+    order and targets the true column indices. For each category the
+    threshold is the lowest top-class confidence such that the texts
+    predicted as that category with at least that confidence are right at
+    least `precision` of the time, and there are at least min_support of
+    them. Thresholds are never below floor. Returns {label: threshold or
+    None}, None meaning the category is always escalated.
+    """
+    probs = np.asarray(probs)
+    targets = np.asarray(targets)
+    predicted = probs.argmax(axis=1)
+    confidence = probs.max(axis=1)
+    thresholds = {}
+    for column, label in enumerate(labels):
+        rows = np.flatnonzero(predicted == column)
+        if not len(rows):
+            thresholds[label] = None
+            continue
+        order = np.argsort(-confidence[rows], kind='stable')
+        conf = confidence[rows][order]
+        correct = np.cumsum(targets[rows][order] == column)
+        counts = np.arange(1, len(conf) + 1)
+        # Only cut between distinct confidences: a threshold keeps every tie
+        boundary = np.append(conf[1:] < conf[:-1], True)
+        ok = (boundary & (counts >= min_support) & (correct >= precision * counts)
+              & (conf >= floor))
+        thresholds[label] = float(conf[np.flatnonzero(ok)[-1]]) if ok.any() else None
+    return thresholds
+
+
+def _threshold_array(thresholds, labels):
+    return np.array([np.inf if thresholds.get(label) is None else thresholds[label]
+                     for label in labels])
+
+
+def cascade_report(first_probs, full_probs, targets, labels, thresholds):
+    """How the cascade would have done on out-of-fold probabilities of both stages
+
+    Returns the escalation rate, the accuracy of the first stage on the
+    texts it answers, of the full model alone and of the cascade, and the
+    cascade's accuracy delta against the full model alone.
+    """
+    first_probs = np.asarray(first_probs)
+    full_probs = np.asarray(full_probs)
+    targets = np.asarray(targets)
+    first = first_probs.argmax(axis=1)
+    answered = first_probs.max(axis=1) >= _threshold_array(thresholds, labels)[first]
+    full_correct = full_probs.argmax(axis=1) == targets
+    cascade_correct = np.where(answered, first == targets, full_correct)
+    first_accuracy = None
+    if answered.any():
+        first_accuracy = float(np.mean(first[answered] == targets[answered]))
+    return {
+        'escalation_rate': float(1 - answered.mean()),
+        'first_stage_accuracy': first_accuracy,
+        'full_model_accuracy': float(full_correct.mean()),
+        'cascade_accuracy': float(cascade_correct.mean()),
+        'accuracy_delta': float(cascade_correct.mean() - full_correct.mean()),
+        'n_samples': len(targets),
+    }
+
+
+class FirstStage:
+    """A loaded first-stage artifact, scoring preprocessed texts"""
+
+    def __init__(self, artifact):
+        self.version = artifact.version
+        self.manifest = artifact.manifest
+        self.vectorizer = artifact.vectorizer
+        self.classifier = artifact.classifier
+        self.classes_ = artifact.classifier.classes_
+        self.temperature = artifact.manifest.get('calibration', {}).get('temperature', 1.0)
+        self.thresholds = _threshold_array(artifact.manifest['cascade']['thresholds'],
+                                           artifact.labels)
+        try:
+            self.scorer = LinearScorer.from_estimators(artifact.vectorizer, artifact.classifier)
+        except ValueError:
+            self.scorer = None
+
+    def uncalibrated_proba(self, processed_texts):
+        """Probabilities before temperature scaling, one row per preprocessed text"""
+        if self.scorer is not None and len(processed_texts) == 1:
+            probs = self.scorer.predict_proba(processed_texts[0])
+        else:
+            probs = self.classifier.predict_proba(self.vectorizer.transform(processed_texts))
+        return np.atleast_2d(probs)
+
+    def predict_proba(self, processed_texts):
+        """Calibrated probabilities, one row per preprocessed text"""
+        return apply_temperature(self.uncalibrated_proba(processed_texts), self.temperature)
+
+    def accepts(self, probs):
+        """Per row of probs, whether the first stage's answer clears its category's threshold"""
+        return probs.max(axis=1) >= self.thresholds[probs.argmax(axis=1)]
+
+
+class CascadeStats:
+    """Running counts and stage timings of a cascade, for the stats endpoint
+
+    Latency saved is estimated against scoring every text with the full
+    model: each answered text saves the mean full-model time per text
+    measured on escalated texts, and every text pays its first-stage time.
+    Preprocessing is shared by both stages and not counted.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.answered = 0
+        self.escalated = 0
+        self.first_stage_seconds = 0.0
+        self.full_model_seconds = 0.0
+
+    def record(self, answered, escalated, first_stage_seconds, full_model_seconds):
+        with self._lock:
+            self.answered += answered
+            self.escalated += escalated
+            self.first_stage_seconds += first_stage_seconds
+            self.full_model_seconds += full_model_seconds
+
+    def stats(self):
+        with self._lock:
+            texts = self.answered + self.escalated
+            first_ms = self.first_stage_seconds / texts * 1000 if texts else None
+            full_ms = self.full_model_seconds / self.escalated * 1000 if self.escalated else None
+            saved_ms = None
+            if texts and full_ms is not None:
+                saved_ms = (self.answered * full_ms - texts * first_ms) / texts
+            return {
+                'texts': texts,
+                'answered': self.answered,
+                'escalated': self.escalated,
+                'escalation_rate': self.escalated / texts if texts else None,
+                'first_stage_ms_per_text': first_ms,
+                'full_model_ms_per_text': full_ms,
+                'saved_ms_per_text': saved_ms,
+                'saved_fraction': saved_ms / full_ms if saved_ms is not None else None,
+            }
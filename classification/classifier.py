@@ -0,0 +1,390 @@
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+
+import numpy as np
+
+from classification.artifact import ArtifactError, corpus_hash, current_version, load_artifact
+from classification.calibration import apply_temperature
+from classification.cascade import CascadeStats, FirstStage
+from classification.memory import memory_report
+from classification.preprocessing import PREPROCESSING_CONFIG, TextPreprocessor
+from classification.scoring import LinearScorer
+from training_data import get_department_info, get_training_data
+
+logger = logging.getLogger(__name__)
+
+FALLBACK_CATEGORY = 'General Complaint'
+# Compared with the model's own (uncalibrated) top probability: the routing
+# it was chosen for does not move with the calibration temperature
+CONFIDENCE_THRESHOLD = 0.6
+# Ranked alternatives returned with each prediction
+TOP_K = 3
+
+# Everything loaded from one artifact. load_model() swaps it in as a whole,
+# so a request that reads it once sees a single model version throughout.
+ModelState = namedtuple('ModelState', 'vectorizer classifier scorer preprocessor temperature '
+                                      'first_stage model_version backend artifact_path')
+NO_MODEL = ModelState(None, None, None, None, 1.0, None, None, None, None)
+
+
+class ComplaintClassifier:
+    def __init__(self, artifact_dir, skip_init=False, cache=None, background=False, mmap=False,
+                 compact_vocabulary=False, top_k=TOP_K, cascade_dir=None):
+        self.artifact_dir = artifact_dir
+        self.cascade_dir = cascade_dir
+        self.cache = cache
+        self.mmap = mmap
+        self.compact_vocabulary = compact_vocabulary
+        self.top_k = top_k
+        self._state = NO_MODEL
+        self.cascade = CascadeStats()
+
+        # Warm-up bookkeeping, reported by warm_up_status()
+        self.stage = 'not_started'
+        self.load_error = None
+        self.warm_up_started_at = None
+        self.warm_up_seconds = None
+        self._warmed_up = threading.Event()
+        self._callbacks = []
+        self._callback_lock = threading.Lock()
+
+        if skip_init:
+            self.stage = 'skipped'
+            self._warmed_up.set()
+            return
+
+        if background:
+            # A process forked while the model loads (a pre-forking server
+            # importing the app first) gets no copy of the loading thread
+            os.register_at_fork(after_in_child=self._warm_up_in_child)
+            self._start_warm_up()
+        else:
+            self._warm_up()
+
+    def _start_warm_up(self):
+        threading.Thread(target=self._warm_up, name='classifier-warm-up', daemon=True).start()
+
+    def _warm_up_in_child(self):
+        """Restart a warm-up still running in the parent at fork time"""
+        if self._warmed_up.is_set():
+            return
+        # The parent's loading thread may have held these when it forked
+        self._callback_lock = threading.Lock()
+        self._warmed_up = threading.Event()
+        self._start_warm_up()
+
+    def _warm_up(self):
+        self.warm_up_started_at = datetime.utcnow()
+        start = time.perf_counter()
+        self.stage = 'loading_model'
+        try:
+            self.load_model()
+            self.stage = 'ready'
+        except Exception as e:
+            logger.error(f"Error initializing NLP: {e}")
+            self._state = NO_MODEL
+            self.load_error = str(e)
+            self.stage = 'failed'
+        self.warm_up_seconds = time.perf_counter() - start
+
+        with self._callback_lock:
+            self._warmed_up.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            self._run_callback(callback)
+
+    @staticmethod
+    def _run_callback(callback):
+        try:
+            callback()
+        except Exception as e:
+            logger.error(f"Warm-up callback {callback.__name__} failed: {e}")
+
+    def on_warmed_up(self, callback):
+        """Run callback once warm-up finishes, immediately if it already has"""
+        with self._callback_lock:
+            if not self._warmed_up.is_set():
+                self._callbacks.append(callback)
+                return
+        self._run_callback(callback)
+
+    def is_warmed_up(self):
+        """True once loading finished, whether or not a model could be loaded"""
+        return self._warmed_up.is_set()
+
+    def warm_up_status(self):
+        elapsed = self.warm_up_seconds
+        if elapsed is None and self.warm_up_started_at is not None:
+            elapsed = (datetime.utcnow() - self.warm_up_started_at).total_seconds()
+        return {
+            'warmed_up': self.is_warmed_up(),
+            'stage': self.stage,
+            'model_version': self._state.model_version,
+            'started_at': self.warm_up_started_at.isoformat() if self.warm_up_started_at else None,
+            'elapsed_seconds': elapsed,
+            'error': self.load_error,
+        }
+
+    def memory_report(self):
+        """Shared vs private memory of this worker and of the mapped model files"""
+        return memory_report(self._state.artifact_path if self.mmap else None)
+
+    # The served model, read-only; request paths read self._state once instead
+    vectorizer = property(lambda self: self._state.vectorizer)
+    classifier = property(lambda self: self._state.classifier)
+    scorer = property(lambda self: self._state.scorer)
+    preprocessor = property(lambda self: self._state.preprocessor)
+    temperature = property(lambda self: self._state.temperature)
+    first_stage = property(lambda self: self._state.first_stage)
+    model_version = property(lambda self: self._state.model_version)
+    backend = property(lambda self: self._state.backend)
+    artifact_path = property(lambda self: self._state.artifact_path)
+
+    def load_model(self, version=None):
+        """Load a prebuilt model artifact, refusing stale or mismatched ones"""
+        train_data = get_training_data()
+        artifact = load_artifact(
+            self.artifact_dir,
+            version=version,
+            corpus_sha256=corpus_hash(train_data['text'], train_data['category']),
+            preprocessing=PREPROCESSING_CONFIG,
+            mmap=self.mmap,
+            compact_vocabulary=self.compact_vocabulary,
+        )
+        try:
+            scorer = LinearScorer.from_estimators(artifact.vectorizer, artifact.classifier)
+        except ValueError as e:
+            logger.info(f"Scoring single texts through sklearn: {e}")
+            scorer = None
+        self._state = ModelState(
+            vectorizer=artifact.vectorizer,
+            classifier=artifact.classifier,
+            scorer=scorer,
+            preprocessor=TextPreprocessor(artifact.lemma_table),
+            temperature=artifact.manifest.get('calibration', {}).get('temperature', 1.0),
+            first_stage=self._load_first_stage(artifact.labels),
+            model_version=artifact.version,
+            backend=artifact.manifest['backend'],
+            artifact_path=artifact.path,
+        )
+        if self.cache is not None:
+            self.cache.clear()
+        logger.info(f"Loaded model artifact {artifact.version} ({artifact.manifest['backend']})")
+
+    def _load_first_stage(self, labels):
+        """The current first-stage artifact of cascade_dir, or None to score with the full model"""
+        if not self.cascade_dir or not current_version(self.cascade_dir):
+            return None
+        train_data = get_training_data()
+        try:
+            artifact = load_artifact(
+                self.cascade_dir,
+                corpus_sha256=corpus_hash(train_data['text'], train_data['category']),
+                preprocessing=PREPROCESSING_CONFIG,
+                mmap=self.mmap,
+                compact_vocabulary=self.compact_vocabulary,
+            )
+            if 'cascade' not in artifact.manifest:
+                raise ArtifactError(f"Artifact {artifact.version} has no cascade thresholds")
+            if artifact.labels != labels:
+                raise ArtifactError(f"Artifact {artifact.version} has different categories")
+        except ArtifactError as e:
+            logger.warning(f"Cascade disabled, scoring every text with the full model: {e}")
+            return None
+        report = artifact.manifest['cascade']['report']
+        logger.info(f"Loaded first-stage artifact {artifact.version} "
+                    f"(escalation rate {report['escalation_rate']:.2f} when fitted)")
+        return FirstStage(artifact)
+
+    def reload_if_changed(self):
+        """Load the versions CURRENT points at if they differ from the served ones"""
+        state = self._state
+        version = current_version(self.artifact_dir)
+        first_stage_version = current_version(self.cascade_dir) if self.cascade_dir else None
+        served_first_stage = state.first_stage.version if state.first_stage else None
+        if not version or (version == state.model_version
+                           and first_stage_version == served_first_stage):
+            return False
+        self.load_model(version)
+        return True
+
+    def cascade_stats(self):
+        """Escalation rate and latency saved by the first stage, None without one
+
+        Besides the running counts of this process, includes the accuracy
+        delta and escalation rate measured when the thresholds were fitted.
+        """
+        first_stage = self.first_stage
+        if first_stage is None:
+            return None
+        return dict(self.cascade.stats(),
+                    first_stage_version=first_stage.version,
+                    fitted=first_stage.manifest['cascade']['report'])
+
+    def preprocess_text(self, text):
+        """Clean and preprocess text for classification"""
+        return self._state.preprocessor.preprocess(text)
+
+    def _ranked(self, probs, classes):
+        """Per row of calibrated probs, (category, probability) pairs of the top_k classes
+
+        Pairs are ordered most likely first.
+        """
+        top = np.argsort(-probs, axis=1, kind='stable')[:, :self.top_k]
+        labels = classes[top].tolist()
+        top_probs = np.take_along_axis(probs, top, axis=1).tolist()
+        return [tuple((str(label), prob) for label, prob in zip(row_labels, row_probs))
+                for row_labels, row_probs in zip(labels, top_probs)]
+
+    def _score(self, state, processed_texts):
+        """(ranked predictions, uncalibrated top probability) of each preprocessed text
+
+        Goes through the cascade when there is one: texts the first stage is
+        confident about are answered by it; only the rest are vectorized and
+        scored by the full model.
+        """
+        ranked = [None] * len(processed_texts)
+        confidence = [None] * len(processed_texts)
+        pending = list(range(len(processed_texts)))
+        first_stage = state.first_stage
+        start = time.perf_counter()
+        if first_stage is not None:
+            raw = first_stage.uncalibrated_proba(processed_texts)
+            probs = apply_temperature(raw, first_stage.temperature)
+            accepted = first_stage.accepts(probs)
+            for i, row, top in zip(np.flatnonzero(accepted),
+                                   self._ranked(probs[accepted], first_stage.classes_),
+                                   raw[accepted].max(axis=1).tolist()):
+                ranked[i], confidence[i] = row, top
+            pending = np.flatnonzero(~accepted).tolist()
+        first_stage_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        if pending:
+            if state.scorer is not None and len(pending) == 1:
+                probs = state.scorer.predict_proba(processed_texts[pending[0]])
+            else:
+                X = state.vectorizer.transform([processed_texts[i] for i in pending])
+                probs = state.classifier.predict_proba(X)
+            raw = np.atleast_2d(probs)
+            probs = apply_temperature(raw, state.temperature)
+            for i, row, top in zip(pending, self._ranked(probs, state.classifier.classes_),
+                                   raw.max(axis=1).tolist()):
+                ranked[i], confidence[i] = row, top
+        if first_stage is not None:
+            self.cascade.record(len(processed_texts) - len(pending), len(pending),
+                                first_stage_seconds, time.perf_counter() - start)
+        return list(zip(ranked, confidence))
+
+    @staticmethod
+    def _result(category, confidence, ranked):
+        return {
+            'category': category,
+            'confidence': confidence,
+            'department': get_department_info(category)['department'],
+            'predictions': [{'category': c, 'confidence': p} for c, p in ranked],
+        }
+
+    def _predict(self, text):
+        """(category, confidence, ranked alternatives) for one text, through the cache"""
+        state = self._state
+        if not state.vectorizer or not state.classifier:
+            logger.error("Classifier not initialized properly")
+            return FALLBACK_CATEGORY, 0.0, ()
+
+        key = None
+        if self.cache is not None:
+            key = self.cache.key(text, state.model_version)
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        try:
+            prediction = self._classify(state, text)
+        except Exception as e:
+            logger.error(f"Prediction failed: {e}")
+            return FALLBACK_CATEGORY, 0.0, ()
+
+        if key is not None:
+            self.cache.put(key, prediction)
+        return prediction
+
+    def predict_category(self, text):
+        """Predict the category for a new complaint"""
+        return self._predict(text)[0]
+
+    def predict(self, text):
+        """Classify one complaint, as a result dict like those of predict_categories()"""
+        return self._result(*self._predict(text))
+
+    def _classify(self, state, text):
+        """Preprocess and score one text, returning (category, confidence, ranked)"""
+        processed_text = state.preprocessor.preprocess(text)
+        if not processed_text.strip():
+            return FALLBACK_CATEGORY, 0.0, ()
+
+        # Get prediction with confidence
+        ranked, raw_prob = self._score(state, [processed_text])[0]
+        predicted_category, max_prob = ranked[0]
+
+        # Only accept confident predictions
+        if raw_prob < CONFIDENCE_THRESHOLD:
+            logger.warning(f"Low confidence prediction: {predicted_category} ({max_prob:.2f})")
+            return FALLBACK_CATEGORY, max_prob, ranked
+
+        logger.info(f"Predicted category: {predicted_category} (confidence: {max_prob:.2f})")
+        return predicted_category, max_prob, ranked
+
+    def predict_categories(self, texts):
+        """Classify many complaints in one vectorizer/classifier pass
+
+        Returns one dict per input text with the predicted category, the
+        model's calibrated top class probability, the department it routes
+        to and the top_k most likely categories with their calibrated
+        probabilities, best first. Texts whose uncalibrated top probability
+        is below the confidence threshold fall back to 'General Complaint'
+        just like predict_category(), but keep their ranked predictions.
+        Cached texts are not rescored, and with a cascade only the texts its
+        first stage is unsure of reach the full model.
+        """
+        predictions = [(FALLBACK_CATEGORY, 0.0, ())] * len(texts)
+
+        state = self._state
+        if not state.vectorizer or not state.classifier:
+            logger.error("Classifier not initialized properly")
+        elif texts:
+            keys = [None] * len(texts)
+            pending = []
+            for i, text in enumerate(texts):
+                if self.cache is not None:
+                    keys[i] = self.cache.key(text, state.model_version)
+                    cached = self.cache.get(keys[i])
+                    if cached is not None:
+                        predictions[i] = cached
+                        continue
+                pending.append(i)
+
+            try:
+                processed = {i: state.preprocessor.preprocess(texts[i]) for i in pending}
+                rows = [i for i in pending if processed[i].strip()]
+                if rows:
+                    scored = self._score(state, [processed[i] for i in rows])
+                    for row, (ranked, raw_prob) in zip(rows, scored):
+                        category, prob = ranked[0]
+                        # Only accept confident predictions
+                        if raw_prob < CONFIDENCE_THRESHOLD:
+                            category = FALLBACK_CATEGORY
+                        predictions[row] = (category, prob, ranked)
+                if self.cache is not None:
+                    for i in pending:
+                        self.cache.put(keys[i], predictions[i])
+            except Exception as e:
+                logger.error(f"Batch prediction failed: {e}")
+                for i in pending:
+                    predictions[i] = (FALLBACK_CATEGORY, 0.0, ())
+
+        return [self._result(*prediction) for prediction in predictions]
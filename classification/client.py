@@ -0,0 +1,160 @@
+import logging
+import os
+import socket
+import threading
+import time
+
+from classification.memory import memory_report
+from classification.protocol import (
+    ProtocolError, ServerError, decode_classify_response, decode_status_response,
+    encode_classify_request, encode_status_request, read_frame, write_frame,
+)
+
+logger = logging.getLogger(__name__)
+
+FALLBACK_CATEGORY = 'General Complaint'
+
+
+class RemoteClassifier:
+    """Thin client for classification_daemon.py with in-process fallback
+
+    Exposes the same prediction methods as ComplaintClassifier. Each thread
+    keeps one connection open and reuses it across calls; a forked child
+    opens its own. Only when the
+    daemon is down (nothing listening on the socket) is the call answered
+    by a local ComplaintClassifier, built by fallback_factory on first use,
+    and the daemon retried after retry_interval seconds. A classify call
+    may take timeout seconds plus timeout_per_text per text; timeouts and
+    errors reported by the daemon are raised to the caller, since loading
+    the model in every worker is what the daemon is there to avoid.
+    """
+
+    def __init__(self, socket_path, fallback_factory=None, timeout=5.0, timeout_per_text=0.005,
+                 retry_interval=5.0):
+        self.socket_path = socket_path
+        self.fallback_factory = fallback_factory
+        self.timeout = timeout
+        self.timeout_per_text = timeout_per_text
+        self.retry_interval = retry_interval
+        self.model_version = None
+        self.artifact_path = None
+        self._local = threading.local()
+        self._fallback = None
+        self._fallback_lock = threading.Lock()
+        self._remote_down_until = 0.0
+        # A connection opened before a pre-forking server forks its workers
+        # (say by a warm-up callback) would be shared by all of them, their
+        # frames interleaving on the one socket
+        os.register_at_fork(after_in_child=self._reset_in_child)
+
+    def _reset_in_child(self):
+        """Drop the connection and locks inherited from the parent at fork time"""
+        sock = getattr(self._local, 'sock', None)
+        if sock is not None:
+            # Closes only the child's copy of the descriptor
+            sock.close()
+        self._local = threading.local()
+        self._fallback_lock = threading.Lock()
+
+    def _connection(self):
+        sock = getattr(self._local, 'sock', None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.socket_path)
+            except OSError:
+                sock.close()
+                raise
+            self._local.sock = sock
+        return sock
+
+    def _close_connection(self):
+        sock = getattr(self._local, 'sock', None)
+        if sock is not None:
+            sock.close()
+            self._local.sock = None
+
+    def _call(self, body, timeout=None):
+        """Send one request frame and return the response body"""
+        # A connection the daemon closed while idle fails on first use;
+        # retry once on a fresh connection before giving up. A timeout is
+        # not retried: the daemon may still be working on the request.
+        for attempt in range(2):
+            sock = self._connection()
+            sock.settimeout(timeout or self.timeout)
+            try:
+                write_frame(sock, body)
+                response = read_frame(sock)
+                if response is None:
+                    raise ConnectionError("Daemon closed the connection")
+                return response
+            except socket.timeout:
+                self._close_connection()
+                raise
+            except (OSError, ProtocolError):
+                self._close_connection()
+                if attempt:
+                    raise
+
+    def _fallback_classifier(self):
+        with self._fallback_lock:
+            if self._fallback is None and self.fallback_factory is not None:
+                logger.warning("Classification daemon unavailable; loading model in-process")
+                self._fallback = self.fallback_factory()
+            return self._fallback
+
+    def predict_categories(self, texts):
+        if time.monotonic() >= self._remote_down_until:
+            try:
+                self.model_version, results = decode_classify_response(self._call(
+                    encode_classify_request(texts),
+                    self.timeout + self.timeout_per_text * len(texts)))
+                return results
+            except (ConnectionRefusedError, FileNotFoundError) as e:
+                logger.warning(f"Classification daemon is down: {e}")
+                self._remote_down_until = time.monotonic() + self.retry_interval
+
+        fallback = self._fallback_classifier()
+        if fallback is None:
+            return [{'category': FALLBACK_CATEGORY, 'confidence': 0.0, 'department': None,
+                     'predictions': []} for _ in texts]
+        return fallback.predict_categories(texts)
+
+    def predict_category(self, text):
+        """Predict the category for a new complaint"""
+        return self.predict(text)['category']
+
+    def predict(self, text):
+        return self.predict_categories([text])[0]
+
+    def warm_up_status(self):
+        try:
+            return decode_status_response(self._call(encode_status_request()))
+        except (OSError, ProtocolError, ServerError) as e:
+            fallback = self._fallback
+            if fallback is not None:
+                return fallback.warm_up_status()
+            return {'warmed_up': False, 'stage': 'daemon_unreachable', 'error': str(e)}
+
+    def cascade_stats(self):
+        # Escalations happen in the daemon, which reports them with its status
+        try:
+            return decode_status_response(self._call(encode_status_request())).get('cascade')
+        except (OSError, ProtocolError, ServerError):
+            fallback = self._fallback
+            return fallback.cascade_stats() if fallback is not None else None
+
+    def memory_report(self):
+        # The model lives in the daemon; this worker only holds the client
+        return memory_report()
+
+    def is_warmed_up(self):
+        # Whether or not the daemon is up, a call can be answered now
+        return True
+
+    def on_warmed_up(self, callback):
+        try:
+            callback()
+        except Exception as e:
+            logger.error(f"Warm-up callback {callback.__name__} failed: {e}")
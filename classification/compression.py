@@ -0,0 +1,96 @@
+import numpy as np
+import scipy.sparse as sp
+from sklearn.base import clone
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+WEIGHT_DTYPES = ('float64', 'float32', 'int8')
+
+# Estimators whose coef_ can be pruned and stored sparsely
+COMPRESSIBLE_ESTIMATORS = ('LogisticRegression',)
+
+
+def prune_features(vectorizer, classifier, threshold=0.0):
+    """Drop vocabulary terms whose absolute weight is <= threshold in every class
+
+    Returns a new (vectorizer, classifier) pair over the remaining terms and
+    the number of terms dropped. Dropped terms no longer count towards the
+    l2 norm of a document, so probabilities shift even for threshold=0 and
+    a few top categories change; measure with benchmarks/model_compression.py.
+    """
+    if not isinstance(vectorizer, TfidfVectorizer):
+        raise ValueError("Only TF-IDF vocabularies can be pruned")
+    if type(classifier).__name__ not in COMPRESSIBLE_ESTIMATORS:
+        raise ValueError(f"Cannot prune a {type(classifier).__name__}")
+
+    keep = np.flatnonzero(np.abs(classifier.coef_).max(axis=0) > threshold)
+    terms = sorted(vectorizer.vocabulary_, key=vectorizer.vocabulary_.get)
+
+    pruned_vectorizer = clone(vectorizer).set_params(
+        vocabulary={terms[column]: i for i, column in enumerate(keep)})
+    pruned_vectorizer.idf_ = vectorizer.idf_[keep]
+
+    pruned_classifier = clone(classifier)
+    pruned_classifier.classes_ = classifier.classes_
+    pruned_classifier.coef_ = classifier.coef_[:, keep]
+    pruned_classifier.intercept_ = classifier.intercept_
+    pruned_classifier.n_features_in_ = len(keep)
+    return pruned_vectorizer, pruned_classifier, len(terms) - len(keep)
+
+
+def sparse_weight_arrays(coef, dtype):
+    """CSR arrays storing coef as float64, float32 or int8, one row per feature
+
+    The arrays hold coef.T, a column per class, so a scorer gathers the
+    class weights of a text's terms as rows. int8 values are scaled per
+    class so the largest magnitude maps to 127; the scales are returned as
+    'scale'.
+    """
+    if dtype not in WEIGHT_DTYPES:
+        raise ValueError(f"Unknown weight dtype '{dtype}', expected one of {WEIGHT_DTYPES}")
+    coef = np.asarray(coef)
+    features, classes = np.nonzero(coef.T)
+    data = coef[classes, features]
+    arrays = {
+        # Same index dtype for both, so scipy wraps them without copying
+        'indices': classes.astype(np.int32),
+        'indptr': np.concatenate(
+            [[0], np.cumsum(np.bincount(features, minlength=coef.shape[1]))]).astype(np.int32),
+    }
+    if dtype == 'int8':
+        scale = np.abs(coef).max(axis=1) / 127
+        scale[scale == 0] = 1
+        arrays['data'] = np.round(data / scale[classes]).astype(np.int8)
+        arrays['scale'] = scale.astype(np.float32)
+    else:
+        arrays['data'] = data.astype(dtype)
+    return arrays
+
+
+def sparse_weights(arrays, shape):
+    """coef, of shape (n_classes, n_features), as a CSC matrix over sparse_weight_arrays()
+
+    The index arrays are used as they are, so memory-mapped ones stay
+    shared between workers, and so is float64 data. sklearn only multiplies
+    sparse matrices of the same dtype, so float32 and int8 data is widened
+    to float64 once, privately: one value per stored weight, not the dense
+    matrix.
+    """
+    data = arrays['data']
+    if 'scale' in arrays:
+        data = data.astype(np.float32) * arrays['scale'][arrays['indices']]
+    weights = sp.csr_matrix((np.asarray(data, dtype=np.float64), arrays['indices'],
+                             arrays['indptr']), shape=(shape[1], shape[0]))
+    return weights.T
+
+
+def compress_model(vectorizer, classifier, threshold=0.0, weights='float32'):
+    """prune_features() plus the weight rounding of a sparse artifact of that dtype
+
+    Returns (vectorizer, classifier, pruned) scoring exactly like the model
+    save_artifact(..., weights=weights, sparse=True) writes, so it can be
+    evaluated and calibrated before it is saved.
+    """
+    vectorizer, classifier, pruned = prune_features(vectorizer, classifier, threshold)
+    classifier.coef_ = sparse_weights(sparse_weight_arrays(classifier.coef_, weights),
+                                      classifier.coef_.shape).toarray()
+    return vectorizer, classifier, pruned
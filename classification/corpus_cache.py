@@ -0,0 +1,215 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.base import clone
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from classification.artifact import corpus_hash
+from classification.nltk_preprocessing import NltkPreprocessor, build_lemma_table
+from classification.parallel_preprocessing import build_lemma_table_parallel, preprocess_parallel
+from classification.preprocessing import PREPROCESSING_CONFIG, TextPreprocessor
+
+logger = logging.getLogger(__name__)
+
+META_FILE = 'meta.json'
+
+
+def _entry_bytes(path):
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+class CorpusCache:
+    """Content-addressed disk cache of preprocessed corpora and feature matrices
+
+    Each entry is a directory named by the SHA-256 of everything that
+    determines its contents (the raw corpus hash, the preprocessing
+    configuration and, for features, the vectorizer settings), so changed
+    data or settings simply produce a new key and never read a stale entry.
+    Entries are written under a temporary name and renamed into place, like
+    artifacts. Reading an entry bumps its mtime, and whenever the cache
+    grows past max_bytes the least recently used entries are removed.
+    """
+
+    def __init__(self, root_dir, max_bytes=512 * 1024 * 1024):
+        self.root_dir = root_dir
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def key(*parts):
+        payload = json.dumps(parts, sort_keys=True, default=repr)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.root_dir, key)
+
+    def _open(self, key):
+        """Path of an entry, marked as just used, or None on a miss"""
+        path = self._path(key)
+        if not os.path.isfile(os.path.join(path, META_FILE)):
+            return None
+        os.utime(os.path.join(path, META_FILE))
+        return path
+
+    def _store(self, key, kind, description, write):
+        """Write an entry through write(tmp_dir), then enforce the size cap"""
+        os.makedirs(self.root_dir, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(prefix='.tmp-', dir=self.root_dir)
+        try:
+            write(tmp_dir)
+            with open(os.path.join(tmp_dir, META_FILE), 'w', encoding='utf-8') as f:
+                json.dump({'kind': kind, 'created_at': time.time(), 'description': description}, f)
+            if os.path.isdir(self._path(key)):
+                # Another process stored the same content first
+                shutil.rmtree(tmp_dir)
+            else:
+                os.replace(tmp_dir, self._path(key))
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        self.prune()
+
+    def preprocessed(self, corpus_sha256, build, preprocessing=PREPROCESSING_CONFIG):
+        """Return (lemma_table, processed texts), calling build() to make them on a miss"""
+        key = self.key('preprocessed', corpus_sha256, preprocessing)
+        path = self._open(key)
+        if path is not None:
+            with open(os.path.join(path, 'lemmas.json'), encoding='utf-8') as f:
+                lemma_table = json.load(f)
+            with open(os.path.join(path, 'texts.json'), encoding='utf-8') as f:
+                texts = json.load(f)
+            logger.info(f"Using cached preprocessed corpus {key[:12]}")
+            return lemma_table, texts
+
+        lemma_table, texts = build()
+        texts = list(texts)
+
+        def write(tmp_dir):
+            with open(os.path.join(tmp_dir, 'lemmas.json'), 'w', encoding='utf-8') as f:
+                json.dump(lemma_table, f, ensure_ascii=False)
+            with open(os.path.join(tmp_dir, 'texts.json'), 'w', encoding='utf-8') as f:
+                json.dump(texts, f, ensure_ascii=False)
+
+        self._store(key, 'preprocessed', {'corpus_sha256': corpus_sha256, 'texts': len(texts)}, write)
+        return lemma_table, texts
+
+    def features(self, texts_key, vectorizer, texts):
+        """Return a fitted clone of an unfitted TfidfVectorizer and its matrix for texts
+
+        texts_key identifies texts, e.g. the corpus hash they were
+        preprocessed from. Other vectorizers are fitted without caching.
+        """
+        if type(vectorizer) is not TfidfVectorizer:
+            return vectorizer, vectorizer.fit_transform(texts)
+        params = vectorizer.get_params()
+        key = self.key('features', texts_key, PREPROCESSING_CONFIG, params)
+        path = self._open(key)
+        if path is not None:
+            fitted = clone(vectorizer)
+            terms = np.load(os.path.join(path, 'vocabulary.npy'))
+            fitted.vocabulary_ = {term.decode('utf-8'): i for i, term in enumerate(terms)}
+            if fitted.use_idf:
+                fitted.idf_ = np.load(os.path.join(path, 'idf_.npy'))
+            logger.info(f"Using cached feature matrix {key[:12]}")
+            return fitted, sp.load_npz(os.path.join(path, 'X.npz'))
+
+        X = vectorizer.fit_transform(texts)
+
+        def write(tmp_dir):
+            vocabulary = sorted(vectorizer.vocabulary_, key=vectorizer.vocabulary_.get)
+            np.save(os.path.join(tmp_dir, 'vocabulary.npy'),
+                    np.array([term.encode('utf-8') for term in vocabulary], dtype=bytes))
+            if vectorizer.use_idf:
+                np.save(os.path.join(tmp_dir, 'idf_.npy'), vectorizer.idf_)
+            sp.save_npz(os.path.join(tmp_dir, 'X.npz'), X)
+
+        self._store(key, 'features', {'texts_key': texts_key, 'shape': list(X.shape),
+                                      'vectorizer': {k: repr(v) for k, v in params.items()}},
+                    write)
+        return vectorizer, X
+
+    def entries(self):
+        """One dict per entry (key, kind, bytes, created/last used times), most recent first"""
+        if not os.path.isdir(self.root_dir):
+            return []
+        entries = []
+        for key in os.listdir(self.root_dir):
+            meta_path = os.path.join(self._path(key), META_FILE)
+            if key.startswith('.') or not os.path.isfile(meta_path):
+                continue
+            with open(meta_path, encoding='utf-8') as f:
+                meta = json.load(f)
+            entries.append(dict(meta, key=key, bytes=_entry_bytes(self._path(key)),
+                                last_used=os.path.getmtime(meta_path)))
+        return sorted(entries, key=lambda entry: entry['last_used'], reverse=True)
+
+    def _is_entry(self, key):
+        # Rejects '', '.', '..', temporary directories and anything with a path separator
+        return (bool(key) and not key.startswith('.') and os.path.basename(key) == key
+                and os.path.isfile(os.path.join(self._path(key), META_FILE)))
+
+    def resolve(self, prefix):
+        """The full key of the one entry whose key starts with prefix
+
+        Raises ValueError when no entry or several entries match.
+        """
+        matches = [entry['key'] for entry in self.entries()
+                   if prefix and entry['key'].startswith(prefix)]
+        if not matches:
+            raise ValueError(f"No cache entry matches {prefix!r}")
+        if len(matches) > 1:
+            raise ValueError(f"{prefix!r} matches {len(matches)} cache entries; "
+                             f"give more of the key")
+        return matches[0]
+
+    def remove(self, key):
+        """Delete the entry with this full key; raises ValueError if there is none"""
+        if not self._is_entry(key):
+            raise ValueError(f"No cache entry {key!r}")
+        # Another process may be pruning the same entry
+        shutil.rmtree(self._path(key), ignore_errors=True)
+
+    def clear(self):
+        for entry in self.entries():
+            self.remove(entry['key'])
+
+    def prune(self):
+        """Remove least recently used entries until the cache fits max_bytes"""
+        entries = self.entries()
+        total = sum(entry['bytes'] for entry in entries)
+        removed = 0
+        while entries and total > self.max_bytes:
+            entry = entries.pop()
+            self.remove(entry['key'])
+            total -= entry['bytes']
+            removed += 1
+        return removed
+
+
+def preprocess_corpus(train_data, nltk_data_dir, cache=None, processes=1, progress=None):
+    """Lemma table and preprocessed texts of a training DataFrame
+
+    Building the lemma table runs NLTK over every token of the corpus and
+    dominates training time, so with a CorpusCache both are reused for as
+    long as the corpus and PREPROCESSING_CONFIG stay the same. On a miss,
+    processes other than 1 spread the work over a process pool (None for
+    one per core), reporting to progress as parallel_preprocessing does.
+    """
+    def build():
+        texts = train_data['text']
+        if processes == 1:
+            lemma_table = build_lemma_table(texts, NltkPreprocessor(nltk_data_dir))
+            preprocess = TextPreprocessor(lemma_table).preprocess
+            return lemma_table, [preprocess(text) for text in texts]
+        lemma_table = build_lemma_table_parallel(texts, nltk_data_dir, processes, progress=progress)
+        return lemma_table, preprocess_parallel(texts, lemma_table, processes, progress=progress)
+
+    if cache is None:
+        return build()
+    return cache.preprocessed(corpus_hash(train_data['text'], train_data['category']), build)
@@ -0,0 +1,155 @@
+"""Near-duplicate detection for training corpora with MinHash and LSH banding
+
+Texts are compared as sets of word shingles (normalized as for
+classification, but keeping stop words). A MinHash signature estimates the
+Jaccard similarity of two such sets by the fraction of positions where the
+signatures agree. LSH banding only pairs texts that agree on every row of
+at least one band, so finding candidates costs a sort per band instead of a
+comparison per pair; each candidate pair is then checked against the
+similarity threshold and clusters are the connected components of the pairs
+that pass.
+"""
+from collections import Counter
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.csgraph import connected_components
+from sklearn.utils import murmurhash3_32
+
+from classification.preprocessing import normalize, tokenize
+
+# Mersenne prime for the (a * x + b) mod p permutations; products of two
+# values below 2 ** 32 fit in uint64
+_PRIME = (1 << 31) - 1
+
+
+def shingles(text, size=2):
+    """Distinct word n-grams of a text, or its words if it has fewer than size"""
+    tokens = tokenize(normalize(text))
+    if len(tokens) < size:
+        return set(tokens)
+    return {' '.join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+
+
+def lsh_bands(num_perm, threshold):
+    """Band layout for a similarity threshold, as (bands, rows)
+
+    Picks the largest rows whose candidate threshold (1 / bands) ** (1 / rows)
+    stays at or below threshold, favouring recall; the similarity check in
+    similar_pairs() then removes the extra candidates.
+    """
+    best = (1, num_perm)
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        if (1 / bands) ** (1 / rows) <= threshold:
+            best = (bands, rows)
+    return best
+
+
+class MinHasher:
+    def __init__(self, num_perm=128, shingle_size=2, seed=0):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self._a = rng.integers(1, _PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, _PRIME, size=num_perm, dtype=np.uint64)
+
+    def signatures(self, texts, chunk_size=10000, perm_block=16):
+        """(len(texts), num_perm) uint32 MinHash signatures
+
+        Texts are hashed chunk by chunk and permutations applied perm_block
+        at a time, which bounds the temporary arrays to about
+        chunk_size * shingles per text * perm_block values.
+        """
+        texts = list(texts)
+        result = np.empty((len(texts), self.num_perm), dtype=np.uint32)
+        for start in range(0, len(texts), chunk_size):
+            hashes, counts = [], []
+            for text in texts[start:start + chunk_size]:
+                # Texts without any token all share one placeholder shingle
+                values = {murmurhash3_32(s, positive=True)
+                          for s in shingles(text, self.shingle_size)} or {0}
+                hashes.extend(values)
+                counts.append(len(values))
+            x = np.array(hashes, dtype=np.uint64) % _PRIME
+            offsets = np.concatenate([[0], np.cumsum(counts)[:-1]])
+            rows = slice(start, start + len(counts))
+            for block in range(0, self.num_perm, perm_block):
+                perms = slice(block, block + perm_block)
+                permuted = (self._a[perms, None] * x + self._b[perms, None]) % _PRIME
+                result[rows, perms] = np.minimum.reduceat(permuted, offsets, axis=1).T
+        return result
+
+
+def similar_pairs(signatures, threshold, bands=None, rows=None, chunk_size=1000000):
+    """(i, j) index arrays of candidate pairs with estimated Jaccard >= threshold
+
+    In each band, every text whose rows match an earlier text's is paired
+    with the first text of that bucket, so the number of candidates grows
+    with the number of texts times bands rather than with bucket sizes
+    squared; a cluster stays connected through its first member.
+    """
+    n, num_perm = signatures.shape
+    if bands is None:
+        bands, rows = lsh_bands(num_perm, threshold)
+    index = np.arange(n)
+    candidates = []
+    for band in range(bands):
+        keys = np.ascontiguousarray(signatures[:, band * rows:(band + 1) * rows])
+        keys = keys.view(np.dtype((np.void, keys.dtype.itemsize * rows))).ravel()
+        _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        leader = first[inverse.ravel()]
+        paired = leader != index
+        candidates.append(np.stack([index[paired], leader[paired]], axis=1))
+    pairs = np.unique(np.concatenate(candidates), axis=0) if candidates else np.zeros((0, 2), int)
+
+    keep = np.zeros(len(pairs), dtype=bool)
+    for start in range(0, len(pairs), chunk_size):
+        i, j = pairs[start:start + chunk_size].T
+        keep[start:start + len(i)] = (signatures[i] == signatures[j]).mean(axis=1) >= threshold
+    return pairs[keep, 0], pairs[keep, 1]
+
+
+def cluster_labels(n, i, j):
+    """Connected component of each of n texts given similar pairs (i, j)"""
+    graph = sp.coo_matrix((np.ones(len(i), dtype=np.int8), (i, j)), shape=(n, n))
+    return connected_components(graph, directed=False)[1]
+
+
+def find_near_duplicates(texts, threshold=0.7, num_perm=128, shingle_size=2, seed=0):
+    """Cluster label per text; texts with the same label are near-duplicates"""
+    signatures = MinHasher(num_perm, shingle_size, seed).signatures(texts)
+    return cluster_labels(len(signatures), *similar_pairs(signatures, threshold))
+
+
+def deduplicate(labels, categories, conflicts='majority'):
+    """Pick the texts to keep, one per cluster
+
+    Returns (keep, conflicting): a boolean mask over the texts and a list of
+    (cluster member indices, Counter of their categories) for clusters whose
+    members carry different categories. With conflicts='majority' such a
+    cluster keeps its first text of the most common category (the cluster
+    is dropped on a tie); with 'drop' it is dropped entirely. Categories of
+    None mark unlabelled texts, which never conflict; a cluster keeps a
+    labelled text when it has one.
+    """
+    if conflicts not in ('majority', 'drop'):
+        raise ValueError(f"Unknown conflict policy '{conflicts}'")
+    categories = np.asarray(categories, dtype=object)
+    order = np.argsort(labels, kind='stable')
+    boundaries = np.flatnonzero(np.diff(labels[order])) + 1
+    keep = np.zeros(len(labels), dtype=bool)
+    conflicting = []
+    for members in np.split(order, boundaries):
+        if len(members) == 0:
+            continue
+        counts = Counter(category for category in categories[members] if category is not None)
+        if len(counts) <= 1:
+            labelled = [member for member in members if categories[member] is not None]
+            keep[(labelled or members)[0]] = True
+            continue
+        conflicting.append((members, counts))
+        (top, top_count), (_, runner_up) = counts.most_common(2)
+        if conflicts == 'majority' and top_count > runner_up:
+            keep[members[categories[members] == top][0]] = True
+    return keep, conflicting
@@ -0,0 +1,129 @@
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.metrics import confusion_matrix, precision_recall_fscore_support
+from sklearn.model_selection import StratifiedKFold
+
+from classification.compression import compress_model
+from classification.training import DEFAULT_BACKEND, build_estimators
+
+
+def estimators_from_manifest(manifest):
+    """Unfitted (vectorizer, classifier) configured like an artifact's model
+
+    The manifest's vectorizer section only holds what transform() needs;
+    settings that only matter while fitting, such as max_features, are
+    taken from metrics['vectorizer_params'] when the trainer recorded them.
+    """
+    vectorizer_params = dict(manifest['vectorizer'],
+                             **manifest['metrics'].get('vectorizer_params', {}))
+    vectorizer_params = {key: tuple(value) if isinstance(value, list) else value
+                         for key, value in vectorizer_params.items()}
+    return build_estimators(manifest['backend'], vectorizer_params,
+                            manifest['estimator']['params'])
+
+
+def _fit_fold(estimators, texts, categories, train_index, test_index):
+    vectorizer, classifier = estimators
+    classifier.fit(vectorizer.fit_transform(texts[train_index]), categories[train_index])
+    return test_index, classifier.predict(vectorizer.transform(texts[test_index]))
+
+
+def cross_validate(texts, categories, backend=DEFAULT_BACKEND, folds=5, n_jobs=None,
+                   estimators=None, random_state=0):
+    """Stratified k-fold evaluation of a backend on preprocessed texts
+
+    Every fold fits a fresh vectorizer and classifier on its training part,
+    so vocabulary and idf never see the held-out texts; folds run in
+    parallel worker processes (n_jobs as in joblib, -1 for every core).
+    estimators overrides the backend with an unfitted (vectorizer,
+    classifier) pair. The same random_state always gives the same folds,
+    so reports from different configurations are directly comparable.
+
+    Returns a JSON-serializable report: accuracy and macro F1 over the
+    pooled out-of-fold predictions, accuracy per fold, precision, recall,
+    F1 and support per category, and the confusion matrix (rows are true
+    categories, columns predicted, both in 'labels' order).
+    """
+    texts = np.asarray(texts, dtype=object)
+    categories = np.asarray(categories, dtype=object)
+    if estimators is None:
+        estimators = build_estimators(backend)
+    splits = StratifiedKFold(n_splits=folds, shuffle=True, random_state=random_state)
+
+    fold_results = Parallel(n_jobs=n_jobs)(
+        delayed(_fit_fold)(estimators, texts, categories, train_index, test_index)
+        for train_index, test_index in splits.split(texts, categories))
+
+    predicted = np.empty(len(texts), dtype=object)
+    for test_index, fold_predicted in fold_results:
+        predicted[test_index] = fold_predicted
+
+    labels = sorted(set(categories))
+    precision, recall, f1, support = precision_recall_fscore_support(
+        categories, predicted, labels=labels, zero_division=0)
+    return {
+        'backend': backend,
+        'folds': folds,
+        'n_samples': len(texts),
+        'accuracy': float(np.mean(predicted == categories)),
+        'macro_f1': float(np.mean(f1)),
+        'fold_accuracy': [float(np.mean(fold_predicted == categories[test_index]))
+                          for test_index, fold_predicted in fold_results],
+        'per_category': {
+            label: {'precision': float(p), 'recall': float(r), 'f1': float(f), 'support': int(s)}
+            for label, p, r, f, s in zip(labels, precision, recall, f1, support)
+        },
+        'labels': labels,
+        'confusion_matrix': confusion_matrix(categories, predicted, labels=labels).tolist(),
+    }
+
+
+def _proba_fold(estimators, texts, categories, train_index, test_index, compress):
+    vectorizer, classifier = estimators
+    classifier.fit(vectorizer.fit_transform(texts[train_index]), categories[train_index])
+    if compress is not None:
+        vectorizer, classifier, _ = compress_model(vectorizer, classifier, *compress)
+    return test_index, classifier.classes_, classifier.predict_proba(
+        vectorizer.transform(texts[test_index]))
+
+
+def out_of_fold_proba(texts, categories, backend=DEFAULT_BACKEND, folds=5, n_jobs=None,
+                      estimators=None, random_state=0, compress=None):
+    """Class probabilities of every text from a model that never saw it
+
+    Folds are fitted as in cross_validate(); with compress, a (prune
+    threshold, weight dtype) pair, each fold's model is pruned and its
+    weights rounded as compress_model() does before it predicts. Returns
+    (probs, labels): one row per text, columns in sorted label order; a
+    class missing from a fold's training part gets probability 0 in that
+    fold.
+    """
+    texts = np.asarray(texts, dtype=object)
+    categories = np.asarray(categories, dtype=object)
+    if estimators is None:
+        estimators = build_estimators(backend)
+    splits = StratifiedKFold(n_splits=folds, shuffle=True, random_state=random_state)
+
+    fold_results = Parallel(n_jobs=n_jobs)(
+        delayed(_proba_fold)(estimators, texts, categories, train_index, test_index, compress)
+        for train_index, test_index in splits.split(texts, categories))
+
+    labels = sorted(set(categories))
+    column = {label: i for i, label in enumerate(labels)}
+    probs = np.zeros((len(texts), len(labels)))
+    for test_index, classes, fold_probs in fold_results:
+        probs[np.ix_(test_index, [column[label] for label in classes])] = fold_probs
+    return probs, labels
+
+
+def compare_reports(report, baseline):
+    """Differences report - baseline in accuracy, macro F1 and per-category F1"""
+    return {
+        'accuracy': report['accuracy'] - baseline['accuracy'],
+        'macro_f1': report['macro_f1'] - baseline['macro_f1'],
+        'per_category_f1': {
+            label: scores['f1'] - baseline['per_category'][label]['f1']
+            for label, scores in report['per_category'].items()
+            if label in baseline['per_category']
+        },
+    }
@@ -0,0 +1,196 @@
+"""Full-text search over complaint titles and descriptions with SQLite FTS5
+
+complaints_fts is an external-content FTS5 table over the complaints table
+of the application database: it stores only the inverted index and reads
+titles and descriptions from complaints itself. Triggers on complaints keep
+it in sync with every insert, update and delete, whichever process or ORM
+session makes them. Complaints stored before the table existed are indexed
+by rebuild() (see rebuild_search_index.py).
+
+Words are matched after Porter stemming and case and accent folding, so
+"harassed" finds "harassment"; prefix indexes make "harass*" cheap. Results
+are ranked by BM25 with title matches weighted double, or listed newest
+first. FTS5 yields matches in rowid order, so listing the newest first
+reads no more matches than the page needs; ranking scores the newest
+rank_limit matches and counting stops at count_limit, which keeps queries
+matching a large share of millions of complaints interactive.
+"""
+import re
+import sqlite3
+from contextlib import closing, contextmanager
+
+from markupsafe import Markup, escape
+
+FTS_TABLE = 'complaints_fts'
+
+_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS complaints_fts USING fts5(
+    title, description,
+    content='complaints', content_rowid='id',
+    tokenize='porter unicode61 remove_diacritics 2', prefix='2 3'
+);
+CREATE TRIGGER IF NOT EXISTS complaints_fts_insert AFTER INSERT ON complaints BEGIN
+    INSERT INTO complaints_fts (rowid, title, description)
+    VALUES (new.id, new.title, new.description);
+END;
+CREATE TRIGGER IF NOT EXISTS complaints_fts_delete AFTER DELETE ON complaints BEGIN
+    INSERT INTO complaints_fts (complaints_fts, rowid, title, description)
+    VALUES ('delete', old.id, old.title, old.description);
+END;
+CREATE TRIGGER IF NOT EXISTS complaints_fts_update AFTER UPDATE OF id, title, description
+ON complaints BEGIN
+    INSERT INTO complaints_fts (complaints_fts, rowid, title, description)
+    VALUES ('delete', old.id, old.title, old.description);
+    INSERT INTO complaints_fts (rowid, title, description)
+    VALUES (new.id, new.title, new.description);
+END;
+"""
+
+# BM25 column weights: title, description
+_RANK = 'bm25(2.0, 1.0)'
+
+# Highlight markers; control characters never occur in stored text, and are
+# turned into <mark> tags only after the text around them is escaped
+_OPEN, _CLOSE = '\x02', '\x03'
+
+_QUERY_TERM = re.compile(r'"([^"]*)"?|(\S+)')
+
+ORDERS = ('rank', 'newest')
+
+
+def match_expression(query):
+    """FTS5 MATCH expression for a search box query, or None if it has no words
+
+    Every word and "quoted phrase" must occur; a word ending in * matches
+    as a prefix. FTS5 operators and punctuation in the query are taken as
+    plain text, so no query is a syntax error.
+    """
+    terms = []
+    for phrase, word in _QUERY_TERM.findall(query):
+        text = phrase if not word else word.rstrip('*')
+        if not re.search(r'\w', text):
+            continue
+        term = '"' + text.replace('"', '') + '"'
+        terms.append(term + '*' if word.endswith('*') else term)
+    return ' '.join(terms) or None
+
+
+def _highlighted(text):
+    return Markup(str(escape(text)).replace(_OPEN, '<mark>').replace(_CLOSE, '</mark>'))
+
+
+class ComplaintSearch:
+    def __init__(self, path):
+        self.path = path
+
+    @contextmanager
+    def _connect(self):
+        with closing(sqlite3.connect(self.path, timeout=30)) as conn, conn:
+            yield conn
+
+    def install(self):
+        """Create the FTS table and its triggers if missing; returns whether they were
+
+        A newly created table is empty: complaints already stored only
+        become searchable after rebuild().
+        """
+        with self._connect() as conn:
+            exists = conn.execute("SELECT 1 FROM sqlite_master WHERE name = ?",
+                                  (FTS_TABLE,)).fetchone() is not None
+            conn.executescript(_SCHEMA)
+            if not exists:
+                conn.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rank) VALUES ('rank', ?)",
+                             (_RANK,))
+        return not exists
+
+    def rebuild(self):
+        """Reindex every stored complaint and merge the index into one segment
+
+        Returns the number of complaints indexed.
+        """
+        self.install()
+        with self._connect() as conn:
+            conn.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('rebuild')")
+            conn.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+            return conn.execute("SELECT COUNT(*) FROM complaints").fetchone()[0]
+
+    def check(self):
+        """Whether the index matches the complaints table"""
+        with self._connect() as conn:
+            try:
+                conn.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rank)"
+                             " VALUES ('integrity-check', 1)")
+            except sqlite3.DatabaseError:
+                return False
+        return True
+
+    def search(self, query, page=1, per_page=20, department=None, order='rank',
+               snippet_tokens=24, count_limit=1000, rank_limit=10000):
+        """One page of complaints matching a search box query
+
+        Returns a dict with the page's results (complaint fields, the title
+        and a description snippet as HTML-safe Markup with matches in
+        <mark>, and when ranked the BM25 score, lower is better), the number
+        of matches up to count_limit, and whether that count is exact.
+        Ranking scores only the rank_limit most recent matches, which bounds
+        the cost of a query matching a large share of all complaints.
+        """
+        if order not in ORDERS:
+            raise ValueError(f"Unknown order '{order}'")
+        expression = match_expression(query)
+        if expression is None:
+            return {'results': [], 'total': 0, 'total_exact': True}
+
+        where = f"{FTS_TABLE} MATCH ?"
+        params = [expression]
+        source = FTS_TABLE
+        if department is not None:
+            where += " AND complaints.department = ?"
+            params.append(department)
+            source += f" JOIN complaints ON complaints.id = {FTS_TABLE}.rowid"
+        # Scoring needs statistics over every match, so newest first skips it
+        newest = (f"SELECT {FTS_TABLE}.rowid, {'rank' if order == 'rank' else 'NULL'}"
+                  f" FROM {source} WHERE {where} ORDER BY {FTS_TABLE}.rowid DESC")
+
+        with self._connect() as conn:
+            if order == 'rank':
+                page_ids = conn.execute(
+                    f"SELECT * FROM ({newest} LIMIT ?) ORDER BY 2 LIMIT ? OFFSET ?",
+                    params + [rank_limit, per_page, (page - 1) * per_page]).fetchall()
+            else:
+                page_ids = conn.execute(f"{newest} LIMIT ? OFFSET ?",
+                                        params + [per_page, (page - 1) * per_page]).fetchall()
+            # Highlighting runs on the page's complaints only
+            rows = conn.execute(
+                "SELECT complaints.id, complaints.category, complaints.department,"
+                " complaints.status, complaints.created_at,"
+                f" highlight({FTS_TABLE}, 0, ?, ?), snippet({FTS_TABLE}, 1, ?, ?, '…', ?)"
+                f" FROM {FTS_TABLE} JOIN complaints ON complaints.id = {FTS_TABLE}.rowid"
+                f" WHERE {FTS_TABLE} MATCH ? AND {FTS_TABLE}.rowid IN"
+                f" ({','.join('?' * len(page_ids))})",
+                [_OPEN, _CLOSE, _OPEN, _CLOSE, snippet_tokens, expression]
+                + [complaint_id for complaint_id, _ in page_ids]).fetchall()
+            total = conn.execute(
+                f"SELECT COUNT(*) FROM (SELECT 1 FROM {source} WHERE {where} LIMIT ?)",
+                params + [count_limit + 1]).fetchone()[0]
+
+        details = {row[0]: row for row in rows}
+        results = []
+        for complaint_id, score in page_ids:
+            _, category, complaint_department, status, created_at, title, snippet = \
+                details[complaint_id]
+            results.append({
+                'id': complaint_id,
+                'category': category,
+                'department': complaint_department,
+                'status': status,
+                'created_at': created_at,
+                'title': _highlighted(title),
+                'snippet': _highlighted(snippet),
+                'score': score,
+            })
+        return {
+            'results': results,
+            'total': min(total, count_limit),
+            'total_exact': total <= count_limit,
+        }
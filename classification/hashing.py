@@ -0,0 +1,70 @@
+import numpy as np
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.preprocessing import normalize
+
+
+class HashingTfidfVectorizer:
+    """TF-IDF over a fixed-width hashed feature space, with no vocabulary
+
+    Terms are mapped to columns by HashingVectorizer, so transform() needs no
+    fitted state beyond the optional idf array and memory does not grow with
+    the corpus. Document frequencies are plain per-column counts, which lets
+    partial_fit() fold in new documents chunk by chunk. The idf formula and
+    tokenization match TfidfVectorizer with smooth_idf=True.
+    """
+
+    def __init__(self, n_features=2 ** 18, ngram_range=(1, 1), stop_words=None,
+                 use_idf=True, norm='l2'):
+        self.n_features = n_features
+        self.ngram_range = tuple(ngram_range)
+        self.stop_words = stop_words
+        self.use_idf = use_idf
+        self.norm = norm
+        self._hasher = HashingVectorizer(
+            n_features=n_features, ngram_range=self.ngram_range, stop_words=stop_words,
+            alternate_sign=False, norm=None)
+        self.doc_freq = np.zeros(n_features, dtype=np.int64)
+        self.n_docs = 0
+        self.idf_ = None
+
+    def _update_idf(self):
+        self.idf_ = np.log((1 + self.n_docs) / (1 + self.doc_freq)) + 1
+
+    def _add_counts(self, counts):
+        # Rows have their duplicates summed, so each column index appears
+        # once per document that contains it
+        self.doc_freq += np.bincount(counts.indices, minlength=self.n_features)
+        self.n_docs += counts.shape[0]
+        if self.use_idf:
+            self._update_idf()
+
+    def _reset(self):
+        self.doc_freq = np.zeros(self.n_features, dtype=np.int64)
+        self.n_docs = 0
+
+    def _weight(self, X):
+        if self.use_idf:
+            # Scale the stored values in place; a diagonal matrix product
+            # would cost O(n_features) per call
+            X.data *= self.idf_[X.indices]
+        if self.norm:
+            X = normalize(X, norm=self.norm, copy=False)
+        return X
+
+    def partial_fit(self, raw_documents):
+        """Add the document frequencies of a chunk of documents"""
+        self._add_counts(self._hasher.transform(raw_documents))
+        return self
+
+    def fit(self, raw_documents):
+        self._reset()
+        return self.partial_fit(raw_documents)
+
+    def transform(self, raw_documents):
+        return self._weight(self._hasher.transform(raw_documents))
+
+    def fit_transform(self, raw_documents):
+        self._reset()
+        counts = self._hasher.transform(raw_documents)
+        self._add_counts(counts)
+        return self._weight(counts)
@@ -0,0 +1,65 @@
+import sqlite3
+from collections import namedtuple
+from contextlib import closing, contextmanager
+from datetime import datetime
+
+Correction = namedtuple(
+    'Correction',
+    'id complaint_id text category previous_category corrected_by created_at')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS corrections (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    complaint_id INTEGER,
+    text TEXT NOT NULL,
+    category TEXT NOT NULL,
+    previous_category TEXT,
+    corrected_by INTEGER,
+    created_at TEXT NOT NULL
+)
+"""
+
+
+class LabelStore:
+    """Append-only log of admin category corrections in a SQLite file
+
+    Every web worker and the classification daemon open the same file, so a
+    correction recorded by one process is visible to whichever one runs the
+    next model update. Ids only ever increase, which lets an artifact record
+    the last correction it has learned from.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with self._connect() as conn:
+            conn.execute(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        # Commit on success and always close; sqlite3's own context manager
+        # only handles the transaction
+        with closing(sqlite3.connect(self.path, timeout=30)) as conn, conn:
+            yield conn
+
+    def add(self, text, category, previous_category=None, complaint_id=None, corrected_by=None):
+        """Record a correction and return its id"""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT INTO corrections (complaint_id, text, category, previous_category,"
+                " corrected_by, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (complaint_id, text, category, previous_category, corrected_by,
+                 datetime.utcnow().isoformat()))
+            return cursor.lastrowid
+
+    def since(self, after_id=0):
+        """Corrections with an id greater than after_id, oldest first"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id, complaint_id, text, category, previous_category, corrected_by,"
+                " created_at FROM corrections WHERE id > ? ORDER BY id",
+                (after_id,)).fetchall()
+        return [Correction(*row) for row in rows]
+
+    def count(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM corrections").fetchone()[0]
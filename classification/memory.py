@@ -0,0 +1,66 @@
+"""Shared versus private memory of the current process (Linux /proc only)"""
+import os
+
+_FIELDS = {
+    'Rss': 'rss_kb',
+    'Pss': 'pss_kb',
+    'Shared_Clean': 'shared_clean_kb',
+    'Shared_Dirty': 'shared_dirty_kb',
+    'Private_Clean': 'private_clean_kb',
+    'Private_Dirty': 'private_dirty_kb',
+}
+
+
+def _add_field(totals, line):
+    name, _, rest = line.partition(':')
+    key = _FIELDS.get(name)
+    if key:
+        totals[key] = totals.get(key, 0) + int(rest.split()[0])
+
+
+def _summarize(totals):
+    totals['shared_kb'] = totals.get('shared_clean_kb', 0) + totals.get('shared_dirty_kb', 0)
+    totals['private_kb'] = totals.get('private_clean_kb', 0) + totals.get('private_dirty_kb', 0)
+    return totals
+
+
+def process_memory():
+    """Whole-process totals from /proc/self/smaps_rollup, or None if unavailable"""
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            totals = {}
+            for line in f:
+                _add_field(totals, line)
+    except OSError:
+        return None
+    return _summarize(totals)
+
+
+def mapped_file_memory(directory):
+    """Per-file totals for memory-mapped files under directory, from /proc/self/smaps"""
+    directory = os.path.realpath(directory)
+    files = {}
+    current = None
+    try:
+        with open('/proc/self/smaps') as f:
+            for line in f:
+                first = line.split(None, 1)[0]
+                if not first.endswith(':'):
+                    # Mapping header: address perms offset dev inode [path]
+                    parts = line.split(None, 5)
+                    path = parts[5].strip() if len(parts) > 5 else ''
+                    current = files.setdefault(path, {}) if path.startswith(directory) else None
+                elif current is not None:
+                    _add_field(current, line)
+    except OSError:
+        return None
+    return {os.path.basename(path): _summarize(totals) for path, totals in files.items()}
+
+
+def memory_report(model_dir=None):
+    """Shared/private breakdown for this worker, plus its mapped model files"""
+    return {
+        'pid': os.getpid(),
+        'process': process_memory(),
+        'model_files': mapped_file_memory(model_dir) if model_dir else None,
+    }
@@ -0,0 +1,85 @@
+"""Reference NLTK preprocessing pipeline
+
+Only needed offline: train_classifier.py uses it to build the lemma table
+stored in the model artifact, and the preprocessing benchmark checks the
+fast TextPreprocessor against it.
+"""
+from nltk.corpus import stopwords, wordnet
+from nltk.stem import WordNetLemmatizer
+from nltk.tokenize import word_tokenize
+
+from classification.nltk_resources import ensure_nltk_resources
+from classification.preprocessing import normalize, tokenize
+
+
+class NltkPreprocessor:
+    def __init__(self, data_dir):
+        # Load vendored NLTK resources (see vendor_nltk_data.py)
+        ensure_nltk_resources(data_dir)
+
+        self.lemmatizer = WordNetLemmatizer()
+        self.stop_words = set(stopwords.words('english'))
+
+    def preprocess(self, text):
+        """Clean and preprocess text for classification"""
+        # Lowercase, remove punctuation and tokenize
+        tokens = word_tokenize(normalize(text))
+        # Remove stopwords and lemmatize
+        tokens = [self.lemmatizer.lemmatize(token)
+                  for token in tokens
+                  if token not in self.stop_words and len(token) > 2]
+        return ' '.join(tokens)
+
+
+def _is_wordnet_noun(word):
+    # morphy() returns the word itself only when it is in the noun index
+    return wordnet.morphy(word, wordnet.NOUN) == word
+
+
+def _noun_exception_forms():
+    """Irregular noun forms listed in WordNet's noun.exc"""
+    with wordnet.open('noun.exc') as f:
+        for line in f:
+            form = line.split(' ', 1)[0]
+            if form and '_' not in form:
+                yield form
+
+
+def corpus_tokens(texts, stop_words):
+    """Distinct tokens of texts that TextPreprocessor would lemmatize"""
+    tokens = set()
+    for text in texts:
+        tokens.update(token for token in tokenize(normalize(text))
+                      if len(token) > 2 and token not in stop_words)
+    return tokens
+
+
+def lemma_table_tokens(token_sets):
+    """Sorted tokens a lemma table must cover: the corpus's plus irregular noun forms"""
+    return sorted(set(_noun_exception_forms()).union(*token_sets))
+
+
+def lemmatize_tokens(tokens, reference):
+    """(lemma, lemma is a WordNet noun) for each token"""
+    lemmas = [reference.lemmatizer.lemmatize(token) for token in tokens]
+    return [(lemma, _is_wordnet_noun(lemma)) for lemma in lemmas]
+
+
+def assemble_lemma_table(tokens, lemmatized, stop_words):
+    return {
+        'lemmas': {token: lemma for token, (lemma, _) in zip(tokens, lemmatized)},
+        'noun_lemmas': sorted({lemma for lemma, is_noun in lemmatized if is_noun}),
+        'stop_words': sorted(stop_words),
+    }
+
+
+def build_lemma_table(texts, reference):
+    """Precompute token -> lemma for every token of a corpus
+
+    Covers each token the corpus produces plus WordNet's irregular noun
+    forms, so TextPreprocessor can lemmatize without WordNet at runtime.
+    parallel_preprocessing.build_lemma_table_parallel() splits the same
+    steps across processes.
+    """
+    tokens = lemma_table_tokens([corpus_tokens(texts, reference.stop_words)])
+    return assemble_lemma_table(tokens, lemmatize_tokens(tokens, reference), reference.stop_words)
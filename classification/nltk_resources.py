@@ -0,0 +1,37 @@
+import os
+
+import nltk
+
+# NLTK packages the preprocessing pipeline needs, with the files nltk.data
+# loads from each one, relative to a data directory. A package directory can
+# exist without them (punkt without its PY3 pickles), so the files are checked.
+NLTK_RESOURCES = {
+    'punkt': ('tokenizers/punkt/PY3/english.pickle',),
+    'stopwords': ('corpora/stopwords/english',),
+    'wordnet': ('corpora/wordnet/index.noun', 'corpora/wordnet/data.noun',
+                'corpora/wordnet/noun.exc'),
+}
+
+
+class MissingNltkResourceError(LookupError):
+    """Raised when a vendored NLTK resource cannot be found locally"""
+
+
+def ensure_nltk_resources(data_dir):
+    """Make the vendored NLTK data directory the first place nltk looks
+
+    Only data_dir itself is checked, not a system-wide NLTK install, and
+    nothing is downloaded. Raises MissingNltkResourceError naming every
+    missing file.
+    """
+    if data_dir not in nltk.data.path:
+        nltk.data.path.insert(0, data_dir)
+
+    missing = [f"{path} ({name})" for name, files in NLTK_RESOURCES.items() for path in files
+               if not os.path.exists(os.path.join(data_dir, path))]
+
+    if missing:
+        raise MissingNltkResourceError(
+            f"NLTK data {', '.join(missing)} not found in {data_dir}; "
+            f"run 'python vendor_nltk_data.py' on a machine with network access "
+            f"and ship the resulting directory with the deployment")
@@ -0,0 +1,157 @@
+import fcntl
+import logging
+import os
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+from classification.artifact import corpus_hash, load_artifact, prune_versions, save_artifact
+from classification.preprocessing import PREPROCESSING_CONFIG, TextPreprocessor
+from classification.training import INCREMENTAL_BACKENDS
+from training_data import get_training_data
+
+logger = logging.getLogger(__name__)
+
+UPDATE_LOCK_FILE = '.update.lock'
+
+
+@contextmanager
+def _update_lock(artifact_dir):
+    # Every worker may run an updater; the lock makes them take turns so
+    # each batch of corrections is published exactly once
+    os.makedirs(artifact_dir, exist_ok=True)
+    with open(os.path.join(artifact_dir, UPDATE_LOCK_FILE), 'w') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def update_model(artifact_dir, label_store, corpus_sha256=None, preprocessing=None, epochs=5,
+                 keep_versions=0):
+    """Fold corrections the CURRENT artifact has not seen into a new version
+
+    Only the new corrections are vectorized and passed to partial_fit(), so
+    the cost grows with the number of corrections, not the corpus. Returns
+    the new version, or None when there was nothing to learn. Corrections to
+    a category the model was not trained on are skipped. With keep_versions,
+    only that many versions are left in artifact_dir afterwards, plus the
+    one CURRENT names.
+    """
+    with _update_lock(artifact_dir):
+        # Loaded without mmap: partial_fit() updates the arrays in place
+        artifact = load_artifact(artifact_dir, corpus_sha256=corpus_sha256,
+                                 preprocessing=preprocessing)
+        lineage = artifact.manifest.get('lineage', {})
+        corrections = label_store.since(lineage.get('labels_through', 0))
+        labels = set(artifact.labels)
+        usable = [c for c in corrections if c.category in labels]
+        if not usable:
+            return None
+
+        backend = artifact.manifest['backend']
+        if backend not in INCREMENTAL_BACKENDS:
+            raise ValueError(f"Backend '{backend}' cannot be updated incrementally; retrain "
+                             f"with one of {list(INCREMENTAL_BACKENDS)}")
+
+        preprocessor = TextPreprocessor(artifact.lemma_table)
+        texts = [preprocessor.preprocess(c.text) for c in usable]
+        categories = [c.category for c in usable]
+
+        vectorizer, classifier = artifact.vectorizer, artifact.classifier
+        vectorizer.partial_fit(texts)
+        X = vectorizer.transform(texts)
+        # Artifacts store weights column-major; SGD updates rows in place
+        classifier.coef_ = np.ascontiguousarray(classifier.coef_)
+        for _ in range(epochs):
+            classifier.partial_fit(X, categories)
+
+        version = save_artifact(
+            artifact_dir,
+            vectorizer,
+            classifier,
+            backend=backend,
+            corpus_sha256=artifact.manifest['corpus_sha256'],
+            preprocessing=artifact.manifest['preprocessing'],
+            lemma_table=artifact.lemma_table,
+            metrics=artifact.manifest['metrics'],
+            calibration=artifact.manifest.get('calibration'),
+            lineage={
+                'parent_version': artifact.version,
+                'labels_through': corrections[-1].id,
+                'n_corrections': lineage.get('n_corrections', 0) + len(usable),
+            },
+        )
+        logger.info(f"Published model {version} with {len(usable)} new corrections "
+                    f"({len(corrections) - len(usable)} skipped)")
+        if keep_versions > 0:
+            deleted = prune_versions(artifact_dir, keep_versions)
+            if deleted:
+                logger.info(f"Deleted {len(deleted)} old model versions")
+        return version
+
+
+class OnlineUpdater:
+    """Background thread that periodically runs update_model() and reloads
+
+    After each update attempt the classifier is pointed at whatever CURRENT
+    now names, so workers also pick up versions published by other processes.
+    Updates are refused for artifacts built from a different corpus or
+    preprocessing configuration, exactly as ComplaintClassifier refuses them,
+    and skipped while the served backend cannot be updated incrementally.
+    """
+
+    def __init__(self, classifier, label_store, interval, keep_versions=0):
+        self.classifier = classifier
+        self.label_store = label_store
+        self.interval = interval
+        self.keep_versions = keep_versions
+        self._skipped_backend = None
+        train_data = get_training_data()
+        self.corpus_sha256 = corpus_hash(train_data['text'], train_data['category'])
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _can_update(self):
+        """Whether the served backend can be updated, logging once per backend when not"""
+        backend = self.classifier.backend
+        if backend in INCREMENTAL_BACKENDS:
+            self._skipped_backend = None
+            return True
+        if backend != self._skipped_backend:
+            self._skipped_backend = backend
+            logger.info(f"No online updates: backend '{backend}' cannot be updated "
+                        f"incrementally; retrain with one of {list(INCREMENTAL_BACKENDS)}")
+        return False
+
+    def start(self):
+        """Start the update thread, unless the served backend cannot be updated"""
+        if not self._can_update():
+            return False
+        self._thread = threading.Thread(target=self._run, name='online-updater', daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        self._stop.set()
+
+    def run_once(self):
+        try:
+            # A version published since may have come from another backend
+            if not self._can_update():
+                return None
+            return update_model(self.classifier.artifact_dir, self.label_store,
+                                corpus_sha256=self.corpus_sha256,
+                                preprocessing=PREPROCESSING_CONFIG,
+                                keep_versions=self.keep_versions)
+        finally:
+            self.classifier.reload_if_changed()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"Online model update failed: {e}")
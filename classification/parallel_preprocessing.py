@@ -0,0 +1,96 @@
+"""Corpus preprocessing spread over a process pool
+
+Offline only, like nltk_preprocessing. Building the lemma table and
+preprocessing every text are split into chunks; each worker process loads
+its own NLTK stop words, lemmatizer and WordNet index (or TextPreprocessor)
+once, in the pool initializer, and then handles chunk after chunk. Results
+come back in input order, so the output is identical to the single-process
+functions whatever the number of processes.
+"""
+import multiprocessing
+
+from classification.nltk_preprocessing import (
+    NltkPreprocessor, assemble_lemma_table, corpus_tokens, lemma_table_tokens, lemmatize_tokens)
+from classification.preprocessing import TextPreprocessor
+
+DEFAULT_CHUNK_SIZE = 1000
+
+# Per-process state set up by the pool initializers
+_reference = None
+_preprocessor = None
+
+
+def _init_nltk(data_dir):
+    global _reference
+    _reference = NltkPreprocessor(data_dir)
+
+
+def _chunk_tokens(texts):
+    return corpus_tokens(texts, _reference.stop_words)
+
+
+def _chunk_lemmas(tokens):
+    return lemmatize_tokens(tokens, _reference)
+
+
+def _init_preprocessor(lemma_table):
+    global _preprocessor
+    _preprocessor = TextPreprocessor(lemma_table)
+
+
+def _chunk_preprocess(texts):
+    return [_preprocessor.preprocess(text) for text in texts]
+
+
+def _chunks(items, size):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def _run_chunks(pool, func, chunks, stage, progress):
+    """func over chunks in order, reporting progress(stage, done, total) per chunk"""
+    total = sum(len(chunk) for chunk in chunks)
+    done = 0
+    results = []
+    for chunk, result in zip(chunks, pool.imap(func, chunks)):
+        results.append(result)
+        done += len(chunk)
+        if progress is not None:
+            progress(stage, done, total)
+    return results
+
+
+def build_lemma_table_parallel(texts, data_dir, processes=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                               progress=None):
+    """nltk_preprocessing.build_lemma_table() across a pool of processes
+
+    Workers first collect the distinct tokens of chunks of texts, then
+    lemmatize chunks of the merged, sorted token list. progress, if given,
+    is called as progress(stage, done, total) after every chunk, with stage
+    'tokens' or 'lemmas'.
+    """
+    texts = list(texts)
+    with multiprocessing.Pool(processes, initializer=_init_nltk, initargs=(data_dir,)) as pool:
+        token_sets = _run_chunks(pool, _chunk_tokens, _chunks(texts, chunk_size), 'tokens', progress)
+        tokens = lemma_table_tokens(token_sets)
+        # Lemmatizing a token costs far more than tokenizing a text, so the
+        # token list is cut into a few chunks per process to balance load
+        n_chunks = 4 * (processes or multiprocessing.cpu_count())
+        lemma_chunks = _chunks(tokens, max(1, -(-len(tokens) // n_chunks)))
+        lemmatized = [pair for chunk in _run_chunks(pool, _chunk_lemmas, lemma_chunks, 'lemmas', progress)
+                      for pair in chunk]
+    return assemble_lemma_table(tokens, lemmatized, NltkPreprocessor(data_dir).stop_words)
+
+
+def preprocess_parallel(texts, lemma_table, processes=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                        progress=None):
+    """TextPreprocessor(lemma_table).preprocess() of every text, in input order
+
+    progress, if given, is called as progress('preprocess', done, total)
+    after every chunk.
+    """
+    texts = list(texts)
+    with multiprocessing.Pool(processes, initializer=_init_preprocessor,
+                              initargs=(lemma_table,)) as pool:
+        chunks = _run_chunks(pool, _chunk_preprocess, _chunks(texts, chunk_size), 'preprocess',
+                             progress)
+    return [text for chunk in chunks for text in chunk]
@@ -0,0 +1,103 @@
+import json
+import sqlite3
+from collections import namedtuple
+from contextlib import closing, contextmanager
+from datetime import datetime
+
+StoredPrediction = namedtuple(
+    'StoredPrediction', 'complaint_id model_version category confidence predictions created_at')
+StoredRuleMatch = namedtuple(
+    'StoredRuleMatch',
+    'complaint_id rules_version phrase category priority start end matched_text created_at')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS predictions (
+    complaint_id INTEGER PRIMARY KEY,
+    model_version TEXT,
+    category TEXT NOT NULL,
+    confidence REAL NOT NULL,
+    predictions TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS rule_matches (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    complaint_id INTEGER NOT NULL,
+    rules_version TEXT,
+    phrase TEXT NOT NULL,
+    category TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    start_offset INTEGER NOT NULL,
+    end_offset INTEGER NOT NULL,
+    matched_text TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS rule_matches_complaint ON rule_matches (complaint_id);
+"""
+
+
+class PredictionStore:
+    """Ranked predictions each complaint was routed with, in a SQLite file
+
+    Kept per complaint so admins can re-route to an alternative category
+    without the text being scored again, and can see how confident the
+    model was when it routed it. Later predictions for the same complaint
+    (e.g. once a complaint filed during warm-up is classified) replace
+    earlier ones. The keyword rules that matched a complaint are kept
+    alongside for auditing, whether or not they decided its category.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        # Commit on success and always close; sqlite3's own context manager
+        # only handles the transaction
+        with closing(sqlite3.connect(self.path, timeout=30)) as conn, conn:
+            yield conn
+
+    def record(self, complaint_id, result, model_version=None):
+        """Store a predict()/predict_categories() result for a complaint"""
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO predictions (complaint_id, model_version, category,"
+                " confidence, predictions, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (complaint_id, model_version, result['category'], result['confidence'],
+                 json.dumps(result['predictions']), datetime.utcnow().isoformat()))
+
+    def get(self, complaint_id):
+        """The StoredPrediction of a complaint, or None"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT complaint_id, model_version, category, confidence, predictions,"
+                " created_at FROM predictions WHERE complaint_id = ?", (complaint_id,)).fetchone()
+        if row is None:
+            return None
+        return StoredPrediction(*row[:4], json.loads(row[4]), row[5])
+
+    def record_rule_matches(self, complaint_id, text, matches, rules_version=None):
+        """Store the keyword rule matches (rules.RuleMatch) found in a complaint's text"""
+        created_at = datetime.utcnow().isoformat()
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT INTO rule_matches (complaint_id, rules_version, phrase, category, priority,"
+                " start_offset, end_offset, matched_text, created_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(complaint_id, rules_version, match.phrase, match.category, match.priority,
+                  match.start, match.end, text[match.start:match.end], created_at)
+                 for match in matches])
+
+    def rule_matches(self, complaint_id):
+        """StoredRuleMatch rows of a complaint, best first as they were found"""
+        with self._connect() as conn:
+            return [StoredRuleMatch(*row) for row in conn.execute(
+                "SELECT complaint_id, rules_version, phrase, category, priority, start_offset,"
+                " end_offset, matched_text, created_at FROM rule_matches"
+                " WHERE complaint_id = ? ORDER BY id", (complaint_id,))]
+
+    def remove(self, complaint_id):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM predictions WHERE complaint_id = ?", (complaint_id,))
+            conn.execute("DELETE FROM rule_matches WHERE complaint_id = ?", (complaint_id,))
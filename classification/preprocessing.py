@@ -0,0 +1,90 @@
+import re
+import string
+
+# Everything that changes the text fed to the vectorizer belongs here; the
+# dict is stored in every model artifact and compared again at load time.
+PREPROCESSING_CONFIG = {
+    'lowercase': True,
+    'strip_punctuation': True,
+    'tokenizer': 'regex',
+    'stopwords': 'nltk.english',
+    'min_token_length': 3,
+    'lemmatizer': 'lemma_table',
+}
+
+PUNCTUATION_TABLE = str.maketrans('', '', string.punctuation)
+
+# Once ASCII punctuation is stripped, the only things NLTK's word_tokenize
+# still splits on besides whitespace are unicode quotes (padded out as
+# single-character tokens, which the length filter drops) and a handful of
+# colloquial contractions.
+_QUOTES = '«“‘„»”’'
+_TOKEN = re.compile(f"[^\\s{_QUOTES}]+")
+CONTRACTIONS = {
+    'cannot': ('can', 'not'),
+    'gimme': ('gim', 'me'),
+    'gonna': ('gon', 'na'),
+    'gotta': ('got', 'ta'),
+    'lemme': ('lem', 'me'),
+    'wanna': ('wan', 'na'),
+}
+
+# WordNet's noun detachment rules, used for words missing from the lemma table
+NOUN_SUFFIX_RULES = (
+    ('s', ''), ('ses', 's'), ('ves', 'f'), ('xes', 'x'), ('zes', 'z'),
+    ('ches', 'ch'), ('shes', 'sh'), ('men', 'man'), ('ies', 'y'),
+)
+
+
+def normalize(text):
+    """Lowercase and strip ASCII punctuation"""
+    return text.lower().translate(PUNCTUATION_TABLE)
+
+
+def tokenize(text):
+    """Split normalized text into tokens the way word_tokenize would"""
+    tokens = []
+    for token in _TOKEN.findall(text):
+        split = CONTRACTIONS.get(token)
+        if split:
+            tokens.extend(split)
+        else:
+            tokens.append(token)
+    return tokens
+
+
+class TextPreprocessor:
+    """Regex tokenizer plus a precomputed lemma table
+
+    Produces the same output as the NLTK pipeline in nltk_preprocessing
+    without loading Punkt or WordNet; the table is built from the training
+    corpus when the model artifact is created.
+    """
+
+    def __init__(self, lemma_table):
+        self.lemmas = lemma_table['lemmas']
+        self.noun_lemmas = frozenset(lemma_table['noun_lemmas'])
+        self.stop_words = frozenset(lemma_table['stop_words'])
+
+    def lemmatize(self, token):
+        lemma = self.lemmas.get(token)
+        if lemma is not None:
+            return lemma
+        # Unseen word: one round of WordNet's suffix rules, accepting only
+        # lemmas known to WordNet (shortest wins, as in WordNetLemmatizer)
+        candidates = [token[:-len(old)] + new
+                      for old, new in NOUN_SUFFIX_RULES
+                      if token.endswith(old)]
+        candidates = [c for c in candidates if c in self.noun_lemmas]
+        return min(candidates, key=len) if candidates else token
+
+    def preprocess(self, text):
+        """Clean and preprocess text for classification"""
+        return self.lemmatize_tokens(tokenize(normalize(text)))
+
+    def lemmatize_tokens(self, tokens):
+        """Drop short tokens and stop words, lemmatize the rest and join them"""
+        stop_words = self.stop_words
+        return ' '.join(self.lemmatize(token)
+                        for token in tokens
+                        if len(token) > 2 and token not in stop_words)
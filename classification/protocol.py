@@ -0,0 +1,179 @@
+"""Binary wire format spoken between ClassificationServer and RemoteClassifier
+
+Every message is a frame: a 4-byte big-endian body length followed by the
+body. Request bodies start with a one-byte opcode, response bodies with a
+one-byte status. Strings are length-prefixed UTF-8 (4-byte length for
+complaint texts, 2-byte for everything else). Each classify result is its
+category, confidence and department followed by a 2-byte count of
+ranked (category, confidence) predictions.
+"""
+import json
+import struct
+
+OP_CLASSIFY = 1
+OP_STATUS = 2
+
+STATUS_OK = 0
+STATUS_ERROR = 1
+
+MAX_FRAME_BYTES = 64 * 1024 * 1024
+
+_U8 = struct.Struct('!B')
+_U16 = struct.Struct('!H')
+_U32 = struct.Struct('!I')
+_F64 = struct.Struct('!d')
+
+
+class ProtocolError(Exception):
+    """Raised on malformed or oversized frames"""
+
+
+class ServerError(Exception):
+    """Raised when the server answers a request with STATUS_ERROR"""
+
+
+def _pack_short_str(value):
+    data = value.encode('utf-8')
+    return _U16.pack(len(data)) + data
+
+
+def _pack_long_str(value):
+    data = value.encode('utf-8')
+    return _U32.pack(len(data)) + data
+
+
+class _Reader:
+    def __init__(self, body):
+        self.body = body
+        self.offset = 0
+
+    def _take(self, fmt):
+        try:
+            (value,) = fmt.unpack_from(self.body, self.offset)
+        except struct.error as e:
+            raise ProtocolError(f"Truncated message: {e}")
+        self.offset += fmt.size
+        return value
+
+    def u8(self):
+        return self._take(_U8)
+
+    def u16(self):
+        return self._take(_U16)
+
+    def u32(self):
+        return self._take(_U32)
+
+    def f64(self):
+        return self._take(_F64)
+
+    def _str(self, length):
+        end = self.offset + length
+        if end > len(self.body):
+            raise ProtocolError("Truncated string")
+        value = self.body[self.offset:end].decode('utf-8')
+        self.offset = end
+        return value
+
+    def short_str(self):
+        return self._str(self._take(_U16))
+
+    def long_str(self):
+        return self._str(self._take(_U32))
+
+
+def _recv_exactly(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1024 * 1024))
+        if not chunk:
+            raise ConnectionError("Connection closed mid-frame")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def read_frame(sock):
+    """Read one frame body, or return None on a clean EOF between frames"""
+    header = sock.recv(_U32.size)
+    if not header:
+        return None
+    if len(header) < _U32.size:
+        header += _recv_exactly(sock, _U32.size - len(header))
+    (length,) = _U32.unpack(header)
+    if length > MAX_FRAME_BYTES:
+        raise ProtocolError(f"Frame of {length} bytes exceeds {MAX_FRAME_BYTES}")
+    return _recv_exactly(sock, length)
+
+
+def write_frame(sock, body):
+    sock.sendall(_U32.pack(len(body)) + body)
+
+
+def encode_classify_request(texts):
+    return b''.join([_U8.pack(OP_CLASSIFY), _U32.pack(len(texts))]
+                    + [_pack_long_str(text) for text in texts])
+
+
+def encode_status_request():
+    return _U8.pack(OP_STATUS)
+
+
+def decode_request(body):
+    """Return (opcode, payload) where payload is the text list for OP_CLASSIFY"""
+    reader = _Reader(body)
+    op = reader.u8()
+    if op == OP_CLASSIFY:
+        return op, [reader.long_str() for _ in range(reader.u32())]
+    if op == OP_STATUS:
+        return op, None
+    raise ProtocolError(f"Unknown opcode {op}")
+
+
+def encode_classify_response(model_version, results):
+    parts = [_U8.pack(STATUS_OK), _pack_short_str(model_version or ''), _U32.pack(len(results))]
+    for result in results:
+        parts.append(_pack_short_str(result['category']))
+        parts.append(_F64.pack(result['confidence']))
+        parts.append(_pack_short_str(result['department']))
+        parts.append(_U16.pack(len(result['predictions'])))
+        for prediction in result['predictions']:
+            parts.append(_pack_short_str(prediction['category']))
+            parts.append(_F64.pack(prediction['confidence']))
+    return b''.join(parts)
+
+
+def encode_status_response(status):
+    return _U8.pack(STATUS_OK) + _pack_long_str(json.dumps(status))
+
+
+def encode_error_response(message):
+    return _U8.pack(STATUS_ERROR) + _pack_short_str(message[:1000])
+
+
+def _check_status(reader):
+    if reader.u8() != STATUS_OK:
+        raise ServerError(f"Server error: {reader.short_str()}")
+
+
+def decode_classify_response(body):
+    """Return (model_version, results) from a classify response"""
+    reader = _Reader(body)
+    _check_status(reader)
+    model_version = reader.short_str() or None
+    results = []
+    for _ in range(reader.u32()):
+        category = reader.short_str()
+        confidence = reader.f64()
+        department = reader.short_str()
+        predictions = [{'category': reader.short_str(), 'confidence': reader.f64()}
+                       for _ in range(reader.u16())]
+        results.append({'category': category, 'confidence': confidence, 'department': department,
+                        'predictions': predictions})
+    return model_version, results
+
+
+def decode_status_response(body):
+    reader = _Reader(body)
+    _check_status(reader)
+    return json.loads(reader.long_str())
@@ -0,0 +1,204 @@
+"""Keyword rules routing complaints deterministically, ahead of the classifier
+
+A rule maps a phrase to a category and a priority. All phrases of a rule
+table are compiled into one Aho-Corasick automaton over words, so a
+complaint is scanned in a single pass over its words whatever the number of
+rules. Phrases match whole words, case-insensitively and across
+punctuation: "acid attack" matches "Acid-attack" but not "placid attacker".
+
+Rules are read from a CSV file with a phrase,category,priority header;
+lines starting with # are comments. KeywordRules rereads the file when it
+changes, so rules can be edited without restarting workers.
+"""
+import csv
+import hashlib
+import io
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque, namedtuple
+
+logger = logging.getLogger(__name__)
+
+Rule = namedtuple('Rule', 'phrase category priority')
+# start and end are character offsets of the matched words in the scanned text
+RuleMatch = namedtuple('RuleMatch', 'phrase category priority start end')
+
+# Punctuation is turned into spaces before splitting into words; one
+# character for one, so offsets in the normalized text are offsets in the text
+_PUNCTUATION = '!"#$%&\'()*+,-./:;<=>?@[\\]^_`{|}~‘’“”–—…«»'
+_SEPARATORS = str.maketrans(_PUNCTUATION, ' ' * len(_PUNCTUATION))
+_WORD = re.compile(r'\S+')
+
+
+def _normalize(text):
+    lowered = text.lower()
+    if len(lowered) != len(text):
+        # A few characters lowercase to several; those are kept as they are
+        lowered = ''.join(c.lower() if len(c.lower()) == 1 else c for c in text)
+    return lowered.translate(_SEPARATORS)
+
+
+class RuleTable:
+    """A compiled, immutable set of rules"""
+
+    def __init__(self, rules, version=None):
+        self.rules = list(rules)
+        self.version = version
+        # Trie of phrases word by word; state 0 is the root
+        self._goto = [{}]
+        self._outputs = [()]
+        self._lengths = []
+        for index, rule in enumerate(self.rules):
+            words = _normalize(rule.phrase).split()
+            if not words:
+                raise ValueError(f"Rule phrase {rule.phrase!r} has no words")
+            state = 0
+            for word in words:
+                next_state = self._goto[state].get(word)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][word] = next_state
+                    self._goto.append({})
+                    self._outputs.append(())
+                state = next_state
+            self._outputs[state] += (index,)
+            self._lengths.append(len(words))
+
+        # Failure links, breadth first: the longest proper suffix of a
+        # state's phrase that is also a trie path. Each state also reports
+        # the phrases ending at its failure state.
+        self._fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for word, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and word not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(word, 0)
+                self._outputs[next_state] += self._outputs[self._fail[next_state]]
+
+    def __len__(self):
+        return len(self.rules)
+
+    def scan(self, text):
+        """Every rule matching text, best first
+
+        Best is the highest priority, then the earliest match in the text,
+        then the rule listed first; the first match decides the category.
+        """
+        normalized = _normalize(text)
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        found = []
+        state = 0
+        for position, word in enumerate(normalized.split()):
+            while state and word not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(word, 0)
+            if outputs[state]:
+                found.extend((index, position) for index in outputs[state])
+        if not found:
+            return []
+
+        # Matches are rare; only then are word positions mapped to offsets
+        spans = [match.span() for match in _WORD.finditer(normalized)]
+        matches = []
+        for index, last in sorted(found, key=lambda f: (-self.rules[f[0]].priority,
+                                                        f[1] - self._lengths[f[0]], f[0])):
+            rule = self.rules[index]
+            matches.append(RuleMatch(rule.phrase, rule.category, rule.priority,
+                                     spans[last - self._lengths[index] + 1][0], spans[last][1]))
+        return matches
+
+
+def parse_rules(text, categories=None):
+    """Rules from the text of a rule file, checking categories when given
+
+    Raises ValueError naming the offending line for a malformed rule.
+    """
+    lines = [line for line in io.StringIO(text) if not line.lstrip().startswith('#')]
+    reader = csv.DictReader(lines, skipinitialspace=True)
+    if reader.fieldnames is None:
+        return []
+    missing = {'phrase', 'category', 'priority'} - set(reader.fieldnames)
+    if missing:
+        raise ValueError(f"Rule file lacks the {', '.join(sorted(missing))} column(s)")
+    rules = []
+    for row in reader:
+        phrase, category = (row['phrase'] or '').strip(), (row['category'] or '').strip()
+        if not _normalize(phrase).split():
+            raise ValueError(f"Rule {reader.line_num - 1} has no phrase")
+        if categories is not None and category not in categories:
+            raise ValueError(f"Rule {reader.line_num - 1} ({phrase!r}) has unknown category "
+                             f"{category!r}")
+        try:
+            priority = int(row['priority'])
+        except (TypeError, ValueError):
+            raise ValueError(f"Rule {reader.line_num - 1} ({phrase!r}) has a non-integer priority")
+        rules.append(Rule(phrase, category, priority))
+    return rules
+
+
+class KeywordRules:
+    """The rule table of a file, reloaded when the file changes
+
+    The file is checked at most every reload_interval seconds, on the next
+    call to current() after that. A missing file means no rules; a file
+    that fails to parse is logged and the rules loaded before stay in force.
+    """
+
+    def __init__(self, path, categories=None, reload_interval=5.0):
+        self.path = path
+        self.categories = set(categories) if categories is not None else None
+        self.reload_interval = reload_interval
+        self._table = RuleTable(())
+        self._signature = None
+        self._checked_at = time.monotonic()
+        self._lock = threading.Lock()
+        self.reload()
+
+    def reload(self):
+        """Reread the file if it changed since it was last read; returns whether it was"""
+        try:
+            stat = os.stat(self.path)
+            signature = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            signature = None
+        if signature == self._signature:
+            return False
+        self._signature = signature
+
+        if signature is None:
+            logger.info(f"No keyword rule file at {self.path}")
+            self._table = RuleTable(())
+            return True
+        try:
+            with open(self.path, 'rb') as f:
+                content = f.read()
+            table = RuleTable(parse_rules(content.decode('utf-8'), self.categories),
+                              version=hashlib.sha256(content).hexdigest()[:12])
+        except (OSError, ValueError) as e:
+            logger.error(f"Keeping the previous keyword rules; cannot load {self.path}: {e}")
+            return False
+        self._table = table
+        logger.info(f"Loaded {len(table)} keyword rules from {self.path} (version {table.version})")
+        return True
+
+    def current(self):
+        """The rule table in force, after checking the file if it is due"""
+        if time.monotonic() - self._checked_at >= self.reload_interval:
+            # One thread checks the file; the others keep using the current table
+            if self._lock.acquire(blocking=False):
+                try:
+                    self._checked_at = time.monotonic()
+                    self.reload()
+                finally:
+                    self._lock.release()
+        return self._table
+
+    def scan(self, text):
+        return self.current().scan(text)
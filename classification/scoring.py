@@ -0,0 +1,170 @@
+import math
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.special import expit
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.utils import murmurhash3_32
+
+from classification.hashing import HashingTfidfVectorizer
+from classification.vocabulary import CompactTfidfVectorizer
+
+_INT32_MIN = -2 ** 31
+
+
+def _hashed_lookup(n_features):
+    def lookup(term):
+        # Same column as sklearn's HashingVectorizer (signed murmurhash3 of
+        # the UTF-8 term, seed 0)
+        h = murmurhash3_32(term, seed=0)
+        if h == _INT32_MIN:
+            return (2 ** 31 - 1 - (n_features - 1)) % n_features
+        return abs(h) % n_features
+    return lookup
+
+
+class LinearScorer:
+    """Scores one preprocessed text against a fitted linear model without sklearn
+
+    Counts the active term ids of the text, applies idf and l2 normalization
+    and accumulates class scores straight from the weight rows of those
+    terms. Operations run in the same order as sklearn's sparse code paths
+    (ascending feature index, sequential sums), so probabilities match
+    vectorizer.transform() + classifier.predict_proba() exactly for the
+    logistic backends. Batches should still go through sklearn, which is
+    faster per row once the fixed per-call cost is amortized.
+    """
+
+    def __init__(self, analyzer, lookup, idf, norm, weights, bias, link, columns=None):
+        self.analyzer = analyzer
+        self.lookup = lookup
+        # Vectorizers with an array-backed vocabulary map a text to its
+        # columns in one call
+        self.columns = columns
+        self.idf = idf
+        self.norm = norm
+        # (n_features, n_classes): one contiguous row of class weights per
+        # term, or a CSR matrix of them for compressed artifacts
+        self.weights = weights
+        self.sparse = sp.issparse(weights)
+        self.bias = bias
+        self.link = link
+
+    @classmethod
+    def from_estimators(cls, vectorizer, classifier):
+        """Build a scorer for a supported vectorizer/classifier pair, else raise ValueError"""
+        columns = None
+        if isinstance(vectorizer, CompactTfidfVectorizer):
+            analyzer = lookup = None
+            columns = vectorizer.columns
+        elif isinstance(vectorizer, HashingTfidfVectorizer):
+            analyzer = vectorizer._hasher.build_analyzer()
+            lookup = _hashed_lookup(vectorizer.n_features)
+        elif isinstance(vectorizer, TfidfVectorizer):
+            if vectorizer.binary or vectorizer.sublinear_tf or vectorizer.analyzer != 'word':
+                raise ValueError("Only plain word TF-IDF vectorizers are supported")
+            analyzer = vectorizer.build_analyzer()
+            lookup = vectorizer.vocabulary_.get
+        else:
+            raise ValueError(f"Unsupported vectorizer type: {type(vectorizer).__name__}")
+        if vectorizer.norm not in ('l2', None):
+            raise ValueError(f"Unsupported norm: {vectorizer.norm}")
+        idf = vectorizer.idf_ if vectorizer.use_idf else None
+
+        estimator = type(classifier).__name__
+        n_classes = len(classifier.classes_)
+        if estimator == 'MultinomialNB':
+            weights, bias, link = classifier.feature_log_prob_, classifier.class_log_prior_, 'log_softmax'
+        elif estimator in ('LogisticRegression', 'SGDClassifier'):
+            weights, bias = classifier.coef_, classifier.intercept_
+            if n_classes == 2:
+                link = 'logistic'
+            elif (estimator == 'LogisticRegression'
+                  and getattr(classifier, 'multi_class', 'auto') != 'ovr'
+                  and getattr(classifier, 'solver', None) != 'liblinear'):
+                link = 'softmax'
+            else:
+                link = 'ovr'
+        else:
+            raise ValueError(f"Unsupported classifier type: {estimator}")
+
+        # Artifacts store weights column-major, or sparse with a row per
+        # feature, so either way this is a view, not a copy
+        if sp.issparse(weights):
+            weights = weights.T.tocsr(copy=False)
+        else:
+            weights = np.ascontiguousarray(np.asarray(weights).T)
+        return cls(analyzer, lookup, idf, vectorizer.norm, weights, np.asarray(bias), link,
+                   columns)
+
+    def _counts(self, text):
+        """Sorted active columns of a text and their term counts"""
+        counts = {}
+        if self.columns is not None:
+            for column in self.columns(text):
+                counts[column] = counts.get(column, 0) + 1
+        else:
+            for term in self.analyzer(text):
+                column = self.lookup(term)
+                if column is not None:
+                    counts[column] = counts.get(column, 0) + 1
+        columns = np.array(sorted(counts), dtype=np.intp)
+        return columns, np.array([counts[column] for column in columns], dtype=np.float64)
+
+    def vectorize(self, text):
+        """Sorted active columns of a text and their (normalized) TF-IDF values"""
+        columns, values = self._counts(text)
+        if self.idf is not None:
+            values *= self.idf[columns]
+        if self.norm == 'l2':
+            # Sequential sum of squares, as sklearn's row normalization does
+            sum_sq = 0.0
+            for value in values.tolist():
+                sum_sq += value * value
+            if sum_sq:
+                values /= math.sqrt(sum_sq)
+        return columns, values
+
+    def _decision(self, columns, values):
+        # Summing over axis 0 adds one term's weights at a time in ascending
+        # column order, like scipy's CSR x dense product
+        rows = self._sparse_rows(columns) if self.sparse else self.weights[columns]
+        return (values[:, np.newaxis] * rows).sum(axis=0) + self.bias
+
+    def _sparse_rows(self, columns):
+        # Dense class weights of the given terms from the CSR arrays; much
+        # cheaper than scipy's fancy indexing for the few terms of one text
+        weights = self.weights
+        starts = weights.indptr[columns]
+        counts = weights.indptr[columns + 1] - starts
+        # Offsets into data/indices of every stored weight of those rows
+        firsts = np.cumsum(counts) - counts
+        positions = np.arange(counts.sum()) + np.repeat(starts - firsts, counts)
+        rows = np.zeros((len(columns), weights.shape[1]))
+        rows[np.repeat(np.arange(len(columns)), counts), weights.indices[positions]] = \
+            weights.data[positions]
+        return rows
+
+    def decision_function(self, text):
+        return self._decision(*self.vectorize(text))
+
+    def score(self, columns, values):
+        """Class probabilities for the output of vectorize()"""
+        scores = self._decision(columns, values)
+        if self.link == 'softmax':
+            scores = np.exp(scores - scores.max())
+            return scores / scores.sum()
+        if self.link == 'log_softmax':
+            peak = scores.max()
+            return np.exp(scores - (np.log(np.exp(scores - peak).sum()) + peak))
+        prob = expit(scores)
+        if self.link == 'logistic':
+            return np.array([1 - prob[0], prob[0]])
+        total = prob.sum()
+        if total == 0:
+            return np.full(len(prob), 1 / len(prob))
+        return prob / total
+
+    def predict_proba(self, text):
+        """Class probabilities for one text, ordered like classifier.classes_"""
+        return self.score(*self.vectorize(text))
@@ -0,0 +1,123 @@
+import time
+
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.metrics import f1_score
+from sklearn.model_selection import ParameterGrid, ParameterSampler, StratifiedKFold
+
+from classification.training import build_estimators
+
+VECTORIZER_PREFIX = 'vectorizer__'
+CLASSIFIER_PREFIX = 'classifier__'
+
+_VOCABULARY_SPACE = {
+    'vectorizer__max_features': [5000, 10000, None],
+    'vectorizer__ngram_range': [(1, 1), (1, 2)],
+}
+
+# Candidate settings per backend, in sklearn's ParameterGrid format with
+# Pipeline-style prefixes. The elastic-net penalty needs saga; the plain L2
+# penalty is tried with both solvers.
+SEARCH_SPACES = {
+    'elasticnet': [
+        dict(_VOCABULARY_SPACE, **{
+            'classifier__solver': ['saga'],
+            'classifier__penalty': ['elasticnet'],
+            'classifier__C': [0.1, 1.0, 10.0],
+            'classifier__l1_ratio': [0.2, 0.5, 0.8],
+        }),
+        dict(_VOCABULARY_SPACE, **{
+            'classifier__solver': ['lbfgs', 'saga'],
+            'classifier__penalty': ['l2'],
+            'classifier__C': [0.1, 1.0, 10.0],
+            'classifier__l1_ratio': [None],
+        }),
+    ],
+}
+
+
+def split_params(candidate):
+    """Split a prefixed candidate into (vectorizer_params, classifier_params)"""
+    vectorizer_params, classifier_params = {}, {}
+    for key, value in candidate.items():
+        if key.startswith(VECTORIZER_PREFIX):
+            vectorizer_params[key[len(VECTORIZER_PREFIX):]] = value
+        elif key.startswith(CLASSIFIER_PREFIX):
+            classifier_params[key[len(CLASSIFIER_PREFIX):]] = value
+        else:
+            raise ValueError(f"Search parameter '{key}' needs a vectorizer__ or classifier__ prefix")
+    return vectorizer_params, classifier_params
+
+
+def _fold_features(backend, vectorizer_params, texts, splits):
+    features = []
+    for train_index, test_index in splits:
+        vectorizer, _ = build_estimators(backend, vectorizer_params)
+        features.append((vectorizer.fit_transform(texts[train_index]),
+                         vectorizer.transform(texts[test_index])))
+    return features
+
+
+def _fit_candidate(backend, classifier_params, features, labels):
+    start = time.perf_counter()
+    accuracy, macro_f1 = [], []
+    for (X_train, X_test), (y_train, y_test) in zip(features, labels):
+        _, classifier = build_estimators(backend, classifier_params=classifier_params)
+        predicted = classifier.fit(X_train, y_train).predict(X_test)
+        accuracy.append(float(np.mean(predicted == y_test)))
+        macro_f1.append(float(f1_score(y_test, predicted, average='macro', zero_division=0)))
+    return {
+        'mean_accuracy': float(np.mean(accuracy)),
+        'std_accuracy': float(np.std(accuracy)),
+        'mean_macro_f1': float(np.mean(macro_f1)),
+        'fold_accuracy': accuracy,
+        'fit_seconds': time.perf_counter() - start,
+    }
+
+
+def search(texts, categories, backend='elasticnet', space=None, n_iter=None, folds=5,
+           n_jobs=None, random_state=0):
+    """Cross-validate every candidate of a search space on preprocessed texts
+
+    Runs the full grid, or n_iter random candidates from it. Each distinct
+    vectorizer setting is fitted once per fold and its feature matrices are
+    shared by every candidate that uses it, so candidates only pay for
+    their classifier fits, which run in parallel worker processes (n_jobs
+    as in joblib). Folds are the same stratified splits cross_validate()
+    uses for the same random_state.
+
+    Returns the leaderboard: one dict per candidate with its params and
+    cross-validated scores, best mean accuracy first.
+    """
+    space = space or SEARCH_SPACES[backend]
+    if n_iter:
+        candidates = list(ParameterSampler(space, n_iter, random_state=random_state))
+    else:
+        candidates = list(ParameterGrid(space))
+
+    texts = np.asarray(texts, dtype=object)
+    categories = np.asarray(categories, dtype=object)
+    splits = list(StratifiedKFold(n_splits=folds, shuffle=True, random_state=random_state)
+                  .split(texts, categories))
+    labels = [(categories[train_index], categories[test_index]) for train_index, test_index in splits]
+
+    split_candidates = [split_params(candidate) for candidate in candidates]
+    features = {}
+    for vectorizer_params, _ in split_candidates:
+        key = repr(sorted(vectorizer_params.items()))
+        if key not in features:
+            features[key] = _fold_features(backend, vectorizer_params, texts, splits)
+
+    results = Parallel(n_jobs=n_jobs)(
+        delayed(_fit_candidate)(backend, classifier_params,
+                                features[repr(sorted(vectorizer_params.items()))], labels)
+        for vectorizer_params, classifier_params in split_candidates)
+
+    leaderboard = [
+        dict(result, vectorizer_params=vectorizer_params, classifier_params=classifier_params)
+        for (vectorizer_params, classifier_params), result in zip(split_candidates, results)
+    ]
+    leaderboard.sort(key=lambda entry: (-entry['mean_accuracy'], -entry['mean_macro_f1']))
+    for rank, entry in enumerate(leaderboard, 1):
+        entry['rank'] = rank
+    return leaderboard
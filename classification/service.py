@@ -0,0 +1,63 @@
+import logging
+import os
+import socketserver
+
+from classification.protocol import (
+    OP_CLASSIFY, OP_STATUS, ProtocolError, decode_request, encode_classify_response,
+    encode_error_response, encode_status_response, read_frame, write_frame,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class _ConnectionHandler(socketserver.BaseRequestHandler):
+    """Serves frames on one client connection until the client hangs up"""
+
+    def handle(self):
+        classifier = self.server.classifier
+        while True:
+            try:
+                body = read_frame(self.request)
+            except (ConnectionError, ProtocolError) as e:
+                logger.warning(f"Dropping client connection: {e}")
+                return
+            if body is None:
+                return
+
+            try:
+                op, texts = decode_request(body)
+                if op == OP_CLASSIFY:
+                    response = encode_classify_response(
+                        classifier.model_version, classifier.predict_categories(texts))
+                elif op == OP_STATUS:
+                    response = encode_status_response(
+                        dict(classifier.warm_up_status(), cascade=classifier.cascade_stats()))
+            except Exception as e:
+                logger.error(f"Request failed: {e}")
+                response = encode_error_response(str(e))
+
+            try:
+                write_frame(self.request, response)
+            except OSError as e:
+                logger.warning(f"Dropping client connection: {e}")
+                return
+
+
+class ClassificationServer(socketserver.ThreadingUnixStreamServer):
+    """Serves one shared ComplaintClassifier to local clients over a Unix socket"""
+
+    daemon_threads = True
+
+    def __init__(self, socket_path, classifier):
+        self.socket_path = socket_path
+        self.classifier = classifier
+        # A stale socket file left by a crashed daemon would block bind()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        super().__init__(socket_path, _ConnectionHandler)
+        os.chmod(socket_path, 0o660)
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
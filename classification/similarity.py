@@ -0,0 +1,270 @@
+"""Incremental similarity index linking new complaints to similar stored ones
+
+Complaints are indexed as TF-IDF vectors over their words and word bigrams,
+in SQLite tables shared by every web worker: an inverted index of
+(term, complaint, weight) postings plus each term's document frequency and
+largest weight. The index keeps its own document frequencies rather than
+using the served vectorizer, so it needs no model (daemon-backed workers
+have none) and survives retraining. A complaint's vector is weighted and
+L2-normalized with the document frequencies at the time it is added; the
+query vector uses the current ones, so scores are cosines up to that drift.
+
+Queries are term-at-a-time with max-score pruning. Terms are visited in
+decreasing order of their largest possible contribution (query weight
+times the term's largest stored weight); once the contributions still to
+come cannot lift an unseen complaint to the related threshold, the
+remaining terms, typically the frequent ones with long posting lists, are
+only looked up for the complaints already found, and complaints that can
+no longer reach the threshold are dropped. A query therefore reads the
+short posting lists of its rare terms in full and little else, however
+many complaints are stored.
+"""
+import math
+import sqlite3
+from collections import Counter, namedtuple
+from contextlib import closing, contextmanager
+from datetime import datetime
+
+from classification.preprocessing import normalize, tokenize
+
+SimilarComplaint = namedtuple('SimilarComplaint', 'complaint_id score duplicate')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    complaint_id INTEGER PRIMARY KEY,
+    created_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS terms (
+    term TEXT PRIMARY KEY,
+    df INTEGER NOT NULL,
+    max_weight REAL NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT NOT NULL,
+    complaint_id INTEGER NOT NULL,
+    weight REAL NOT NULL,
+    PRIMARY KEY (term, complaint_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS postings_complaint ON postings (complaint_id);
+CREATE TABLE IF NOT EXISTS links (
+    complaint_id INTEGER NOT NULL,
+    related_id INTEGER NOT NULL,
+    score REAL NOT NULL,
+    PRIMARY KEY (complaint_id, related_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS links_related ON links (related_id);
+"""
+
+# Stay well below SQLite's limit on bound parameters per statement
+_MAX_PARAMS = 500
+
+
+def term_counts(text):
+    """Counts of the words and word bigrams of a text"""
+    tokens = tokenize(normalize(text))
+    return Counter(tokens + [' '.join(pair) for pair in zip(tokens, tokens[1:])])
+
+
+def _idf(df, n_documents):
+    # Smoothed as in TfidfVectorizer, so terms in every complaint keep some weight
+    return math.log((1 + n_documents) / (1 + df)) + 1
+
+
+def _vector(counts, dfs, n_documents):
+    """L2-normalized sublinear TF-IDF weights of term counts"""
+    weights = {term: (1 + math.log(count)) * _idf(dfs.get(term, 0), n_documents)
+               for term, count in counts.items()}
+    norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+    return {term: w / norm for term, w in weights.items()}
+
+
+def _chunks(items, size=_MAX_PARAMS):
+    items = list(items)
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def _statistics(conn, terms):
+    """Number of indexed complaints and the document frequency of each known term"""
+    n_documents = conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+    dfs = {}
+    for chunk in _chunks(terms):
+        dfs.update(conn.execute(
+            f"SELECT term, df FROM terms WHERE term IN ({','.join('?' * len(chunk))})", chunk))
+    return n_documents, dfs
+
+
+class SimilarityIndex:
+    """Duplicate and related-complaint links, maintained as complaints are filed
+
+    add() scores a new complaint against every indexed one, records links to
+    the closest (at most max_links, with a cosine of at least
+    related_threshold) and indexes it, all in one write transaction, so two
+    copies of a complaint filed at the same moment by different workers
+    still find each other. Links with a cosine of at least
+    duplicate_threshold are reported as likely duplicates.
+    """
+
+    def __init__(self, path, duplicate_threshold=0.7, related_threshold=0.4, max_links=5):
+        if not 0 < related_threshold <= duplicate_threshold <= 1:
+            raise ValueError("Thresholds must satisfy 0 < related <= duplicate <= 1")
+        self.path = path
+        self.duplicate_threshold = duplicate_threshold
+        self.related_threshold = related_threshold
+        self.max_links = max_links
+        with self._connect() as conn:
+            # Readers (status pages) then never wait for a complaint being indexed
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self, write=False):
+        # Transactions are explicit: a write takes the database lock before
+        # its first read, so concurrent adds are serialized
+        with closing(sqlite3.connect(self.path, timeout=30, isolation_level=None)) as conn:
+            if not write:
+                yield conn
+                return
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def __len__(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def __contains__(self, complaint_id):
+        with self._connect() as conn:
+            return conn.execute("SELECT 1 FROM documents WHERE complaint_id = ?",
+                                (complaint_id,)).fetchone() is not None
+
+    def _search(self, conn, query, exclude=None):
+        """(complaint_id, score) of the max_links best matches above related_threshold"""
+        stats = {}
+        for chunk in _chunks(query):
+            stats.update((term, max_weight) for term, max_weight in conn.execute(
+                f"SELECT term, max_weight FROM terms WHERE term IN ({','.join('?' * len(chunk))})",
+                chunk))
+        bounds = sorted(((query[term] * max_weight, term) for term, max_weight in stats.items()),
+                        reverse=True)
+        remaining = sum(bound for bound, _ in bounds)
+        scores = {}
+        for bound, term in bounds:
+            if remaining >= self.related_threshold:
+                rows = conn.execute("SELECT complaint_id, weight FROM postings WHERE term = ?",
+                                    (term,)).fetchall()
+            else:
+                # No complaint outside scores can reach the threshold any more
+                scores = {cid: score for cid, score in scores.items()
+                          if score + remaining >= self.related_threshold}
+                if not scores:
+                    break
+                rows = []
+                for chunk in _chunks(scores):
+                    rows.extend(conn.execute(
+                        "SELECT complaint_id, weight FROM postings WHERE term = ? AND complaint_id"
+                        f" IN ({','.join('?' * len(chunk))})", [term] + chunk))
+            remaining -= bound
+            weight = query[term]
+            for complaint_id, posting in rows:
+                scores[complaint_id] = scores.get(complaint_id, 0.0) + weight * posting
+        scores.pop(exclude, None)
+        matches = [(cid, score) for cid, score in scores.items()
+                   if score >= self.related_threshold]
+        matches.sort(key=lambda match: (-match[1], match[0]))
+        return matches[:self.max_links]
+
+    def _insert(self, conn, complaint_id, counts, created_at):
+        """Index a complaint and return its links to the already indexed ones"""
+        n_documents, dfs = _statistics(conn, counts)
+        matches = self._search(conn, _vector(counts, dfs, n_documents), exclude=complaint_id)
+
+        # The complaint's own vector counts it among the documents
+        dfs = {term: df + 1 for term, df in dfs.items()}
+        vector = _vector(counts, {term: dfs.get(term, 1) for term in counts}, n_documents + 1)
+        conn.execute("INSERT INTO documents (complaint_id, created_at) VALUES (?, ?)",
+                     (complaint_id, created_at))
+        conn.executemany(
+            "INSERT INTO terms (term, df, max_weight) VALUES (?, 1, ?) ON CONFLICT (term)"
+            " DO UPDATE SET df = df + 1, max_weight = MAX(max_weight, excluded.max_weight)",
+            vector.items())
+        conn.executemany("INSERT INTO postings (term, complaint_id, weight) VALUES (?, ?, ?)",
+                         [(term, complaint_id, weight) for term, weight in vector.items()])
+        conn.executemany("INSERT INTO links (complaint_id, related_id, score) VALUES (?, ?, ?)",
+                         [(complaint_id, related_id, score) for related_id, score in matches])
+        return [self._link(related_id, score) for related_id, score in matches]
+
+    def _link(self, complaint_id, score):
+        return SimilarComplaint(complaint_id, score, score >= self.duplicate_threshold)
+
+    def add(self, complaint_id, text):
+        """Index a complaint and return SimilarComplaint links to earlier ones, best first
+
+        A complaint that is already indexed is left as it is, with its
+        stored links returned.
+        """
+        return self.add_many([(complaint_id, text)])[complaint_id]
+
+    def add_many(self, complaints):
+        """add() each (complaint_id, text) in turn, in a single transaction
+
+        Returns {complaint_id: links}; each complaint is linked to those
+        indexed before it, including earlier ones of the same batch.
+        """
+        created_at = datetime.utcnow().isoformat()
+        results = {}
+        with self._connect(write=True) as conn:
+            for complaint_id, text in complaints:
+                if conn.execute("SELECT 1 FROM documents WHERE complaint_id = ?",
+                                (complaint_id,)).fetchone():
+                    results[complaint_id] = self._links(conn, complaint_id)
+                    continue
+                results[complaint_id] = self._insert(conn, complaint_id, term_counts(text),
+                                                     created_at)
+        return results
+
+    def similar(self, text):
+        """SimilarComplaint matches of a text against the index, without adding it"""
+        counts = term_counts(text)
+        with self._connect() as conn:
+            n_documents, dfs = _statistics(conn, counts)
+            matches = self._search(conn, _vector(counts, dfs, n_documents))
+        return [self._link(complaint_id, score) for complaint_id, score in matches]
+
+    def _links(self, conn, complaint_id):
+        rows = conn.execute(
+            "SELECT related_id, score FROM links WHERE complaint_id = ?"
+            " UNION ALL SELECT complaint_id, score FROM links WHERE related_id = ?"
+            " ORDER BY score DESC, 1", (complaint_id, complaint_id)).fetchall()
+        return [self._link(related_id, score) for related_id, score in rows]
+
+    def links(self, complaint_id):
+        """SimilarComplaint links of a complaint in both directions, best first
+
+        That is the complaints it was linked to when filed and those filed
+        later that were linked to it.
+        """
+        with self._connect() as conn:
+            return self._links(conn, complaint_id)
+
+    def remove(self, complaint_id):
+        """Drop a complaint and its links; returns whether it was indexed
+
+        Terms keep their largest weight, which only makes pruning slightly
+        less tight.
+        """
+        with self._connect(write=True) as conn:
+            terms = [term for term, in conn.execute(
+                "SELECT term FROM postings WHERE complaint_id = ?", (complaint_id,))]
+            conn.executemany("UPDATE terms SET df = df - 1 WHERE term = ?",
+                             [(term,) for term in terms])
+            conn.executemany("DELETE FROM terms WHERE term = ? AND df <= 0",
+                             [(term,) for term in terms])
+            conn.execute("DELETE FROM postings WHERE complaint_id = ?", (complaint_id,))
+            conn.execute("DELETE FROM links WHERE complaint_id = ? OR related_id = ?",
+                         (complaint_id, complaint_id))
+            return conn.execute("DELETE FROM documents WHERE complaint_id = ?",
+                                (complaint_id,)).rowcount > 0
@@ -0,0 +1,171 @@
+import logging
+
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.naive_bayes import MultinomialNB
+
+from classification.hashing import HashingTfidfVectorizer
+
+logger = logging.getLogger(__name__)
+
+# Seed of the stochastic solvers (saga, SGD), as of the evaluation folds, so
+# two versions trained from the same config and data have the same weights
+RANDOM_STATE = 0
+
+ELASTICNET_PARAMS = {
+    'max_iter': 1000,
+    'class_weight': 'balanced',
+    'solver': 'saga',
+    'penalty': 'elasticnet',
+    'l1_ratio': 0.5,
+    'random_state': RANDOM_STATE,
+}
+
+HASHING_PARAMS = {
+    'n_features': 2 ** 18,
+    'ngram_range': (1, 2),
+    'stop_words': 'english',
+}
+
+# Vectorizer/classifier configurations: the three app variants plus the
+# vocabulary-free hashing modes
+BACKENDS = {
+    # app.py
+    'naive_bayes': {
+        'vectorizer': (TfidfVectorizer, {}),
+        'classifier': (MultinomialNB, {}),
+    },
+    # app_try.py
+    'logistic': {
+        'vectorizer': (TfidfVectorizer, {}),
+        'classifier': (LogisticRegression, {
+            'max_iter': 1000,
+            'class_weight': 'balanced',
+        }),
+    },
+    # app_try2.py
+    'elasticnet': {
+        'vectorizer': (TfidfVectorizer, {
+            'max_features': 10000,
+            'ngram_range': (1, 2),
+            'stop_words': 'english',
+        }),
+        'classifier': (LogisticRegression, ELASTICNET_PARAMS),
+    },
+    # app_try2.py's classifier on hashed features
+    'hashing_elasticnet': {
+        'vectorizer': (HashingTfidfVectorizer, HASHING_PARAMS),
+        'classifier': (LogisticRegression, ELASTICNET_PARAMS),
+    },
+    # Hashed features and an SGD-trained elastic-net logistic model; both
+    # halves support partial_fit, so this one can be trained incrementally.
+    # class_weight='balanced' is not available with partial_fit.
+    'hashing_sgd': {
+        'vectorizer': (HashingTfidfVectorizer, HASHING_PARAMS),
+        'classifier': (SGDClassifier, {
+            'loss': 'log_loss',
+            'penalty': 'elasticnet',
+            'l1_ratio': 0.5,
+            'alpha': 1e-5,
+            'max_iter': 50,
+            'tol': None,
+            'random_state': RANDOM_STATE,
+        }),
+    },
+}
+
+# Backends that train_incremental() can stream chunks into
+INCREMENTAL_BACKENDS = ('hashing_sgd',)
+
+# Backends whose models compression.prune_features() can shrink
+COMPRESSIBLE_BACKENDS = ('logistic', 'elasticnet')
+
+DEFAULT_BACKEND = 'elasticnet'
+
+
+def build_estimators(backend=DEFAULT_BACKEND, vectorizer_params=None, classifier_params=None):
+    """Return an unfitted (vectorizer, classifier) pair for a backend
+
+    vectorizer_params overrides the backend's vectorizer settings, e.g.
+    {'n_features': 2 ** 16} for a narrower hashed feature space, and
+    classifier_params its classifier settings, e.g. {'C': 10.0}.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}', expected one of {sorted(BACKENDS)}")
+    spec = BACKENDS[backend]
+    vectorizer_cls, params = spec['vectorizer']
+    classifier_cls, default_params = spec['classifier']
+    return (vectorizer_cls(**dict(params, **(vectorizer_params or {}))),
+            classifier_cls(**dict(default_params, **(classifier_params or {}))))
+
+
+def train_model(train_data, preprocess, backend=DEFAULT_BACKEND, vectorizer_params=None,
+                classifier_params=None, cache=None, texts_key=None):
+    """Fit a backend on a DataFrame with 'text' and 'category' columns
+
+    preprocess may be None when the texts are already preprocessed. With a
+    CorpusCache and a texts_key identifying the preprocessed texts (e.g.
+    the raw corpus hash), a TF-IDF vocabulary and feature matrix fitted
+    before are read from the cache instead of being fitted again.
+
+    Returns the fitted vectorizer, the fitted classifier and the training
+    accuracy.
+    """
+    if train_data.empty:
+        raise ValueError("No training data available")
+
+    vectorizer, classifier = build_estimators(backend, vectorizer_params, classifier_params)
+
+    # Preprocess all training texts
+    processed_text = train_data['text']
+    if preprocess is not None:
+        processed_text = processed_text.apply(preprocess)
+
+    # Vectorize text
+    if cache is not None:
+        vectorizer, X = cache.features(texts_key, vectorizer, processed_text)
+    else:
+        X = vectorizer.fit_transform(processed_text)
+    y = train_data['category']
+
+    if X.shape[0] != len(y):
+        raise ValueError("Feature and label dimensions don't match")
+
+    # Train model
+    classifier.fit(X, y)
+
+    train_acc = classifier.score(X, y)
+    logger.info(f"Model trained successfully. Training accuracy: {train_acc:.2f}")
+    return vectorizer, classifier, train_acc
+
+
+def train_incremental(chunks, preprocess, classes, backend='hashing_sgd', vectorizer_params=None):
+    """Stream DataFrame chunks with 'text' and 'category' columns into a backend
+
+    Each chunk updates the document frequencies first and is then used for
+    one partial_fit() pass, so memory is bounded by the chunk size rather
+    than the corpus. classes must list every category up front; preprocess
+    may be None for preprocessed texts. Returns the
+    fitted vectorizer, the fitted classifier and the number of samples seen.
+    """
+    if backend not in INCREMENTAL_BACKENDS:
+        raise ValueError(f"Backend '{backend}' does not support incremental training, "
+                         f"expected one of {list(INCREMENTAL_BACKENDS)}")
+    vectorizer, classifier = build_estimators(backend, vectorizer_params)
+
+    n_samples = 0
+    for chunk in chunks:
+        if chunk.empty:
+            continue
+        processed_text = chunk['text']
+        if preprocess is not None:
+            processed_text = processed_text.apply(preprocess)
+        vectorizer.partial_fit(processed_text)
+        classifier.partial_fit(vectorizer.transform(processed_text), chunk['category'],
+                               classes=classes)
+        n_samples += len(chunk)
+        logger.info(f"Trained on {n_samples} samples")
+
+    if not n_samples:
+        raise ValueError("No training data available")
+    return vectorizer, classifier, n_samples
@@ -0,0 +1,152 @@
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.preprocessing import normalize
+
+
+class CompactTfidfVectorizer:
+    """TfidfVectorizer.transform() over an array-backed vocabulary
+
+    Instead of a dict of term strings, every distinct token that occurs in a
+    vocabulary term is kept in a sorted fixed-width byte table and looked up
+    by binary search. A unigram feature is found through a token id ->
+    column array; a bigram is the integer key id1 * n_tokens + id2, searched
+    in a sorted key array, so n-gram strings are never built. All lookups
+    for a batch of documents run as a few vectorized numpy calls.
+
+    Built from the vocabulary array of an artifact (terms as UTF-8 bytes in
+    column order) and produces exactly the matrix TfidfVectorizer would.
+    Only word n-grams up to bigrams are supported.
+    """
+
+    def __init__(self, vocabulary, idf, lowercase=True, ngram_range=(1, 1), stop_words=None,
+                 token_pattern=r"(?u)\b\w\w+\b", norm='l2', use_idf=True, binary=False,
+                 smooth_idf=True, sublinear_tf=False):
+        self.ngram_range = tuple(ngram_range)
+        if self.ngram_range[1] > 2:
+            raise ValueError("Only unigrams and bigrams are supported")
+        if binary or sublinear_tf:
+            raise ValueError("binary and sublinear_tf are not supported")
+        # An unfitted TfidfVectorizer supplies the exact preprocessing,
+        # tokenization and stop list the fitted one used
+        reference = TfidfVectorizer(lowercase=lowercase, stop_words=stop_words,
+                                    token_pattern=token_pattern)
+        self._preprocess = reference.build_preprocessor()
+        self._tokenize = reference.build_tokenizer()
+        self._stop_words = reference.get_stop_words() or frozenset()
+        self.norm = norm
+        self.use_idf = use_idf
+        self.idf_ = idf
+        self.n_features = len(vocabulary)
+
+        terms = [term.decode('utf-8').split(' ') for term in vocabulary]
+        tokens = sorted({token for term in terms for token in term})
+        token_ids = {token: i for i, token in enumerate(tokens)}
+        self._tokens = np.array([token.encode('utf-8') for token in tokens], dtype=bytes)
+        self._n_tokens = len(tokens)
+
+        self._unigram_columns = np.full(len(tokens), -1, dtype=np.int32)
+        bigram_keys, bigram_columns = [], []
+        for column, term in enumerate(terms):
+            if len(term) == 1:
+                self._unigram_columns[token_ids[term[0]]] = column
+            elif len(term) == 2:
+                bigram_keys.append(token_ids[term[0]] * len(tokens) + token_ids[term[1]])
+                bigram_columns.append(column)
+            else:
+                raise ValueError(f"Unsupported vocabulary term: {' '.join(term)!r}")
+        order = np.argsort(np.array(bigram_keys, dtype=np.int64), kind='stable')
+        self._bigram_keys = np.array(bigram_keys, dtype=np.int64)[order]
+        self._bigram_columns = np.array(bigram_columns, dtype=np.int32)[order]
+
+        # For columns(): every term by the Python hash of its token (unigram)
+        # or token pair (bigram), sorted, then a sentinel so a search never
+        # runs off the end. str hashes are seeded per interpreter, so this is
+        # built in the process that uses it (forked workers share the seed).
+        hashes = np.array([hash(term[0]) if len(term) == 1 else hash(tuple(term))
+                           for term in terms] + [np.iinfo(np.int64).max], dtype=np.int64)
+        order = np.argsort(hashes, kind='stable')
+        self._term_hashes = hashes[order]
+        self._term_hash_columns = np.append(np.arange(len(terms), dtype=np.int32), -1)[order]
+
+    def _token_ids(self, tokens):
+        """Ids of tokens in the token table, -1 for tokens not in it"""
+        if not tokens or not self._n_tokens:
+            return np.full(len(tokens), -1, dtype=np.int64)
+        query = np.array([token.encode('utf-8') for token in tokens], dtype=bytes)
+        ids = np.searchsorted(self._tokens, query)
+        np.minimum(ids, self._n_tokens - 1, out=ids)
+        # The query array may be wider than the table, so a token longer
+        # than every table entry can never match a truncated prefix
+        return np.where(self._tokens[ids] == query, ids, -1)
+
+    def _tokens_of(self, doc):
+        return [token for token in self._tokenize(self._preprocess(doc))
+                if token not in self._stop_words]
+
+    def _columns(self, raw_documents):
+        """Return (row, column) arrays with one entry per matched n-gram"""
+        tokens, rows = [], []
+        for row, doc in enumerate(raw_documents):
+            doc_tokens = self._tokens_of(doc)
+            tokens.extend(doc_tokens)
+            rows.extend([row] * len(doc_tokens))
+        rows = np.array(rows, dtype=np.int64)
+        ids = self._token_ids(tokens)
+
+        row_parts, column_parts = [], []
+        min_n, max_n = self.ngram_range
+        if min_n == 1:
+            columns = self._unigram_columns[np.maximum(ids, 0)]
+            found = (ids >= 0) & (columns >= 0)
+            row_parts.append(rows[found])
+            column_parts.append(columns[found])
+        if max_n == 2 and len(ids) > 1 and len(self._bigram_keys):
+            # Adjacent tokens of the same document form a bigram
+            first, second = ids[:-1], ids[1:]
+            valid = (rows[:-1] == rows[1:]) & (first >= 0) & (second >= 0)
+            keys = first * self._n_tokens + second
+            slots = np.minimum(np.searchsorted(self._bigram_keys, keys),
+                               len(self._bigram_keys) - 1)
+            found = valid & (self._bigram_keys[slots] == keys)
+            row_parts.append(rows[:-1][found])
+            column_parts.append(self._bigram_columns[slots[found]])
+
+        if not row_parts:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int32)
+        return np.concatenate(row_parts), np.concatenate(column_parts)
+
+    def columns(self, doc):
+        """Columns of every matched n-gram of one document, repeats included
+
+        For a single short text the fixed cost of each numpy call outweighs
+        the work, so rather than the token table this searches the term
+        hashes: one search for all n-grams, in about as many numpy calls as
+        a dict lookup takes Python operations per document. An n-gram that
+        is not a vocabulary term could only match on a 64-bit hash
+        collision; transform() compares the tokens themselves.
+        """
+        tokens = self._tokens_of(doc)
+        min_n, max_n = self.ngram_range
+        keys = [hash(token) for token in tokens] if min_n == 1 else []
+        if max_n == 2:
+            keys.extend(hash(pair) for pair in zip(tokens, tokens[1:]))
+        if not keys:
+            return []
+        keys = np.array(keys, dtype=np.int64)
+        slots = np.searchsorted(self._term_hashes, keys)
+        return self._term_hash_columns[slots[self._term_hashes[slots] == keys]].tolist()
+
+    def transform(self, raw_documents):
+        raw_documents = list(raw_documents)
+        rows, columns = self._columns(raw_documents)
+        X = sp.csr_matrix(
+            (np.ones(len(rows), dtype=np.float64), (rows, columns)),
+            shape=(len(raw_documents), self.n_features))
+        # Sorted, summed indices, as CountVectorizer produces
+        X.sum_duplicates()
+        if self.use_idf:
+            X.data *= self.idf_[X.indices]
+        if self.norm:
+            X = normalize(X, norm=self.norm, copy=False)
+        return X
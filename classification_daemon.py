@@ -0,0 +1,57 @@
+"""Standalone classification daemon serving ComplaintClassifier over a Unix socket
+
+Usage:
+    python classification_daemon.py [--socket classifier.sock]
+
+One daemon holds the model for every web worker on the host; workers talk to
+it through classification.client.RemoteClassifier (set CLASSIFIER_SOCKET_PATH).
+The model is loaded before the socket is bound, so a reachable daemon is
+always ready to classify. Admin corrections from the label store are folded
+into the model every ONLINE_UPDATE_INTERVAL seconds.
+"""
+import argparse
+import logging
+import os
+
+import config
+from classification.cache import PredictionCache
+from classification.classifier import ComplaintClassifier
+from classification.labels import LabelStore
+from classification.online import OnlineUpdater
+from classification.service import ClassificationServer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--socket', default=config.CLASSIFIER_SOCKET_PATH
+                        or os.path.join(config.basedir, 'classifier.sock'))
+    parser.add_argument('--artifact-dir', default=config.MODEL_ARTIFACT_DIR)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+
+    cache = None
+    if config.PREDICTION_CACHE_MAX_BYTES > 0:
+        cache = PredictionCache(max_bytes=config.PREDICTION_CACHE_MAX_BYTES,
+                                ttl=config.PREDICTION_CACHE_TTL)
+    classifier = ComplaintClassifier(args.artifact_dir, cache=cache, mmap=config.MODEL_MMAP,
+                                     compact_vocabulary=config.COMPACT_VOCABULARY,
+                                     top_k=config.PREDICTION_TOP_K,
+                                     cascade_dir=config.CASCADE_ARTIFACT_DIR)
+    if not classifier.classifier:
+        raise SystemExit(f"Could not load a model: {classifier.load_error}")
+    if config.ONLINE_UPDATE_INTERVAL > 0:
+        OnlineUpdater(classifier, LabelStore(config.LABEL_STORE_PATH),
+                      config.ONLINE_UPDATE_INTERVAL,
+                      keep_versions=config.ARTIFACT_KEEP_VERSIONS).start()
+
+    with ClassificationServer(args.socket, classifier) as server:
+        logging.info(f"Serving model {classifier.model_version} on {args.socket}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == '__main__':
+    main()
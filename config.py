@@ -17,4 +17,74 @@ MAIL_PASSWORD = os.getenv('MAIL_PASSWORD')
 MAIL_DEFAULT_SENDER = os.getenv('MAIL_DEFAULT_SENDER', 'noreply@example.com')
 
 # NLP configuration
-SKIP_NLP_INIT = os.getenv('SKIP_NLP_INIT', 'false').lower() in ['true', 'on', '1']
\ No newline at end of file
+SKIP_NLP_INIT = os.getenv('SKIP_NLP_INIT', 'false').lower() in ['true', 'on', '1']
+
+# Project-local NLTK data, populated by vendor_nltk_data.py; never downloaded at runtime
+NLTK_DATA_DIR = os.getenv('NLTK_DATA_DIR', os.path.join(basedir, 'nltk_data'))
+
+# Directory holding versioned classifier artifacts written by train_classifier.py
+MODEL_ARTIFACT_DIR = os.getenv('MODEL_ARTIFACT_DIR', os.path.join(basedir, 'artifacts'))
+
+# First-stage model artifacts written by train_cascade.py; complaints the first stage is
+# sure of skip the full model. Empty scores every complaint with the full model
+CASCADE_ARTIFACT_DIR = os.getenv('CASCADE_ARTIFACT_DIR', os.path.join(basedir, 'cascade_artifacts'))
+
+# Preprocessed corpora and feature matrices reused across training runs, and their size cap
+CORPUS_CACHE_DIR = os.getenv('CORPUS_CACHE_DIR', os.path.join(basedir, 'corpus_cache'))
+CORPUS_CACHE_MAX_BYTES = int(os.getenv('CORPUS_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+
+# Worker processes for preprocessing an uncached training corpus (0 for one per core)
+PREPROCESSING_PROCESSES = int(os.getenv('PREPROCESSING_PROCESSES', 1))
+
+# Memory-map artifact arrays read-only so pre-forked workers share their pages
+MODEL_MMAP = os.getenv('MODEL_MMAP', 'true').lower() in ['true', 'on', '1']
+
+# Serve TF-IDF vocabularies from sorted arrays instead of a per-worker dict of strings:
+# less memory and faster batches, but single texts score a few microseconds slower
+COMPACT_VOCABULARY = os.getenv('COMPACT_VOCABULARY', 'false').lower() in ['true', 'on', '1']
+
+# Largest number of texts accepted by /api/classify/batch in one request
+CLASSIFY_BATCH_MAX_TEXTS = int(os.getenv('CLASSIFY_BATCH_MAX_TEXTS', 10000))
+
+# Ranked alternative categories returned and stored with each prediction
+PREDICTION_TOP_K = int(os.getenv('PREDICTION_TOP_K', 3))
+
+# Classification result cache: memory ceiling in bytes (0 disables) and TTL in seconds
+PREDICTION_CACHE_MAX_BYTES = int(os.getenv('PREDICTION_CACHE_MAX_BYTES', 16 * 1024 * 1024))
+PREDICTION_CACHE_TTL = int(os.getenv('PREDICTION_CACHE_TTL', 3600))
+
+# Load the classifier on a background thread so the server can start serving immediately
+CLASSIFIER_BACKGROUND_LOAD = os.getenv('CLASSIFIER_BACKGROUND_LOAD', 'true').lower() in ['true', 'on', '1']
+
+# Seconds between each worker's checks for complaints still pending classification (0 disables)
+PENDING_DRAIN_INTERVAL = int(os.getenv('PENDING_DRAIN_INTERVAL', 60))
+
+# Unix socket of classification_daemon.py; when set, web workers classify through
+# the daemon and only load the model in-process if it is unreachable
+CLASSIFIER_SOCKET_PATH = os.getenv('CLASSIFIER_SOCKET_PATH')
+# Admin category corrections, shared by all workers and the classification daemon
+LABEL_STORE_PATH = os.getenv('LABEL_STORE_PATH', os.path.join(basedir, 'labels.db'))
+# Phrase-to-category rules applied before the classifier, and how often (in seconds)
+# each worker checks the file for edits
+KEYWORD_RULES_PATH = os.getenv('KEYWORD_RULES_PATH', os.path.join(basedir, 'keyword_rules.csv'))
+KEYWORD_RULES_RELOAD_INTERVAL = float(os.getenv('KEYWORD_RULES_RELOAD_INTERVAL', 5))
+# Ranked predictions each complaint was routed with, kept for one-click re-routing
+PREDICTION_STORE_PATH = os.getenv('PREDICTION_STORE_PATH', os.path.join(basedir, 'predictions.db'))
+# Similarity index linking each new complaint to likely duplicates and related ones
+SIMILARITY_INDEX_PATH = os.getenv('SIMILARITY_INDEX_PATH', os.path.join(basedir, 'similarity.db'))
+# Cosine similarities from which complaints are linked as related, and as likely duplicates
+SIMILARITY_RELATED_THRESHOLD = float(os.getenv('SIMILARITY_RELATED_THRESHOLD', 0.4))
+SIMILARITY_DUPLICATE_THRESHOLD = float(os.getenv('SIMILARITY_DUPLICATE_THRESHOLD', 0.7))
+# Most links recorded for a new complaint
+SIMILARITY_MAX_LINKS = int(os.getenv('SIMILARITY_MAX_LINKS', 5))
+
+# Largest page of full-text complaint search results an admin can request
+SEARCH_MAX_PER_PAGE = int(os.getenv('SEARCH_MAX_PER_PAGE', 100))
+
+# Seconds between online updates folding new corrections into the model (0 disables);
+# only artifacts of an incremental backend (hashing_sgd) can be updated
+ONLINE_UPDATE_INTERVAL = int(os.getenv('ONLINE_UPDATE_INTERVAL', 300))
+
+# Artifact versions kept by online updates, newest first; the one CURRENT names is
+# never deleted (0 keeps every version)
+ARTIFACT_KEEP_VERSIONS = int(os.getenv('ARTIFACT_KEEP_VERSIONS', 5))
\ No newline at end of file
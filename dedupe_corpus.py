@@ -0,0 +1,122 @@
+"""Find near-duplicate texts and label conflicts in training corpora
+
+Usage:
+    python dedupe_corpus.py [training_data.py categoryvstext.py app.py corpus.csv ...]
+                            [--threshold 0.7] [--num-perm 128] [--shingle-size 2]
+                            [--conflicts majority|drop] [--output deduplicated.csv]
+                            [--report report.json] [--show 10]
+
+Each source is a CSV file with 'text' and 'category' columns or a Python
+file holding a {'text': [...], 'category': [...]} literal (as
+training_data.py, categoryvstext.py and app.py do); Python files are parsed,
+never imported. Sources are concatenated and clustered together, so
+duplicates across files are found as well.
+
+Two texts are near-duplicates when the estimated Jaccard similarity of
+their word bigram sets reaches --threshold; clusters are connected
+components of such pairs (classification/dedup.py). Clusters whose members
+carry different categories are reported as label conflicts; a source whose
+text and category lists differ in length is loaded as unlabelled. --output
+writes one text per cluster (see --conflicts) as CSV.
+"""
+import argparse
+import ast
+import json
+import sys
+import time
+
+import pandas as pd
+
+from classification.dedup import deduplicate, find_near_duplicates
+
+
+def _literal_corpus(path):
+    """The first dict literal with 'text' and 'category' list values in a Python file"""
+    with open(path, encoding='utf-8') as f:
+        tree = ast.parse(f.read(), filename=path)
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.Dict):
+            continue
+        keys = [key.value for key in node.keys if isinstance(key, ast.Constant)]
+        if 'text' in keys and 'category' in keys:
+            corpus = ast.literal_eval(node)
+            categories = corpus['category']
+            if len(categories) != len(corpus['text']):
+                # app.py's corpus is like this; its texts are still worth
+                # deduplicating, but no category can be trusted
+                print(f"warning: {path} has {len(corpus['text'])} texts but {len(categories)} "
+                      f"categories; treating its texts as unlabelled", file=sys.stderr)
+                categories = [None] * len(corpus['text'])
+            return pd.DataFrame({'text': corpus['text'], 'category': categories})
+    raise SystemExit(f"{path}: no {{'text': [...], 'category': [...]}} literal found")
+
+
+def load_corpus(path):
+    data = pd.read_csv(path) if path.endswith('.csv') else _literal_corpus(path)
+    data = data[['text', 'category']].astype(object)
+    return data.assign(text=data['text'].astype(str),
+                       category=data['category'].where(data['category'].notna(), None),
+                       source=path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('sources', nargs='*', default=['training_data.py'])
+    parser.add_argument('--threshold', type=float, default=0.7)
+    parser.add_argument('--num-perm', type=int, default=128)
+    parser.add_argument('--shingle-size', type=int, default=2)
+    parser.add_argument('--conflicts', choices=['majority', 'drop'], default='majority')
+    parser.add_argument('--output', default=None)
+    parser.add_argument('--report', default=None)
+    parser.add_argument('--show', type=int, default=10)
+    args = parser.parse_args()
+
+    data = pd.concat([load_corpus(path) for path in args.sources], ignore_index=True)
+
+    start = time.perf_counter()
+    labels = find_near_duplicates(data['text'], threshold=args.threshold,
+                                  num_perm=args.num_perm, shingle_size=args.shingle_size)
+    elapsed = time.perf_counter() - start
+    keep, conflicting = deduplicate(labels, data['category'], args.conflicts)
+
+    sizes = pd.Series(labels).value_counts()
+    clusters = sizes[sizes > 1]
+    exact = len(data) - data['text'].str.strip().str.lower().nunique()
+    print(f"{len(data)} texts from {len(args.sources)} sources, clustered in {elapsed:.1f}s")
+    print(f"exact duplicates (case-insensitive): {exact}")
+    print(f"near-duplicate clusters: {len(clusters)} covering {clusters.sum()} texts, "
+          f"largest {clusters.max() if len(clusters) else 0}")
+    print(f"label conflicts: {len(conflicting)} clusters, "
+          f"{sum(len(members) for members, _ in conflicting)} texts")
+    print(f"kept after deduplication: {keep.sum()} ({len(data) - keep.sum()} removed)")
+
+    conflicting.sort(key=lambda conflict: -len(conflict[0]))
+    for members, counts in conflicting[:args.show]:
+        print(f"\n  {len(members)} texts, categories "
+              + ', '.join(f"{category} ({count})" for category, count in counts.most_common()))
+        for index in members[:3]:
+            print(f"    [{data['category'][index]}] {data['text'][index]}")
+
+    if args.output:
+        data.loc[keep, ['text', 'category']].to_csv(args.output, index=False)
+        print(f"\nWrote {keep.sum()} texts to {args.output}")
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump({
+                'sources': args.sources,
+                'threshold': args.threshold,
+                'num_perm': args.num_perm,
+                'shingle_size': args.shingle_size,
+                'n_texts': len(data),
+                'n_kept': int(keep.sum()),
+                'exact_duplicates': int(exact),
+                'clusters': data['text'].groupby(labels).agg(list)[clusters.index].tolist(),
+                'conflicts': [{'texts': data['text'][members].tolist(),
+                               'categories': data['category'][members].tolist(),
+                               'sources': data['source'][members].tolist()}
+                              for members, _ in conflicting],
+            }, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    main()
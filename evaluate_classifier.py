@@ -0,0 +1,91 @@
+"""Cross-validate a classifier backend and compare it with a saved model version
+
+Usage:
+    python evaluate_classifier.py [--backend elasticnet] [--folds 5] [--jobs -1]
+                                  [--artifact-dir artifacts] [--version V]
+                                  [--output report.json]
+
+Texts are preprocessed once (or read from the corpus cache) and the
+stratified folds are fitted in parallel worker processes. Prints
+per-category precision, recall and F1 and the confusion matrix of the
+pooled out-of-fold predictions. Training accuracy,
+which is all train_classifier.py reports, says nothing about unseen
+complaints.
+
+The same folds are then run with the configuration of a saved model version
+(the current one unless --version is given): its backend, vectorizer
+settings and estimator parameters, as recorded in its manifest. The report
+ends with the change in accuracy and F1 from that version to --backend.
+"""
+import argparse
+import json
+import logging
+
+import config
+from classification.artifact import ArtifactError, load_artifact
+from classification.corpus_cache import CorpusCache, preprocess_corpus
+from classification.evaluation import compare_reports, cross_validate, estimators_from_manifest
+from classification.training import BACKENDS, DEFAULT_BACKEND
+from training_data import get_training_data
+
+
+def _print_report(report):
+    print(f"{report['backend']}: accuracy {report['accuracy']:.3f}, macro F1 {report['macro_f1']:.3f}, "
+          f"fold accuracy {' '.join(f'{a:.3f}' for a in report['fold_accuracy'])}\n")
+    print(f"{'':<4}{'category':<28}{'precision':>10}{'recall':>8}{'f1':>8}{'support':>9}")
+    for i, (label, scores) in enumerate(report['per_category'].items()):
+        print(f"{i:<4}{label:<28}{scores['precision']:>10.3f}{scores['recall']:>8.3f}"
+              f"{scores['f1']:>8.3f}{scores['support']:>9}")
+
+    print("\nconfusion matrix (rows true, columns predicted)")
+    print(f"{'':<4}" + ''.join(f"{i:>5}" for i in range(len(report['labels']))))
+    for i, row in enumerate(report['confusion_matrix']):
+        print(f"{i:<4}" + ''.join(f"{count:>5}" for count in row))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--backend', choices=sorted(BACKENDS), default=DEFAULT_BACKEND)
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--jobs', type=int, default=-1)
+    parser.add_argument('--artifact-dir', default=config.MODEL_ARTIFACT_DIR)
+    parser.add_argument('--version', default=None)
+    parser.add_argument('--output', default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    data = get_training_data()
+    cache = CorpusCache(config.CORPUS_CACHE_DIR, config.CORPUS_CACHE_MAX_BYTES)
+    _, texts = preprocess_corpus(data, config.NLTK_DATA_DIR, cache)
+
+    report = cross_validate(texts, data['category'], backend=args.backend,
+                            folds=args.folds, n_jobs=args.jobs)
+    _print_report(report)
+    result = {'report': report}
+
+    try:
+        manifest = load_artifact(args.artifact_dir, version=args.version).manifest
+    except ArtifactError as e:
+        print(f"\nNo saved model version to compare with: {e}")
+    else:
+        baseline = cross_validate(texts, data['category'], backend=manifest['backend'],
+                                  folds=args.folds, n_jobs=args.jobs,
+                                  estimators=estimators_from_manifest(manifest))
+        comparison = compare_reports(report, baseline)
+        print(f"\ncompared with version {manifest['version']} ({manifest['backend']}): "
+              f"accuracy {baseline['accuracy']:.3f} -> {report['accuracy']:.3f} "
+              f"({comparison['accuracy']:+.3f}), macro F1 {baseline['macro_f1']:.3f} -> "
+              f"{report['macro_f1']:.3f} ({comparison['macro_f1']:+.3f})")
+        for label, delta in comparison['per_category_f1'].items():
+            print(f"  {label:<28}F1 {delta:+.3f}")
+        result.update(baseline_version=manifest['version'], baseline=baseline,
+                      comparison=comparison)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
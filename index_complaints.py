@@ -0,0 +1,48 @@
+"""Add stored complaints to the similarity index used for duplicate detection
+
+Usage:
+    python index_complaints.py [--batch-size 1000]
+
+Complaints are indexed in id order, each linked to the similar ones filed
+before it, as file_complaint() would have done; complaints already in the
+index are skipped, so this can be rerun at any time, e.g. after the index
+file was first configured or lost.
+"""
+import argparse
+import os
+
+# Indexing needs the database but not the classifier
+os.environ.setdefault('SKIP_NLP_INIT', 'true')
+
+from app_try2 import app, similarity_index
+from models.complaint import Complaint
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--batch-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    with app.app_context():
+        last_id, indexed, duplicates = 0, 0, 0
+        while True:
+            batch = Complaint.query.filter(Complaint.id > last_id)\
+                .order_by(Complaint.id)\
+                .limit(args.batch_size)\
+                .all()
+            if not batch:
+                break
+            before = len(similarity_index)
+            links = similarity_index.add_many(
+                (complaint.id, f"{complaint.title} {complaint.description}") for complaint in batch)
+            indexed += len(similarity_index) - before
+            duplicates += sum(any(link.duplicate for link in found) for found in links.values())
+            last_id = batch[-1].id
+            print(f"Indexed up to complaint {last_id}")
+
+    print(f"Added {indexed} complaints, {len(similarity_index)} now indexed; "
+          f"{duplicates} complaints have a likely duplicate")
+
+
+if __name__ == '__main__':
+    main()
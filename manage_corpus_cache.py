@@ -0,0 +1,58 @@
+"""Inspect, prune or clear the preprocessed corpus cache
+
+Usage:
+    python manage_corpus_cache.py [list]
+    python manage_corpus_cache.py prune [--max-bytes N]
+    python manage_corpus_cache.py remove KEY [KEY ...]
+    python manage_corpus_cache.py clear
+
+Entries are keyed by content, so a changed corpus or preprocessing
+configuration never reads an old entry; old entries only take up space
+until the size cap (CORPUS_CACHE_MAX_BYTES) evicts them, least recently used
+first. prune applies the cap, or --max-bytes, right away. remove takes
+full keys or unique prefixes of them, such as the ones list prints.
+"""
+import argparse
+from datetime import datetime
+
+import config
+from classification.corpus_cache import CorpusCache
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('command', nargs='?', choices=['list', 'prune', 'remove', 'clear'],
+                        default='list')
+    parser.add_argument('keys', nargs='*')
+    parser.add_argument('--cache-dir', default=config.CORPUS_CACHE_DIR)
+    parser.add_argument('--max-bytes', type=int, default=config.CORPUS_CACHE_MAX_BYTES)
+    args = parser.parse_args()
+
+    cache = CorpusCache(args.cache_dir, args.max_bytes)
+    if args.command == 'prune':
+        print(f"Removed {cache.prune()} entries")
+    elif args.command == 'remove':
+        if not args.keys:
+            parser.error("remove needs at least one key")
+        try:
+            keys = [cache.resolve(prefix) for prefix in args.keys]
+        except ValueError as e:
+            parser.error(str(e))
+        for key in keys:
+            cache.remove(key)
+            print(f"Removed {key[:16]}")
+    elif args.command == 'clear':
+        cache.clear()
+
+    entries = cache.entries()
+    total = sum(entry['bytes'] for entry in entries)
+    print(f"{args.cache_dir}: {len(entries)} entries, {total / 2 ** 20:.1f} of "
+          f"{args.max_bytes / 2 ** 20:.0f} MB")
+    for entry in entries:
+        last_used = datetime.fromtimestamp(entry['last_used']).strftime('%Y-%m-%d %H:%M')
+        print(f"  {entry['key'][:16]}  {entry['kind']:<13}{entry['bytes'] / 2 ** 20:>8.2f} MB"
+              f"  used {last_used}  {entry['description']}")
+
+
+if __name__ == '__main__':
+    main()
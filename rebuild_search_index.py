@@ -0,0 +1,51 @@
+"""Build the full-text search index over the complaints already stored
+
+Usage:
+    python rebuild_search_index.py [--check] [--database app.db]
+
+Creates the complaints_fts table and its triggers if they are missing (the
+web app does so at startup), then reindexes every complaint, which makes
+complaints filed before the index existed searchable; from then on the
+triggers keep it in sync. --check only reports whether the index matches
+the complaints table. The database defaults to SQLALCHEMY_DATABASE_URI,
+which must be SQLite.
+"""
+import argparse
+import os
+import sys
+import time
+
+from sqlalchemy.engine.url import make_url
+
+import config
+from classification.fulltext import ComplaintSearch
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--check', action='store_true')
+    parser.add_argument('--database', default=None)
+    args = parser.parse_args()
+
+    path = args.database
+    if path is None:
+        url = make_url(config.SQLALCHEMY_DATABASE_URI)
+        if url.get_backend_name() != 'sqlite' or not url.database:
+            raise SystemExit(f"{url.get_backend_name()} database: full-text search requires SQLite")
+        path = os.path.join(config.basedir, url.database)
+
+    search = ComplaintSearch(path)
+    if args.check:
+        if not search.check():
+            print("Search index is out of date; rebuild it")
+            sys.exit(1)
+        print("Search index matches the complaints table")
+        return
+
+    start = time.perf_counter()
+    indexed = search.rebuild()
+    print(f"Indexed {indexed} complaints in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""Hyperparameter search for a classifier backend, with an optional winning artifact
+
+Usage:
+    python search_hyperparameters.py [--backend elasticnet] [--n-iter N] [--folds 5]
+                                     [--jobs -1] [--leaderboard leaderboard.json]
+                                     [--save [--artifact-dir artifacts]
+                                             [--calibration-folds 5]]
+
+Cross-validates the backend's search space from classification/search.py
+(max_features, ngram_range, C, l1_ratio and the solver for elasticnet): the
+full grid, or --n-iter random candidates. Texts are preprocessed once (or
+read from the corpus cache) and every vectorizer setting is fitted once per
+fold, so each candidate only pays for its classifier fits, which run in
+parallel worker processes.
+
+The ranked candidates are written to the leaderboard file. With --save the
+best one is trained on the whole corpus, calibrated on --calibration-folds
+out-of-fold predictions (0 skips calibration) and written as a new model
+artifact, exactly as train_classifier.py would, and becomes the served version.
+"""
+import argparse
+import json
+import logging
+from datetime import datetime
+
+import config
+from classification.artifact import corpus_hash, save_artifact
+from classification.calibration import calibrate
+from classification.corpus_cache import CorpusCache, preprocess_corpus
+from classification.preprocessing import PREPROCESSING_CONFIG
+from classification.search import SEARCH_SPACES, search
+from classification.training import build_estimators, train_model
+from training_data import get_training_data
+
+
+def _format_params(entry):
+    return ' '.join(f"{key}={value}" for key, value in
+                    {**entry['vectorizer_params'], **entry['classifier_params']}.items())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--backend', choices=sorted(SEARCH_SPACES), default='elasticnet')
+    parser.add_argument('--n-iter', type=int, default=None)
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--jobs', type=int, default=-1)
+    parser.add_argument('--leaderboard', default='leaderboard.json')
+    parser.add_argument('--save', action='store_true')
+    parser.add_argument('--artifact-dir', default=config.MODEL_ARTIFACT_DIR)
+    parser.add_argument('--calibration-folds', type=int, default=5)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    train_data = get_training_data()
+    cache = CorpusCache(config.CORPUS_CACHE_DIR, config.CORPUS_CACHE_MAX_BYTES)
+    lemma_table, texts = preprocess_corpus(train_data, config.NLTK_DATA_DIR, cache)
+
+    leaderboard = search(texts, train_data['category'], backend=args.backend,
+                         n_iter=args.n_iter, folds=args.folds, n_jobs=args.jobs)
+    with open(args.leaderboard, 'w') as f:
+        json.dump({
+            'created_at': datetime.utcnow().isoformat(),
+            'backend': args.backend,
+            'folds': args.folds,
+            'corpus_sha256': corpus_hash(train_data['text'], train_data['category']),
+            'candidates': leaderboard,
+        }, f, indent=2)
+
+    print(f"{'rank':<6}{'accuracy':>10}{'std':>8}{'macro F1':>10}{'fit':>8}  params")
+    for entry in leaderboard[:10]:
+        print(f"{entry['rank']:<6}{entry['mean_accuracy']:>10.3f}{entry['std_accuracy']:>8.3f}"
+              f"{entry['mean_macro_f1']:>10.3f}{entry['fit_seconds']:>7.1f}s  {_format_params(entry)}")
+    print(f"\nWrote {len(leaderboard)} candidates to {args.leaderboard}")
+
+    if args.save:
+        best = leaderboard[0]
+        vectorizer, classifier, train_acc = train_model(
+            train_data.assign(text=texts), None, backend=args.backend,
+            vectorizer_params=best['vectorizer_params'],
+            classifier_params=best['classifier_params'])
+        calibration = None
+        if args.calibration_folds:
+            calibration = calibrate(
+                texts, train_data['category'], args.backend,
+                build_estimators(args.backend, best['vectorizer_params'],
+                                 best['classifier_params']),
+                folds=args.calibration_folds, n_jobs=args.jobs)
+        version = save_artifact(
+            args.artifact_dir,
+            vectorizer,
+            classifier,
+            backend=args.backend,
+            corpus_sha256=corpus_hash(train_data['text'], train_data['category']),
+            preprocessing=PREPROCESSING_CONFIG,
+            lemma_table=lemma_table,
+            metrics={
+                'train_accuracy': train_acc,
+                'n_samples': len(train_data),
+                'cv_accuracy': best['mean_accuracy'],
+                'cv_macro_f1': best['mean_macro_f1'],
+                'vectorizer_params': best['vectorizer_params'],
+            },
+            calibration=calibration,
+        )
+        print(f"Wrote model artifact {version} to {args.artifact_dir}")
+
+
+if __name__ == '__main__':
+    main()
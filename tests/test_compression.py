@@ -0,0 +1,50 @@
+"""Compressed artifacts score from their sparse weights as they were calibrated
+
+compress_model() is what train_classifier.py evaluates and calibrates, so a
+saved and reloaded compressed artifact must give the same probabilities,
+through sklearn for batches and LinearScorer for single texts, without
+densifying its weights.
+"""
+import warnings
+
+import numpy as np
+import pytest
+import scipy.sparse as sp
+
+from classification.artifact import load_artifact, save_artifact
+from classification.compression import compress_model
+from classification.scoring import LinearScorer
+from classification.training import build_estimators
+
+WORDS = [f'term{i}' for i in range(200)]
+
+
+@pytest.fixture(scope='module')
+def model():
+    rng = np.random.default_rng(0)
+    texts = [' '.join(rng.choice(WORDS, 15)) for _ in range(300)]
+    categories = [f'category{int(text.split()[0][4:]) % 4}' for text in texts]
+    vectorizer, classifier = build_estimators('elasticnet')
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        classifier.fit(vectorizer.fit_transform(texts), categories)
+    return vectorizer, classifier, texts
+
+
+@pytest.mark.parametrize('weights', ['float64', 'float32', 'int8'])
+def test_compressed_artifacts_score_like_the_calibrated_model(model, weights, tmp_path):
+    vectorizer, classifier, texts = model
+    vectorizer, classifier, _ = compress_model(vectorizer, classifier, 0.01, weights)
+    expected = classifier.predict_proba(vectorizer.transform(texts))
+
+    save_artifact(str(tmp_path), vectorizer, classifier, backend='elasticnet',
+                  corpus_sha256='test', preprocessing={}, lemma_table={},
+                  weights=weights, sparse=True)
+    artifact = load_artifact(str(tmp_path), mmap=True)
+    assert sp.issparse(artifact.classifier.coef_)
+
+    batch = artifact.classifier.predict_proba(artifact.vectorizer.transform(texts))
+    scorer = LinearScorer.from_estimators(artifact.vectorizer, artifact.classifier)
+    single = np.array([scorer.predict_proba(text) for text in texts])
+    assert np.array_equal(batch, expected)
+    assert np.array_equal(single, expected)
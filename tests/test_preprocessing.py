@@ -0,0 +1,94 @@
+"""TextPreprocessor against the reference NLTK pipeline it replaces
+
+Needs the vendored NLTK data (see vendor_nltk_data.py); skipped without it.
+The lemma table is built from CORPUS as train_classifier.py builds it from
+the training data, so CORPUS texts must come out identical, and unseen
+texts may only differ in words outside the table.
+"""
+import pytest
+
+import config
+from classification.nltk_resources import MissingNltkResourceError
+from classification.preprocessing import TextPreprocessor
+
+CORPUS = [
+    # punctuation
+    "Water is leaking from the pipes near the bus stops!!! Nobody came...",
+    "Street-lights (on 5th Ave.) aren't working; the roads are dark.",
+    # contractions
+    "I cannot reach the police station, they're gonna ignore me. Don't they care?",
+    "We wanna know why the clinic won't open; lemme explain, it's been weeks",
+    # digits
+    "Garbage bins overflowing for 3 weeks since 12/05/2023, 40 children ill at 9pm",
+    # non-ASCII
+    "The café’s “special” dishes made people sick… naïve inspectors — again",
+    "Rückgabe refused at the Straße market, «fraud» says the vendor",
+    # irregular plurals
+    "Wolves and geese near the libraries; the men couldn't stop the mice",
+]
+
+
+@pytest.fixture(scope='module')
+def reference():
+    from classification.nltk_preprocessing import NltkPreprocessor
+    try:
+        return NltkPreprocessor(config.NLTK_DATA_DIR)
+    except MissingNltkResourceError as e:
+        pytest.skip(str(e))
+
+
+@pytest.fixture(scope='module')
+def lemma_table(reference):
+    from classification.nltk_preprocessing import build_lemma_table
+    return build_lemma_table(CORPUS, reference)
+
+
+@pytest.fixture(scope='module')
+def fast(lemma_table):
+    return TextPreprocessor(lemma_table)
+
+
+@pytest.mark.parametrize('text', CORPUS)
+def test_corpus_texts_match_nltk(fast, reference, text):
+    assert fast.preprocess(text) == reference.preprocess(text)
+
+
+@pytest.mark.parametrize('text', [
+    "",
+    "!!! ... ???",
+    "a an the of to",
+    "Buses and libraries, again: 2 buses!",
+])
+def test_unseen_texts_of_known_words_match_nltk(fast, reference, text):
+    assert fast.preprocess(text) == reference.preprocess(text)
+
+
+def test_unseen_plural_of_a_known_noun_is_lemmatized(fast, reference):
+    # "buses" is not in the table, but its lemma "bus" is a corpus lemma
+    assert fast.preprocess("buses") == reference.preprocess("buses") == 'bus'
+
+
+def test_out_of_vocabulary_words_keep_their_surface_form(fast, reference, lemma_table):
+    # Without WordNet, an unseen word is only lemmatized to a lemma the
+    # corpus produced. NLTK's lemma is then outside the table, hence outside
+    # every vocabulary trained on the corpus, so the features are the same.
+    assert fast.preprocess("ponies leaks") == 'ponies leaks'
+    assert reference.preprocess("ponies leaks") == 'pony leak'
+    known_lemmas = set(lemma_table['lemmas'].values())
+    assert not {'pony', 'leak', 'ponies', 'leaks'} & known_lemmas
+
+
+@pytest.mark.parametrize('text', [
+    "Potholes everywhere, the councils ignore our petitions",
+    "Dogs barking at night; neighbours' parties are too loud",
+    "Electricity bills doubled, meters read wrong",
+])
+def test_unseen_texts_differ_only_in_out_of_vocabulary_words(fast, reference, lemma_table,
+                                                             text):
+    known_lemmas = set(lemma_table['lemmas'].values())
+    fast_tokens = fast.preprocess(text).split()
+    reference_tokens = reference.preprocess(text).split()
+    assert len(fast_tokens) == len(reference_tokens)
+    for fast_token, reference_token in zip(fast_tokens, reference_tokens):
+        if fast_token != reference_token:
+            assert fast_token not in known_lemmas and reference_token not in known_lemmas
@@ -0,0 +1,114 @@
+"""Train the cascade's first-stage model and fit its per-category escalation thresholds
+
+Usage:
+    python train_cascade.py [--artifact-dir artifacts] [--cascade-dir cascade_artifacts]
+                            [--precision 0.95] [--min-support 10] [--folds 5]
+                            [--cache-dir DIR] [--no-cache] [--processes N]
+
+Fits the naive_bayes backend (unigram TF-IDF and MultinomialNB, as in
+app.py) and writes it as an artifact under --cascade-dir. Served with
+CASCADE_ARTIFACT_DIR, it answers the complaints it is sure of and only
+escalates the rest to the full model in --artifact-dir.
+
+Thresholds come from out-of-fold probabilities: per category, the lowest
+calibrated confidence from which the first stage's answers still reach
+--precision on at least --min-support texts, and never below the
+classifier's own confidence threshold. The same folds are run with the
+configuration of the current full model, and the escalation rate and the
+cascade's accuracy against the full model alone are logged and stored in
+the manifest. Rerun after retraining the full model.
+"""
+import argparse
+import logging
+
+import config
+from classification.artifact import ArtifactError, corpus_hash, load_artifact, save_artifact
+from classification.calibration import apply_temperature, fit_temperature
+from classification.cascade import cascade_report, fit_thresholds
+from classification.classifier import CONFIDENCE_THRESHOLD
+from classification.corpus_cache import CorpusCache, preprocess_corpus
+from classification.evaluation import estimators_from_manifest, out_of_fold_proba
+from classification.preprocessing import PREPROCESSING_CONFIG
+from classification.training import train_model
+from training_data import get_training_data
+
+FIRST_STAGE_BACKEND = 'naive_bayes'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--artifact-dir', default=config.MODEL_ARTIFACT_DIR)
+    parser.add_argument('--cascade-dir', default=config.CASCADE_ARTIFACT_DIR)
+    parser.add_argument('--precision', type=float, default=0.95)
+    parser.add_argument('--min-support', type=int, default=10)
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--cache-dir', default=config.CORPUS_CACHE_DIR)
+    parser.add_argument('--no-cache', action='store_true')
+    parser.add_argument('--processes', type=int, default=config.PREPROCESSING_PROCESSES)
+    args = parser.parse_args()
+
+    if not args.cascade_dir:
+        parser.error("--cascade-dir is required when CASCADE_ARTIFACT_DIR is empty")
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    try:
+        full_model = load_artifact(args.artifact_dir).manifest
+    except ArtifactError as e:
+        raise SystemExit(f"No full model to cascade into: {e}")
+
+    train_data = get_training_data()
+    corpus_sha256 = corpus_hash(train_data['text'], train_data['category'])
+    cache = None if args.no_cache else CorpusCache(args.cache_dir, config.CORPUS_CACHE_MAX_BYTES)
+    lemma_table, texts = preprocess_corpus(train_data, config.NLTK_DATA_DIR, cache,
+                                           processes=args.processes or None)
+    processed = train_data.assign(text=texts)
+    n_jobs = args.processes or -1
+
+    vectorizer, classifier, train_acc = train_model(processed, None, backend=FIRST_STAGE_BACKEND)
+
+    first_probs, labels = out_of_fold_proba(processed['text'], processed['category'],
+                                            FIRST_STAGE_BACKEND, folds=args.folds, n_jobs=n_jobs)
+    full_probs, _ = out_of_fold_proba(processed['text'], processed['category'],
+                                      full_model['backend'], folds=args.folds, n_jobs=n_jobs,
+                                      estimators=estimators_from_manifest(full_model))
+    column = {label: i for i, label in enumerate(labels)}
+    targets = processed['category'].map(column).to_numpy()
+
+    calibration = fit_temperature(first_probs, targets)
+    calibration['folds'] = args.folds
+    first_probs = apply_temperature(first_probs, calibration['temperature'])
+    thresholds = fit_thresholds(first_probs, targets, labels, precision=args.precision,
+                                min_support=args.min_support, floor=CONFIDENCE_THRESHOLD)
+    report = cascade_report(first_probs, full_probs, targets, labels, thresholds)
+
+    for label, threshold in thresholds.items():
+        logging.info(f"  {label:<28}" + ('always escalated' if threshold is None
+                                         else f"answered from {threshold:.3f}"))
+    logging.info(f"Escalation rate {report['escalation_rate']:.1%}; accuracy "
+                 f"{report['full_model_accuracy']:.3f} with the full model alone, "
+                 f"{report['cascade_accuracy']:.3f} cascaded ({report['accuracy_delta']:+.3f})")
+
+    version = save_artifact(
+        args.cascade_dir,
+        vectorizer,
+        classifier,
+        backend=FIRST_STAGE_BACKEND,
+        corpus_sha256=corpus_sha256,
+        preprocessing=PREPROCESSING_CONFIG,
+        lemma_table=lemma_table,
+        metrics={'train_accuracy': train_acc, 'n_samples': len(train_data)},
+        calibration=calibration,
+        cascade={
+            'thresholds': thresholds,
+            'precision': args.precision,
+            'min_support': args.min_support,
+            'full_model_version': full_model['version'],
+            'report': report,
+        },
+    )
+    print(f"Wrote first-stage artifact {version} to {args.cascade_dir}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+"""Offline training step: fit the complaint classifier and write a model artifact
+
+Usage:
+    python train_classifier.py [--backend elasticnet] [--artifact-dir artifacts]
+                               [--hash-features N] [--chunk-size N]
+                               [--compress [--prune-threshold T] [--weights float32]]
+                               [--cache-dir DIR] [--no-cache] [--cache-features]
+                               [--processes N] [--calibration-folds 5]
+
+Web workers load the artifact written here instead of training at startup.
+--hash-features sets the width of the hashed feature space for the hashing_*
+backends. --chunk-size streams the corpus into an incremental backend
+(hashing_sgd) chunk by chunk instead of fitting it in one go.
+--compress drops vocabulary terms whose weight is <= --prune-threshold in
+every class and stores the remaining weights sparsely as float32 (or, with
+--weights int8, as int8 with per-class scales); see
+benchmarks/model_compression.py for the accuracy-versus-size trade-off.
+Without --compress weights are stored as float64, and --weights is refused.
+The lemma table and preprocessed texts are cached on disk under --cache-dir,
+keyed by the corpus and preprocessing configuration, so retraining on an
+unchanged corpus skips preprocessing; --cache-features also caches the TF-IDF
+vocabulary and feature matrix. Inspect or clear the cache with
+manage_corpus_cache.py. --processes spreads preprocessing of an uncached
+corpus over that many worker processes (0 for one per core).
+--calibration-folds fits the temperature that served confidences are
+rescaled with on out-of-fold probabilities from that many folds (0 skips
+calibration; chunked training is never calibrated).
+"""
+import argparse
+import logging
+
+import config
+from classification.artifact import corpus_hash, save_artifact
+from classification.calibration import calibrate
+from classification.compression import WEIGHT_DTYPES, compress_model
+from classification.corpus_cache import CorpusCache, preprocess_corpus
+from classification.preprocessing import PREPROCESSING_CONFIG
+from classification.training import (
+    BACKENDS, COMPRESSIBLE_BACKENDS, DEFAULT_BACKEND, INCREMENTAL_BACKENDS,
+    build_estimators, train_incremental, train_model)
+from training_data import get_training_data
+
+
+_logged_tenths = {}
+
+
+def _log_progress(stage, done, total):
+    # One line per tenth of each stage
+    tenth = done * 10 // total
+    if _logged_tenths.get(stage) != tenth:
+        _logged_tenths[stage] = tenth
+        logging.info(f"Preprocessing: {stage} {done}/{total}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--backend', choices=sorted(BACKENDS), default=DEFAULT_BACKEND)
+    parser.add_argument('--artifact-dir', default=config.MODEL_ARTIFACT_DIR)
+    parser.add_argument('--hash-features', type=int, default=None)
+    parser.add_argument('--chunk-size', type=int, default=None)
+    parser.add_argument('--compress', action='store_true')
+    parser.add_argument('--prune-threshold', type=float, default=0.0)
+    parser.add_argument('--weights', choices=WEIGHT_DTYPES, default=None)
+    parser.add_argument('--cache-dir', default=config.CORPUS_CACHE_DIR)
+    parser.add_argument('--no-cache', action='store_true')
+    parser.add_argument('--cache-features', action='store_true')
+    parser.add_argument('--processes', type=int, default=config.PREPROCESSING_PROCESSES)
+    parser.add_argument('--calibration-folds', type=int, default=5)
+    args = parser.parse_args()
+
+    if args.hash_features and not args.backend.startswith('hashing_'):
+        parser.error("--hash-features only applies to the hashing_* backends")
+    if args.chunk_size and args.backend not in INCREMENTAL_BACKENDS:
+        parser.error(f"--chunk-size needs an incremental backend: {', '.join(INCREMENTAL_BACKENDS)}")
+    if args.compress and args.backend not in COMPRESSIBLE_BACKENDS:
+        parser.error(f"--compress needs one of: {', '.join(COMPRESSIBLE_BACKENDS)}")
+    if args.weights and not args.compress:
+        parser.error("--weights requires --compress")
+    if args.cache_features and (args.no_cache or args.chunk_size):
+        parser.error("--cache-features needs the cache and a full (non-chunked) fit")
+    vectorizer_params = {'n_features': args.hash_features} if args.hash_features else None
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    train_data = get_training_data()
+    corpus_sha256 = corpus_hash(train_data['text'], train_data['category'])
+    cache = None if args.no_cache else CorpusCache(args.cache_dir, config.CORPUS_CACHE_MAX_BYTES)
+    lemma_table, texts = preprocess_corpus(train_data, config.NLTK_DATA_DIR, cache,
+                                           processes=args.processes or None,
+                                           progress=_log_progress)
+    processed = train_data.assign(text=texts)
+    if args.chunk_size:
+        chunks = (processed[i:i + args.chunk_size]
+                  for i in range(0, len(processed), args.chunk_size))
+        vectorizer, classifier, _ = train_incremental(
+            chunks, None, classes=sorted(train_data['category'].unique()),
+            backend=args.backend, vectorizer_params=vectorizer_params)
+        train_acc = classifier.score(vectorizer.transform(processed['text']), processed['category'])
+    else:
+        vectorizer, classifier, train_acc = train_model(
+            processed, None, backend=args.backend, vectorizer_params=vectorizer_params,
+            cache=cache if args.cache_features else None, texts_key=corpus_sha256)
+
+    metrics = {'train_accuracy': train_acc, 'n_samples': len(train_data)}
+    weights = (args.weights or 'float32') if args.compress else 'float64'
+    # Calibrate the model as it is served: pruned and with rounded weights
+    compress = (args.prune_threshold, weights) if args.compress else None
+    if compress:
+        vectorizer, classifier, pruned = compress_model(vectorizer, classifier, *compress)
+        metrics['pruned_features'] = pruned
+        metrics['train_accuracy'] = classifier.score(
+            vectorizer.transform(processed['text']), processed['category'])
+        logging.info(f"Pruned {pruned} features; training accuracy "
+                     f"{metrics['train_accuracy']:.2f} after pruning and {weights} weights")
+
+    calibration = None
+    if args.calibration_folds and not args.chunk_size:
+        calibration = calibrate(processed['text'], processed['category'], args.backend,
+                                build_estimators(args.backend, vectorizer_params),
+                                folds=args.calibration_folds, n_jobs=args.processes or -1,
+                                compress=compress)
+
+    version = save_artifact(
+        args.artifact_dir,
+        vectorizer,
+        classifier,
+        backend=args.backend,
+        corpus_sha256=corpus_sha256,
+        preprocessing=PREPROCESSING_CONFIG,
+        lemma_table=lemma_table,
+        metrics=metrics,
+        weights=weights,
+        sparse=args.compress,
+        calibration=calibration,
+    )
+    print(f"Wrote model artifact {version} to {args.artifact_dir}")
+
+
+if __name__ == '__main__':
+    main()
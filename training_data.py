@@ -2148,10 +2148,11 @@ def get_categories():
     """Returns list of unique categories"""
     return list(set(training_samples['category']))
 
-df = get_training_data()
-print(df.head())
-print(f"Total samples: {len(df)}")
+if __name__ == '__main__':
+    df = get_training_data()
+    print(df.head())
+    print(f"Total samples: {len(df)}")
 
-# Test department mapping
-print(get_department_info("Workplace Harassment"))
-print(get_department_info("Unknown Category"))
\ No newline at end of file
+    # Test department mapping
+    print(get_department_info("Workplace Harassment"))
+    print(get_department_info("Unknown Category"))
\ No newline at end of file
@@ -0,0 +1,31 @@
+"""Packaging step: download the NLTK resources the pipeline uses into NLTK_DATA_DIR
+
+Usage:
+    python vendor_nltk_data.py [--data-dir nltk_data]
+
+Run once where the network is reachable and ship the directory alongside
+the app; at runtime the resources are only ever read from disk.
+"""
+import argparse
+
+import nltk
+
+import config
+from classification.nltk_resources import NLTK_RESOURCES, ensure_nltk_resources
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--data-dir', default=config.NLTK_DATA_DIR)
+    args = parser.parse_args()
+
+    for name in NLTK_RESOURCES:
+        if not nltk.download(name, download_dir=args.data_dir, raise_on_error=True):
+            raise SystemExit(f"Failed to download NLTK resource '{name}'")
+
+    ensure_nltk_resources(args.data_dir)
+    print(f"Vendored {', '.join(NLTK_RESOURCES)} into {args.data_dir}")
+
+
+if __name__ == '__main__':
+    main()